@@ -0,0 +1,3 @@
+from adjacency.csr import CSRAdjacency
+from adjacency.best import NeighbourhoodBest
+from adjacency.dynamic import DynamicAdjacency
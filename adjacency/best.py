@@ -0,0 +1,26 @@
+import numpy as np
+from adjacency.csr import CSRAdjacency
+
+
+class NeighbourhoodBest:
+    """ Answers find_most_successful_player queries with one numpy argmax over the node's CSR slice.
+        Nothing is cached, so pay off changes cost nothing. Ties go to the neighbour listed first by
+        `adjacency`."""
+
+    def __init__(self, adjacency: CSRAdjacency, pay_off_sum: np.ndarray):
+        self.indptr = adjacency.indptr
+        self.indices = adjacency.indices
+        self.pay_off_sum = pay_off_sum
+
+    def attach(self, players):
+        """ Makes find_most_successful_player of `players` answer through this index """
+        players.neighbourhood_best = self
+
+    def best(self, node: int) -> int:
+        """ First neighbour with the largest positive pay off sum, the node itself if there is none """
+        neighbours = self.indices[self.indptr[node]:self.indptr[node + 1]]
+        if not len(neighbours):
+            return node
+        pay_offs = self.pay_off_sum[neighbours]
+        position = pay_offs.argmax()
+        return int(neighbours[position]) if pay_offs[position] > 0 else node
@@ -0,0 +1,126 @@
+import numpy as np
+from networkx import Graph
+
+
+class CSRAdjacency:
+    """ Undirected adjacency in compressed sparse row form, node ids are 0..n-1 """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.n = len(indptr) - 1
+        self.degree = np.diff(indptr)
+        self._rows = None
+        self._upper = None
+
+    @classmethod
+    def from_edges(cls, n: int, edges: np.ndarray) -> "CSRAdjacency":
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        rows = np.concatenate((edges[:, 0], edges[:, 1]))
+        columns = np.concatenate((edges[:, 1], edges[:, 0]))
+        # stable, so neighbours keep the order their edges were listed in
+        order = np.argsort(rows, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(indptr, columns[order])
+
+    @classmethod
+    def from_graph(cls, graph: Graph, n: int = None) -> "CSRAdjacency":
+        if n is None:
+            n = graph.number_of_nodes()
+        edges = np.fromiter((node for edge in graph.edges() for node in edge), dtype=np.int64)
+        return cls.from_edges(n, edges)
+
+    @classmethod
+    def from_graph_order(cls, graph: Graph, n: int = None) -> "CSRAdjacency":
+        """ Like from_graph, but every node's neighbours are in the order graph.neighbors() lists them """
+        if n is None:
+            n = graph.number_of_nodes()
+        adjacency = graph.adj
+        degree = np.fromiter((len(adjacency[node]) if node in adjacency else 0 for node in range(n)),
+                             dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degree, out=indptr[1:])
+        indices = np.fromiter((neighbour for node in range(n) if node in adjacency for neighbour in adjacency[node]),
+                              dtype=np.int64, count=int(indptr[-1]))
+        return cls(indptr, indices)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """ Row (node) id of every entry in indices """
+        if self._rows is None:
+            self._rows = np.repeat(np.arange(self.n), self.degree)
+        return self._rows
+
+    @property
+    def upper(self) -> np.ndarray:
+        """ Mask of the entries in indices whose neighbour has a larger id than the row node """
+        if self._upper is None:
+            self._upper = self.rows < self.indices
+        return self._upper
+
+    def number_of_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def edges(self) -> np.ndarray:
+        """ Every undirected edge once, as a (E, 2) array """
+        return np.column_stack((self.rows[self.upper], self.indices[self.upper]))
+
+    def neighbours(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def component_labels(self) -> np.ndarray:
+        """ Connected component of every node, labelled by its smallest node id """
+        labels = np.arange(self.n)
+        while True:
+            hooked = labels.copy()
+            np.minimum.at(hooked, labels[self.rows], labels[self.indices])
+            while True:
+                jumped = hooked[hooked]
+                if np.array_equal(jumped, hooked):
+                    break
+                hooked = jumped
+            if np.array_equal(hooked, labels):
+                return labels
+            labels = hooked
+
+    def dot(self, values: np.ndarray) -> np.ndarray:
+        """ Sparse matrix-vector product: sum of `values` over the neighbours of every node """
+        return np.bincount(self.rows, weights=values[self.indices], minlength=self.n)
+
+    def dot_split(self, values: np.ndarray):
+        """ dot over the neighbours with a larger id and over the neighbours with a smaller id, as two arrays """
+        upper = self.upper
+        weights = values[self.indices]
+        return np.bincount(self.rows[upper], weights=weights[upper], minlength=self.n), \
+            np.bincount(self.rows[~upper], weights=weights[~upper], minlength=self.n)
+
+    def random_neighbours(self, nodes: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+        """ One uniformly drawn neighbour for each of `nodes`, -1 for isolated nodes """
+        degree = self.degree[nodes]
+        positions = self.indptr[nodes] + np.minimum((uniforms * degree).astype(np.int64), degree - 1)
+        neighbours = np.full(len(nodes), -1, dtype=np.int64)
+        has_neighbours = degree > 0
+        neighbours[has_neighbours] = self.indices[positions[has_neighbours]]
+        return neighbours
+
+    def neighbour_argmax(self, values: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """ For each of `nodes` the first neighbour with the largest value, -1 for isolated nodes """
+        best = np.full(len(nodes), -1, dtype=np.int64)
+        connected = np.flatnonzero(self.degree[nodes] > 0)
+        if len(connected) == 0:
+            return best
+        degree = self.degree[nodes[connected]]
+        starts = np.zeros(len(connected), dtype=np.int64)
+        np.cumsum(degree[:-1], out=starts[1:])
+        # positions of every neighbour slice, concatenated
+        positions = np.repeat(self.indptr[nodes[connected]] - starts, degree) + np.arange(starts[-1] + degree[-1])
+        neighbours = self.indices[positions]
+        neighbour_values = values[neighbours]
+        segment = np.repeat(np.arange(len(connected)), degree)
+        segment_max = np.maximum.reduceat(neighbour_values, starts)
+        is_max = np.flatnonzero(neighbour_values == segment_max[segment])
+        first = is_max[np.r_[True, segment[is_max][1:] != segment[is_max][:-1]]]
+        best[connected[segment[first]]] = neighbours[first]
+        return best
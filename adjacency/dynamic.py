@@ -0,0 +1,109 @@
+import numpy as np
+from rng import randrange
+from adjacency.csr import CSRAdjacency
+
+
+class DynamicAdjacency:
+    """ Undirected adjacency that can be rewired while it is played on, node ids are 0..n-1.
+
+        Every edge lives in a fixed slot 0..E-1 and rewiring moves one of its endpoints, so the number of
+        edges never changes and a pass over the slots visits every edge once, whatever is rewired meanwhile.
+        A node keeps the slots of its edges in a list, an edge knows its position in both of its endpoints'
+        lists: moving an endpoint is a swap with the last entry and a pop, O(1) like the membership checks
+        and the uniform edge and neighbour draws."""
+
+    def __init__(self, n: int, edges: np.ndarray, incidence: list = None):
+        self.n = n
+        # endpoints and the position of the edge in each endpoint's incidence list, per slot
+        self._ends = [[int(u), int(v)] for u, v in np.asarray(edges, dtype=np.int64).reshape(-1, 2)]
+        self._positions = [[0, 0] for _ in self._ends]
+        if incidence is None:
+            incidence = [[] for _ in range(n)]
+            for edge, (u, v) in enumerate(self._ends):
+                incidence[u].append(edge)
+                incidence[v].append(edge)
+        self._incidence = incidence
+        for node, edges_of_node in enumerate(incidence):
+            for position, edge in enumerate(edges_of_node):
+                self._positions[edge][self._ends[edge].index(node)] = position
+        self._pairs = {(min(u, v), max(u, v)) for u, v in self._ends}
+        self.rewired = 0
+
+    @classmethod
+    def from_csr(cls, adjacency: CSRAdjacency) -> "DynamicAdjacency":
+        return cls(adjacency.n, adjacency.edges())
+
+    def number_of_edges(self) -> int:
+        return len(self._ends)
+
+    def edge(self, edge: int) -> tuple:
+        """ Current endpoints of the edge in slot `edge` """
+        return tuple(self._ends[edge])
+
+    def edges(self) -> np.ndarray:
+        """ Every undirected edge once, as a (E, 2) array in slot order """
+        return np.array(self._ends, dtype=np.int64).reshape(-1, 2)
+
+    def node_degree(self, node: int) -> int:
+        return len(self._incidence[node])
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return (min(u, v), max(u, v)) in self._pairs
+
+    def neighbours(self, node: int) -> list:
+        ends = self._ends
+        return [ends[edge][0] + ends[edge][1] - node for edge in self._incidence[node]]
+
+    def random_edge(self) -> int:
+        return randrange(len(self._ends))
+
+    def random_neighbour(self, node: int) -> int:
+        """ A uniformly drawn neighbour, -1 for an isolated node """
+        edges_of_node = self._incidence[node]
+        if not edges_of_node:
+            return -1
+        u, v = self._ends[edges_of_node[randrange(len(edges_of_node))]]
+        return u + v - node
+
+    def rewire(self, edge: int, old: int, new: int):
+        """ Moves the `old` endpoint of the edge in slot `edge` to `new`, the other endpoint keeps the edge """
+        ends = self._ends[edge]
+        side = 0 if ends[0] == old else 1
+        kept = ends[1 - side]
+        self._pairs.discard((min(old, kept), max(old, kept)))
+        self._pairs.add((min(new, kept), max(new, kept)))
+
+        # swap the edge with the last one of old's list and pop it
+        edges_of_old = self._incidence[old]
+        position = self._positions[edge][side]
+        last = edges_of_old.pop()
+        if last != edge:
+            edges_of_old[position] = last
+            self._positions[last][0 if self._ends[last][0] == old else 1] = position
+
+        edges_of_new = self._incidence[new]
+        self._positions[edge][side] = len(edges_of_new)
+        edges_of_new.append(edge)
+        ends[side] = new
+        self.rewired += 1
+
+    def to_csr(self) -> CSRAdjacency:
+        return CSRAdjacency.from_edges(self.n, self.edges())
+
+    def get_state(self) -> dict:
+        """ The edges and the order of every incidence list, which the neighbour draws depend on """
+        lengths = np.array([len(edges_of_node) for edges_of_node in self._incidence], dtype=np.int64)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        incidence = np.fromiter((edge for edges_of_node in self._incidence for edge in edges_of_node),
+                                dtype=np.int64, count=int(indptr[-1]))
+        return {"edges": self.edges(), "indptr": indptr, "incidence": incidence, "rewired": np.array(self.rewired)}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "DynamicAdjacency":
+        indptr = state["indptr"]
+        incidence = state["incidence"].tolist()
+        network = cls(len(indptr) - 1, state["edges"],
+                      [incidence[indptr[node]:indptr[node + 1]] for node in range(len(indptr) - 1)])
+        network.rewired = int(state["rewired"])
+        return network
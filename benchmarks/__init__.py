@@ -0,0 +1,298 @@
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from itertools import islice
+from typing import Callable, List
+import numpy as np
+from config_schema import schema
+from engine.asynchronous import attach_neighbourhood_best, play
+from graph_cache import get_adjacency
+from population import PopulationTracker
+from random_graphs import edges_to_graph, get_edges_from_name
+from simulation import run_simulation
+from strategy import UpdateRule
+from utilities import calculate_d_max, init_random_players, build_pay_off_table, play_a_round, play_rounds, \
+    update_strategy
+
+PAY_OFF = [[[-1, -1], [0, 10]], [[10, 0], [5, 5]]]
+FAMILIES = ("erdos_renyi", "small_world", "barabasi_albert")
+ENGINES = ("asynchronous", "synchronous", "parallel")
+
+# scaling matrices: every combination of n, degree, rounds and family is measured
+# every timing is the median of `repeat` samples, a sample runs the benchmark often enough to take min_seconds
+PRESETS = {
+    "quick": {"n": [1000], "degree": [4], "rounds": [10], "families": FAMILIES, "engines": ENGINES,
+              "repeat": 7, "min_seconds": 0.2, "calls": 2000},
+    "full": {"n": [1000, 10000, 100000], "degree": [4, 16], "rounds": [10, 100], "families": FAMILIES,
+             "engines": ENGINES, "repeat": 9, "min_seconds": 0.5, "calls": 20000}
+}
+# per call and per update rule benchmarks run on one small network
+RULE_NETWORK = {"family": "erdos_renyi", "n": 1000, "degree": 4}
+DEFAULT_THRESHOLD = 1.2
+# the parallel engine is measured with a pool, one worker would not exercise it
+PARALLEL_WORKERS = 2
+
+
+def graph_parameters(family: str, n: int, degree: int) -> dict:
+    """ p and m of a family for about `degree` neighbours per node """
+    if family == "erdos_renyi":
+        return {"p": degree / max(n - 1, 1), "m": 1}
+    if family == "small_world":
+        return {"p": 0.1, "m": degree}
+    return {"p": 0.0, "m": max(degree // 2, 1)}
+
+
+def settings_for(family: str, n: int, degree: int, rounds: int, engine: str = "asynchronous") -> dict:
+    settings = {
+        "n": n,
+        "G": family,
+        "competitive_probability": 0.5,
+        "pajek_path": "",
+        "pay_off": PAY_OFF,
+        "K": 0.13,
+        "ROUNDS": rounds,
+        "change_update_rule": True,
+        "engine": engine,
+        "workers": PARALLEL_WORKERS if engine == "parallel" else 1,
+        "seed": 0
+    }
+    settings.update(graph_parameters(family, n, degree))
+    return schema.validate(settings)
+
+
+def _time(run: Callable, setup: Callable, timed_by_run: bool) -> float:
+    state = setup()
+    start = time.perf_counter()
+    elapsed = run(state)
+    return elapsed if timed_by_run else time.perf_counter() - start
+
+
+def measure(run: Callable, setup: Callable = lambda: None, repeat: int = 7, min_seconds: float = 0.2,
+            timed_by_run: bool = False) -> dict:
+    """ Seconds of one run(setup()), setup is not timed. Each of the `repeat` samples averages as many runs as
+        take min_seconds, "seconds" is the median sample, "best" the fastest.
+        timed_by_run: run returns the seconds to count, e.g. without its own setup."""
+    first = _time(run, setup, timed_by_run)
+    iterations = max(1, int(np.ceil(min_seconds / first))) if first > 0 else 1
+    samples = [float(np.mean([_time(run, setup, timed_by_run) for _ in range(iterations)])) for _ in range(repeat)]
+    return {"seconds": float(np.median(samples)), "best": min(samples), "mean": float(np.mean(samples)),
+            "repeat": repeat, "iterations": iterations}
+
+
+def _measure(run: Callable, preset: dict, setup: Callable = lambda: None, timed_by_run: bool = False) -> dict:
+    return measure(run, setup, preset["repeat"], preset["min_seconds"], timed_by_run)
+
+
+def _record(results: list, name: str, params: dict, timing: dict, items: int = None, unit: str = None):
+    timing = dict(name=name, params=params, **timing)
+    if items:
+        timing.update(items=items, unit=unit, per_item=timing["seconds"] / items)
+    results.append(timing)
+    print("{:<28} {:<60} {:>10.4f} s{}".format(
+        name, json.dumps(params, sort_keys=True), timing["seconds"],
+        "  {:.3g} s/{}".format(timing["per_item"], unit) if items else ""), file=sys.stderr)
+
+
+def _network(family: str, n: int, degree: int):
+    parameters = graph_parameters(family, n, degree)
+    return get_adjacency(family, n, parameters["p"], parameters["m"], None, 0, np.random.default_rng(0))
+
+
+def bench_graph_generation(results: list, preset: dict):
+    for family in preset["families"]:
+        for n in preset["n"]:
+            for degree in preset["degree"]:
+                parameters = graph_parameters(family, n, degree)
+                timing = _measure(
+                    lambda _: get_edges_from_name(family, n, parameters["p"], parameters["m"], None,
+                                                  np.random.default_rng(0)),
+                    preset)
+                _record(results, "graph_generation", {"family": family, "n": n, "degree": degree}, timing, n, "node")
+
+
+def bench_init_players(results: list, preset: dict):
+    for n in preset["n"]:
+        _record(results, "init_random_players", {"n": n},
+                _measure(lambda _: init_random_players(n, 0.5), preset), n, "player")
+
+
+def _rule_players(adjacency, graph, rule: UpdateRule):
+    """ Players that all follow `rule`, indexed for best-takes-over as run_asynchronous does """
+    players = init_random_players(adjacency.n, 0.5)
+    players.update_rule[:] = rule.value
+    attach_neighbourhood_best(graph, players)
+    return players
+
+
+def bench_rounds(results: list, preset: dict):
+    pay_off_matrix = np.array(PAY_OFF)
+    pay_off_table = build_pay_off_table(pay_off_matrix)
+    calls = preset["calls"]
+
+    def setup():
+        players = init_random_players(2, 0.5)
+        return players[0], players[1]
+
+    def one_round(pair):
+        for _ in range(calls):
+            play_a_round(pair[0], pair[1], pay_off_matrix)
+
+    _record(results, "play_a_round", {}, _measure(one_round, preset, setup), calls, "call")
+    for rounds in preset["rounds"]:
+        def repeated_rounds(pair):
+            for _ in range(calls):
+                play_rounds(pair[0], pair[1], pay_off_table, rounds)
+        _record(results, "play_rounds", {"rounds": rounds}, _measure(repeated_rounds, preset, setup), calls, "call")
+
+
+def bench_update_rules(results: list, preset: dict):
+    """ update_strategy and the whole per edge path of the asynchronous engine, one update rule at a time """
+    adjacency = _network(**RULE_NETWORK)
+    graph = edges_to_graph(adjacency.n, adjacency.edges())
+    edges = list(islice(graph.edges(), preset["calls"]))
+    pay_off_matrix = np.array(PAY_OFF)
+    pay_off_table = build_pay_off_table(pay_off_matrix)
+    d_max = calculate_d_max(pay_off_matrix)
+    for rounds in preset["rounds"]:
+        for rule in UpdateRule:
+            def setup():
+                players = _rule_players(adjacency, graph, rule)
+                games = [play_rounds(players[u], players[v], pay_off_table, rounds) for u, v in edges]
+                return players, games
+
+            def updates(state):
+                players, games = state
+                for row, column in games:
+                    update_strategy(graph, players, row, column, column.payoff < row.payoff, 0.5, d_max, 0.13, True)
+
+            params = dict(RULE_NETWORK, rounds=rounds, rule=rule.name)
+            _record(results, "update_strategy", params, _measure(updates, preset, setup), len(edges), "call")
+
+            def rule_setup():
+                players = _rule_players(adjacency, graph, rule)
+                return players, PopulationTracker(players), {r: 0 for r in UpdateRule}, {r: 0 for r in UpdateRule}
+
+            def pass_over_edges(state):
+                players, tracker, win_rates, played = state
+                play(graph, players, pay_off_table, rounds, 0.5, d_max, 0.13, True, win_rates, played, tracker)
+
+            _record(results, "simulate_round", params, _measure(pass_over_edges, preset, rule_setup),
+                    graph.number_of_edges(), "edge")
+
+
+def bench_neighbourhood_best(results: list, preset: dict):
+    """ A pass of best-takes-over players over a barabasi_albert network, with the NeighbourhoodBest index
+        run_asynchronous attaches and with the scan over graph.neighbors() it replaces """
+    pay_off_matrix = np.array(PAY_OFF)
+    pay_off_table = build_pay_off_table(pay_off_matrix)
+    d_max = calculate_d_max(pay_off_matrix)
+    for n in preset["n"]:
+        for degree in preset["degree"]:
+            adjacency = _network("barabasi_albert", n, degree)
+            graph = edges_to_graph(adjacency.n, adjacency.edges())
+            for index in (True, False):
+                def setup():
+                    players = init_random_players(adjacency.n, 0.5)
+                    players.update_rule[:] = UpdateRule.BEST_TAKES_OVER.value
+                    if index:
+                        attach_neighbourhood_best(graph, players)
+                    return players, PopulationTracker(players)
+
+                def pass_over_edges(state):
+                    players, tracker = state
+                    play(graph, players, pay_off_table, preset["rounds"][0], 0.5, d_max, 0.13, True,
+                         dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0), tracker)
+
+                _record(results, "neighbourhood_best", {"n": n, "degree": degree, "index": index},
+                        _measure(pass_over_edges, preset, setup), graph.number_of_edges(), "edge")
+
+
+def bench_engines(results: list, preset: dict):
+    """ One generation of each engine, without generating the network and the players """
+    for family in preset["families"]:
+        for n in preset["n"]:
+            for degree in preset["degree"]:
+                edges = _network(family, n, degree).number_of_edges()
+                for rounds in preset["rounds"]:
+                    for engine in preset["engines"]:
+                        settings = settings_for(family, n, degree, rounds, engine)
+                        config = {"SIMULATION": settings}
+                        timing = _measure(lambda _: run_simulation(config).simulation_time, preset, timed_by_run=True)
+                        params = {"family": family, "n": n, "degree": degree, "rounds": rounds, "engine": engine,
+                                  "workers": settings["workers"]}
+                        _record(results, "play", params, timing, edges, "edge")
+
+
+def bench_plots(results: list, preset: dict):
+    import matplotlib
+    matplotlib.use("Agg")
+    from plots import save_plots
+    for n in preset["n"]:
+        config = {"SIMULATION": settings_for("erdos_renyi", n, preset["degree"][0], preset["rounds"][0], "synchronous")}
+        result = run_simulation(config)
+        directory = tempfile.mkdtemp(prefix="bench-plots-")
+        try:
+            timing = measure(lambda _: save_plots(result.original_players, result.adjacency, result.players,
+                                                  result.update_rules_win_rates, result.recorder, result.recorder,
+                                                  directory),
+                             repeat=1, min_seconds=0)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        _record(results, "save_plots", {"n": n}, timing)
+
+
+SUITES = {
+    "graph_generation": bench_graph_generation,
+    "init_random_players": bench_init_players,
+    "rounds": bench_rounds,
+    "update_rules": bench_update_rules,
+    "neighbourhood_best": bench_neighbourhood_best,
+    "play": bench_engines,
+    "plots": bench_plots
+}
+
+
+def run_benchmarks(preset: str = "quick", only: List[str] = None) -> dict:
+    results = []
+    for name, suite in SUITES.items():
+        if only and name not in only:
+            continue
+        suite(results, PRESETS[preset])
+    return {
+        "meta": {
+            "preset": preset,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+
+def _key(result: dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """ Each current result next to its baseline; slower than threshold times the baseline is a regression,
+        faster than baseline / threshold an improvement """
+    baseline_results = {_key(result): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        before = baseline_results.get(_key(result))
+        entry = {"name": result["name"], "params": result["params"], "seconds": result["seconds"]}
+        if before is None:
+            entry["status"] = "new"
+        else:
+            ratio = result["seconds"] / before["seconds"] if before["seconds"] > 0 else float("inf")
+            entry.update(baseline=before["seconds"], ratio=ratio)
+            entry["status"] = "regression" if ratio > threshold else \
+                "improvement" if ratio < 1 / threshold else "ok"
+        comparison.append(entry)
+    return comparison
@@ -0,0 +1,34 @@
+import argparse
+import json
+import sys
+from benchmarks import PRESETS, SUITES, DEFAULT_THRESHOLD, run_benchmarks, compare
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks of the simulation hot paths")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick", help="scaling matrix to measure")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="run only these suites")
+    parser.add_argument("--output", default="benchmark.json", help="path of the JSON results")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown factor above which a benchmark counts as a regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    report = run_benchmarks(arguments.preset, arguments.only)
+    regressions = []
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), arguments.threshold)
+        regressions = [entry for entry in report["comparison"] if entry["status"] == "regression"]
+        for entry in report["comparison"]:
+            if entry["status"] != "ok":
+                print("{:<12} {:<28} {:<60} {}".format(
+                    entry["status"], entry["name"], json.dumps(entry["params"], sort_keys=True),
+                    "{:.2f}x".format(entry["ratio"]) if "ratio" in entry else ""), file=sys.stderr)
+    with open(arguments.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if regressions:
+        sys.exit("{} benchmark(s) regressed by more than {}x".format(len(regressions), arguments.threshold))
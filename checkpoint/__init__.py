@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Tuple
+import numpy as np
+import rng
+from adjacency import CSRAdjacency, DynamicAdjacency
+from convergence import ConvergenceMonitor
+from player import PlayerStore, PLAYER_COLUMNS
+from recorder import SeriesRecorder
+from strategy import UpdateRule
+
+CHECKPOINT_FILE = "checkpoint.npz"
+BASELINE_DIRECTORY = "initial"
+FORMAT_VERSION = 1
+
+
+def save_baseline(directory: str, players: PlayerStore, adjacency: CSRAdjacency) -> str:
+    """ The initial player columns and the network as one .npy file each, written once per run """
+    baseline = os.path.join(directory, BASELINE_DIRECTORY)
+    if os.path.isdir(baseline):
+        shutil.rmtree(baseline)
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=directory, prefix=".staging-")
+    try:
+        for name, column in players.columns().items():
+            np.save(os.path.join(staging, name + ".npy"), column)
+        np.save(os.path.join(staging, "indptr.npy"), adjacency.indptr)
+        np.save(os.path.join(staging, "indices.npy"), adjacency.indices)
+        os.rename(staging, baseline)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return baseline
+
+
+def load_baseline(directory: str) -> Tuple[PlayerStore, CSRAdjacency]:
+    """ Copy-on-write memory maps of the initial players and the network, nothing is read until it is used """
+    baseline = os.path.join(directory, BASELINE_DIRECTORY)
+    players = PlayerStore.from_columns(
+        {name: np.load(os.path.join(baseline, name + ".npy"), mmap_mode="c") for name in PLAYER_COLUMNS})
+    adjacency = CSRAdjacency(np.load(os.path.join(baseline, "indptr.npy"), mmap_mode="r"),
+                             np.load(os.path.join(baseline, "indices.npy"), mmap_mode="r"))
+    return players, adjacency
+
+
+def _write_atomic(path: str, arrays: dict):
+    handle, staging = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".staging-", suffix=".npz")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging, path)
+    except BaseException:
+        if os.path.exists(staging):
+            os.unlink(staging)
+        raise
+
+
+class Checkpointer:
+    """ Writes the full state of a run to <directory>/checkpoint.npz, at most every `interval` seconds.
+        A checkpoint replaces the previous one atomically, a killed run leaves the last complete one behind."""
+
+    def __init__(self,
+                 directory: str,
+                 interval: float,
+                 config: dict,
+                 players: PlayerStore,
+                 update_rules_win_rates: dict,
+                 update_rules_played: dict,
+                 recorder: SeriesRecorder,
+                 monitor: ConvergenceMonitor,
+                 network: DynamicAdjacency = None):
+        self.directory = directory
+        self.interval = interval
+        self.config = config
+        self.players = players
+        self.update_rules_win_rates = update_rules_win_rates
+        self.update_rules_played = update_rules_played
+        self.recorder = recorder
+        self.monitor = monitor
+        # the rewired network of a co-evolving run, the baseline only has the initial one
+        self.network = network
+        self._last = time.perf_counter()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, CHECKPOINT_FILE)
+
+    def maybe_save(self, edge: int = 0):
+        if time.perf_counter() - self._last >= self.interval:
+            self.save(edge)
+
+    def save(self, edge: int = 0):
+        """ `edge` is the cursor into the current generation's edge list, 0 between generations """
+        stream = rng.get_stream().get_state()
+        recorder = self.recorder.get_state()
+        monitor = self.monitor.get_state()
+        meta = {
+            "version": FORMAT_VERSION,
+            "config": self.config,
+            "seed": rng.get_seed(),
+            "bit_generator": stream["bit_generator"],
+            "edge": edge,
+            "update_rules_win_rates": {rule.name: int(count) for rule, count in self.update_rules_win_rates.items()},
+            "update_rules_played": {rule.name: int(count) for rule, count in self.update_rules_played.items()},
+            "recorder": {"steps": recorder["steps"], "spilled": recorder["spilled"]},
+            "monitor": {name: monitor[name] for name in ("generation", "reason", "elapsed")}
+        }
+        arrays = {"player_" + name: column for name, column in self.players.columns().items()}
+        arrays.update({
+            "meta": np.array(json.dumps(meta)),
+            "rng_block": stream["block"],
+            "recorder_ratios": recorder["ratios"],
+            "recorder_rule_counts": recorder["rule_counts"],
+            "monitor_window": monitor["window"]
+        })
+        if self.network is not None:
+            arrays.update({"network_" + name: array for name, array in self.network.get_state().items()})
+        _write_atomic(self.path, arrays)
+        self._last = time.perf_counter()
+
+
+def load_checkpoint(directory: str) -> dict:
+    """ The state written by Checkpointer.save: meta data plus the arrays, players already as a PlayerStore """
+    with np.load(os.path.join(directory, CHECKPOINT_FILE)) as stored:
+        meta = json.loads(str(stored["meta"]))
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError("Checkpoint format {} is not supported".format(meta["version"]))
+        meta["players"] = PlayerStore.from_columns({name: stored["player_" + name] for name in PLAYER_COLUMNS})
+        meta["rng_block"] = stored["rng_block"]
+        meta["recorder"].update(ratios=stored["recorder_ratios"], rule_counts=stored["recorder_rule_counts"])
+        meta["monitor"]["window"] = stored["monitor_window"]
+        meta["network"] = {name[len("network_"):]: stored[name] for name in stored.files
+                           if name.startswith("network_")} or None
+    for tallies in ("update_rules_win_rates", "update_rules_played"):
+        meta[tallies] = {UpdateRule[name]: count for name, count in meta[tallies].items()}
+    return meta
+
+
+def restore(state: dict, update_rules_win_rates: dict, update_rules_played: dict,
+            recorder: SeriesRecorder, monitor: ConvergenceMonitor):
+    """ Puts a loaded checkpoint back into the rng, the tallies, the recorder and the monitor of a new run,
+        which has to be seeded with state["seed"] first """
+    rng.get_stream().set_state({"bit_generator": state["bit_generator"], "block": state["rng_block"]})
+    update_rules_win_rates.update(state["update_rules_win_rates"])
+    update_rules_played.update(state["update_rules_played"])
+    recorder.set_state(state["recorder"])
+    monitor.set_state(state["monitor"])
@@ -1,4 +1,5 @@
-from schema import Schema, And, Or
+from numbers import Real
+from schema import Schema, And, Or, Optional
 
 schema = Schema(
         {
@@ -12,6 +13,37 @@ schema = Schema(
             'pay_off': And(list),
             'K': And(float),
             'ROUNDS': And(int),
-            'change_update_rule': And(bool)
+            'change_update_rule': And(bool),
+            Optional('engine', default='asynchronous'): Or('asynchronous', 'synchronous', 'parallel'),
+            Optional('generations', default=1): And(int, lambda g: g > 0),
+            Optional('max_seconds', default=None): Or(None, And(Or(int, float), lambda s: s > 0)),
+            Optional('stop_on_absorbing', default=True): And(bool),
+            Optional('stable_window', default=None): Or(None, And(int, lambda w: w > 0)),
+            Optional('stable_tolerance', default=0.0): And(Real, lambda t: t >= 0),
+            Optional('workers', default=1): And(int, lambda w: w > 0),
+            Optional('rewiring_probability', default=0.0): And(Or(int, float), lambda r: 0 <= r <= 1),
+            Optional('rewiring_policy', default='local'): Or('random', 'local', 'preferential'),
+            Optional('seed', default=None): Or(None, And(int, lambda s: s >= 0)),
+            Optional('graph_seed', default=None): Or(None, And(int, lambda s: s >= 0)),
+            Optional('graph_cache', default=None): Or(None, And(str)),
+            Optional('graph_cache_size', default=1024): And(int, lambda s: s > 0),
+            Optional('record_stride', default=1): And(int, lambda s: s > 0),
+            Optional('record_chunk_size', default=65536): And(int, lambda s: s > 0),
+            Optional('record_directory', default=None): Or(None, And(str)),
+            Optional('layout_cache', default=None): Or(None, And(str)),
+            Optional('checkpoint_directory', default=None): Or(None, And(str)),
+            Optional('checkpoint_interval', default=600): And(Or(int, float), lambda s: s > 0)
         }
-    )
\ No newline at end of file
+    )
+
+sweep_schema = Schema(
+        {
+            'config': And(str),
+            Optional('grid', default=None): Or(None, {str: And(list, len)}),
+            Optional('parameter_sets', default=None): Or(None, [dict]),
+            Optional('replicas', default=1): And(int, lambda r: r > 0),
+            Optional('seed', default=0): And(int, lambda s: s >= 0),
+            Optional('processes', default=1): And(int, lambda p: p > 0),
+            Optional('vary_graph', default=False): And(bool)
+        }
+    )
@@ -0,0 +1,98 @@
+import time
+import numpy as np
+from population import PopulationTracker
+from strategy import UpdateRule
+
+ABSORBING = "absorbing"
+STABLE = "stable"
+GENERATIONS = "generations"
+TIME = "time"
+
+
+class ConvergenceMonitor:
+    """ Decides after every generation whether a run can stop early. Only the running counters of the
+        PopulationTracker are read, so a check costs O(window * update rules) whatever the population size.
+
+        Stop reasons:
+        - absorbing: every player has the same strategy and no player can leave it, i.e. there is no RANDOM
+          player that could draw the other strategy
+        - stable: over the last `stable_window` generations the cooperator and per update rule counts moved
+          by at most `stable_tolerance` times the population size
+        - generations / time: the generation or wall-clock budget is used up. The engines also look at the clock
+          inside a generation, see out_of_time"""
+
+    def __init__(self,
+                 tracker: PopulationTracker,
+                 comp_prob,
+                 max_generations: int = 1,
+                 max_seconds: float = None,
+                 stop_on_absorbing: bool = True,
+                 stable_window: int = None,
+                 stable_tolerance: float = 0.0):
+        self.tracker = tracker
+        self.comp_prob = comp_prob
+        self.max_generations = max_generations
+        self.max_seconds = max_seconds
+        self.stop_on_absorbing = stop_on_absorbing
+        self.stable_window = stable_window
+        self.stable_tolerance = stable_tolerance
+        self.generation = 0
+        self.reason = None
+        self._start = time.perf_counter()
+        # ring buffer of [cooperators, count of every update rule] per generation
+        self._window = np.zeros((stable_window or 0, 1 + len(UpdateRule)), dtype=np.int64)
+
+    def _random_players_can_leave(self, all_cooperate: bool) -> bool:
+        if self.tracker.rule_counts[UpdateRule.RANDOM.value] == 0 or type(self.comp_prob) == str:
+            return False
+        return self.comp_prob < 1 if all_cooperate else self.comp_prob > 0
+
+    def is_absorbing(self) -> bool:
+        cooperators = self.tracker.cooperators
+        if 0 < cooperators < self.tracker.size:
+            return False
+        return not self._random_players_can_leave(cooperators == self.tracker.size)
+
+    def is_stable(self) -> bool:
+        if not self.stable_window or self.generation < self.stable_window:
+            return False
+        spread = self._window.max(axis=0) - self._window.min(axis=0)
+        return bool(np.all(spread <= self.stable_tolerance * self.tracker.size))
+
+    def out_of_time(self) -> bool:
+        """ True once the wall-clock budget is used up, the reason is then TIME. Engines call it inside long
+            generations, the generation counter is not moved."""
+        if self.max_seconds is not None and time.perf_counter() - self._start >= self.max_seconds:
+            self.reason = TIME
+        return self.reason == TIME
+
+    def generation_done(self) -> bool:
+        """ Call after every generation, True when the run should stop; the reason is kept in `reason` """
+        if self.stable_window:
+            row = self._window[self.generation % self.stable_window]
+            row[0] = self.tracker.cooperators
+            row[1:] = self.tracker.rule_counts
+        self.generation += 1
+        if self.stop_on_absorbing and self.is_absorbing():
+            self.reason = ABSORBING
+        elif self.is_stable():
+            self.reason = STABLE
+        elif self.generation >= self.max_generations:
+            self.reason = GENERATIONS
+        else:
+            self.out_of_time()
+        return self.reason is not None
+
+    def get_state(self) -> dict:
+        return {
+            "generation": self.generation,
+            "reason": self.reason,
+            "elapsed": time.perf_counter() - self._start,
+            "window": self._window.copy()
+        }
+
+    def set_state(self, state: dict):
+        self.generation = int(state["generation"])
+        self.reason = state["reason"]
+        self._start = time.perf_counter() - float(state["elapsed"])
+        self._window[...] = state["window"]
@@ -0,0 +1,5 @@
+from engine.rules import decide_updates
+from engine.synchronous import play_generation, run_synchronous
+from engine.parallel import colour_edges, play_edges, won_rounds, run_parallel
+from engine.rewiring import Rewiring
+from engine.asynchronous import attach_neighbourhood_best, simulate_round, play, play_rewiring, run_asynchronous
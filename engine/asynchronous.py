@@ -0,0 +1,214 @@
+from itertools import islice
+import numpy as np
+from networkx import Graph
+from adjacency import CSRAdjacency, NeighbourhoodBest
+from checkpoint import Checkpointer
+from convergence import ConvergenceMonitor
+from engine.rewiring import Rewiring
+from player import PlayerStore
+from population import PopulationTracker
+from random_graphs import edges_to_graph
+from utilities import get_user_by_id, play_rounds, update_strategy
+
+# the checkpoint clock and the time budget are looked at every this many edges
+CHECKPOINT_EDGES = 1024
+
+
+def attach_neighbourhood_best(graph: Graph, players: PlayerStore):
+    """ Indexes find_most_successful_player on `graph`, ties go to the neighbour the graph lists first, as in
+        the scan """
+    NeighbourhoodBest(CSRAdjacency.from_graph_order(graph, len(players)), players.pay_off_sum).attach(players)
+
+
+def simulate_round(node_pair,
+                   players: PlayerStore,
+                   graph: Graph,
+                   pay_off_table: np.ndarray,
+                   rounds: int,
+                   comp_prob,
+                   d_max: float,
+                   K: float,
+                   change_update_rule: bool,
+                   update_rules_win_rates: dict,
+                   update_rules_played: dict,
+                   tracker: PopulationTracker):
+    row_player = get_user_by_id(players, node_pair[0])
+    column_player = get_user_by_id(players, node_pair[1])
+    if row_player is None or column_player is None:
+        return
+
+    row_player_results, column_player_results = play_rounds(
+        row_player,
+        column_player,
+        pay_off_table,
+        rounds,
+        update_rules_win_rates,
+        update_rules_played
+    )
+    update_strategy(
+        graph,
+        players,
+        row_player_results,
+        column_player_results,
+        column_player_results.payoff < row_player_results.payoff,
+        comp_prob,
+        d_max,
+        K,
+        change_update_rule,
+        tracker
+    )
+    update_strategy(
+        graph,
+        players,
+        column_player_results,
+        row_player_results,
+        row_player_results.payoff < column_player_results.payoff,
+        comp_prob,
+        d_max,
+        K,
+        change_update_rule,
+        tracker
+    )
+    tracker.record()
+
+
+def play(graph: Graph,
+         players: PlayerStore,
+         pay_off_table: np.ndarray,
+         rounds: int,
+         comp_prob,
+         d_max: float,
+         K: float,
+         change_update_rule: bool,
+         update_rules_win_rates: dict,
+         update_rules_played: dict,
+         tracker: PopulationTracker,
+         start: int = 0,
+         checkpointer: Checkpointer = None,
+         monitor: ConvergenceMonitor = None) -> bool:
+    """ One pass over the edges, every pair plays and both players update right away.
+        Starts from the `start`-th edge when a run is resumed. False when the monitor's time budget ran out
+        before the pass was done."""
+    for edge, node_pair in enumerate(islice(graph.edges(), start, None), start):
+        if monitor is not None and edge % CHECKPOINT_EDGES == 0 and edge > start and monitor.out_of_time():
+            return False
+        simulate_round(
+            node_pair,
+            players,
+            graph,
+            pay_off_table,
+            rounds,
+            comp_prob,
+            d_max,
+            K,
+            change_update_rule,
+            update_rules_win_rates,
+            update_rules_played,
+            tracker
+        )
+        if checkpointer is not None and edge % CHECKPOINT_EDGES == 0:
+            checkpointer.maybe_save(edge + 1)
+    return True
+
+
+def play_rewiring(rewiring: Rewiring,
+                  players: PlayerStore,
+                  pay_off_table: np.ndarray,
+                  rounds: int,
+                  comp_prob,
+                  d_max: float,
+                  K: float,
+                  change_update_rule: bool,
+                  update_rules_win_rates: dict,
+                  update_rules_played: dict,
+                  tracker: PopulationTracker,
+                  start: int = 0,
+                  checkpointer: Checkpointer = None,
+                  monitor: ConvergenceMonitor = None) -> bool:
+    """ play on a network that is rewired while it is played on. The pass goes over the edge slots, so it
+        visits every edge once, with the endpoints it has at the time of the visit."""
+    network = rewiring.network
+    for edge in range(start, network.number_of_edges()):
+        if monitor is not None and edge % CHECKPOINT_EDGES == 0 and edge > start and monitor.out_of_time():
+            return False
+        simulate_round(
+            network.edge(edge),
+            players,
+            network,
+            pay_off_table,
+            rounds,
+            comp_prob,
+            d_max,
+            K,
+            change_update_rule,
+            update_rules_win_rates,
+            update_rules_played,
+            tracker
+        )
+        rewiring.after_round(edge, players)
+        if checkpointer is not None and edge % CHECKPOINT_EDGES == 0:
+            checkpointer.maybe_save(edge + 1)
+    return True
+
+
+def run_asynchronous(adjacency: CSRAdjacency,
+                     players: PlayerStore,
+                     pay_off_table: np.ndarray,
+                     rounds: int,
+                     generations: int,
+                     comp_prob,
+                     d_max: float,
+                     K: float,
+                     change_update_rule: bool,
+                     update_rules_win_rates: dict,
+                     update_rules_played: dict,
+                     tracker: PopulationTracker,
+                     monitor: ConvergenceMonitor = None,
+                     checkpointer: Checkpointer = None,
+                     start_edge: int = 0,
+                     rewiring: Rewiring = None):
+    """ Up to `generations` passes over the edges, the draws come from the rng module's default stream.
+        With `rewiring` the passes go over rewiring.network, which starts out as `adjacency`."""
+    if rewiring is None:
+        graph = edges_to_graph(adjacency.n, adjacency.edges())
+        attach_neighbourhood_best(graph, players)
+    for _ in range(generations):
+        if rewiring is None:
+            finished = play(
+                graph,
+                players,
+                pay_off_table,
+                rounds,
+                comp_prob,
+                d_max,
+                K,
+                change_update_rule,
+                update_rules_win_rates,
+                update_rules_played,
+                tracker,
+                start_edge,
+                checkpointer,
+                monitor
+            )
+        else:
+            finished = play_rewiring(
+                rewiring,
+                players,
+                pay_off_table,
+                rounds,
+                comp_prob,
+                d_max,
+                K,
+                change_update_rule,
+                update_rules_win_rates,
+                update_rules_played,
+                tracker,
+                start_edge,
+                checkpointer,
+                monitor
+            )
+        start_edge = 0
+        if not finished or monitor is not None and monitor.generation_done():
+            break
+        if checkpointer is not None:
+            checkpointer.maybe_save()
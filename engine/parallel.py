@@ -0,0 +1,250 @@
+import multiprocessing
+from functools import partial
+from multiprocessing import shared_memory
+from typing import Tuple
+import numpy as np
+from adjacency import CSRAdjacency
+from checkpoint import Checkpointer
+from convergence import ConvergenceMonitor
+from engine.rules import decide_updates
+from player import PlayerStore
+from population import PopulationTracker
+from strategy import Strategy, UpdateRule
+
+# batches smaller than this are played in the parent process, the pool round trip would cost more
+MIN_PARALLEL_BATCH = 4096
+
+_worker_state = {}
+
+
+def colour_edges(edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Greedy edge colouring. Returns the edges grouped by colour and the offsets of the colour classes,
+        no two edges inside a class share a node."""
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    n = int(edges.max()) + 1 if len(edges) else 0
+    used = [0] * n
+    colours = np.empty(len(edges), dtype=np.int64)
+    for k, (u, v) in enumerate(edges.tolist()):
+        taken = used[u] | used[v]
+        free = (taken + 1) & ~taken
+        colours[k] = free.bit_length() - 1
+        used[u] |= free
+        used[v] |= free
+    order = np.argsort(colours, kind="stable")
+    offsets = np.zeros(int(colours.max()) + 2 if len(edges) else 1, dtype=np.int64)
+    np.cumsum(np.bincount(colours), out=offsets[1:])
+    return edges[order], offsets
+
+
+def play_edges(players: PlayerStore, rows: np.ndarray, columns: np.ndarray, pay_off_table: np.ndarray, rounds: int):
+    """ play_rounds for many node disjoint edges at once, returns the update rule win and played tallies """
+    row_strategies = players.strategy[rows].astype(np.int64)
+    column_strategies = players.strategy[columns].astype(np.int64)
+    pay_offs = pay_off_table[row_strategies * len(Strategy) + column_strategies]
+    row_pay_offs, column_pay_offs = pay_offs[:, 0], pay_offs[:, 1]
+    row_wins = column_pay_offs < row_pay_offs
+    column_wins = row_pay_offs < column_pay_offs
+
+    players.pay_off_sum[rows] += rounds * row_pay_offs
+    players.pay_off_sum[columns] += rounds * column_pay_offs
+    players.rounds_won[rows] += rounds * row_wins
+    players.rounds_won[columns] += rounds * column_wins
+    players.strategy_win_rate[rows[row_wins], row_strategies[row_wins]] += rounds
+    players.strategy_win_rate[columns[column_wins], column_strategies[column_wins]] += rounds
+    players.rounds_played[rows] += rounds
+    players.rounds_played[columns] += rounds
+
+    row_rules = players.update_rule[rows]
+    column_rules = players.update_rule[columns]
+    win_tallies = np.bincount(row_rules, weights=~column_wins, minlength=len(UpdateRule)) + \
+        np.bincount(column_rules, weights=~row_wins, minlength=len(UpdateRule))
+    played_tallies = np.bincount(row_rules, minlength=len(UpdateRule)) + \
+        np.bincount(column_rules, minlength=len(UpdateRule))
+    return rounds * win_tallies.astype(np.int64), rounds * played_tallies
+
+
+def won_rounds(players: PlayerStore, rows: np.ndarray, columns: np.ndarray, pay_off_table: np.ndarray) -> np.ndarray:
+    """ (len(rows), 2) flags: the row and the column player won the game, as update_strategy's won_round """
+    pay_offs = pay_off_table[players.strategy[rows].astype(np.int64) * len(Strategy) + players.strategy[columns]]
+    return np.stack((pay_offs[:, 1] < pay_offs[:, 0], pay_offs[:, 0] < pay_offs[:, 1]), axis=1)
+
+
+class SharedArrays:
+    """ NumPy arrays in multiprocessing.shared_memory blocks, attachable by name from worker processes """
+
+    def __init__(self):
+        self.arrays = {}
+        self.specs = {}
+        self._blocks = []
+
+    def add(self, name: str, array: np.ndarray) -> np.ndarray:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+        self._blocks.append(block)
+        self.arrays[name] = shared
+        self.specs[name] = (block.name, array.shape, array.dtype.str)
+        return shared
+
+    @classmethod
+    def attach(cls, specs: dict) -> "SharedArrays":
+        attached = cls()
+        for name, (block_name, shape, dtype) in specs.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            attached._blocks.append(block)
+            attached.arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            attached.specs[name] = (block_name, shape, dtype)
+        return attached
+
+    def close(self, unlink: bool = False):
+        self.arrays.clear()
+        for block in self._blocks:
+            block.close()
+            if unlink:
+                block.unlink()
+        self._blocks.clear()
+
+
+def _init_worker(specs: dict, parameters: dict):
+    shared = SharedArrays.attach(specs)
+    _worker_state.update(parameters)
+    _worker_state["shared"] = shared
+    _worker_state["players"] = PlayerStore.from_columns(shared.arrays)
+    _worker_state["adjacency"] = CSRAdjacency(shared.arrays["indptr"], shared.arrays["indices"])
+
+
+def _play_chunk(lo: int, hi: int, batch_lo: int):
+    edges = _worker_state["shared"].arrays["edges"][lo:hi]
+    return play_edges(
+        _worker_state["players"], edges[:, 0], edges[:, 1], _worker_state["pay_off_table"], _worker_state["rounds"]
+    )
+
+
+def _decide_chunk(lo: int, hi: int, batch_lo: int, side: int):
+    """ decide_updates of the row (side 0) or the column (side 1) players of the edges lo:hi """
+    arrays = _worker_state["shared"].arrays
+    edges = arrays["edges"][lo:hi]
+    return decide_updates(
+        _worker_state["players"],
+        _worker_state["adjacency"],
+        edges[:, side],
+        edges[:, 1 - side],
+        arrays["won"][lo - batch_lo:hi - batch_lo, side],
+        arrays["uniforms"][lo - batch_lo:hi - batch_lo, 2 * side:2 * side + 2],
+        _worker_state["comp_prob"],
+        _worker_state["d_max"],
+        _worker_state["K"],
+        _worker_state["change_update_rule"]
+    )
+
+
+def _chunks(lo: int, hi: int, workers: int):
+    bounds = np.linspace(lo, hi, workers + 1).astype(np.int64)
+    return [(int(a), int(b), lo) for a, b in zip(bounds[:-1], bounds[1:]) if a < b]
+
+
+def _run(pool, task, lo: int, hi: int, workers: int):
+    if pool is None or hi - lo < MIN_PARALLEL_BATCH:
+        return [task(lo, hi, lo)]
+    return pool.starmap(task, _chunks(lo, hi, workers))
+
+
+def run_parallel(adjacency: CSRAdjacency,
+                 players: PlayerStore,
+                 pay_off_table: np.ndarray,
+                 rounds: int,
+                 comp_prob,
+                 d_max: float,
+                 K: float,
+                 change_update_rule: bool,
+                 update_rules_win_rates: dict,
+                 update_rules_played: dict,
+                 tracker: PopulationTracker,
+                 workers: int,
+                 rng: np.random.Generator = None,
+                 generations: int = 1,
+                 monitor: ConvergenceMonitor = None,
+                 checkpointer: Checkpointer = None):
+    """ Every generation is one pass over every edge in conflict free batches. Inside a batch the games, then the
+        row players' and then the column players' strategy updates run on a process pool; the results only depend
+        on the rng, not on the number of workers. The edge colouring and the pool are set up once for all
+        generations. The tracker records after every edge, in batch order, like the asynchronous engine.
+
+        A batch approximates playing its edges one after the other: every game of the batch is played before the
+        first update, and the column players see the updates of every row player of the batch, not only of the
+        earlier edges. When no two edges of the graph can share a batch, e.g. on a star or a triangle, every batch
+        is one edge and only the random draws differ from the asynchronous engine."""
+    if rng is None:
+        rng = np.random.default_rng()
+    edges, offsets = colour_edges(adjacency.edges())
+    batch_sizes = np.diff(offsets)
+    parameters = {
+        "pay_off_table": pay_off_table,
+        "rounds": rounds,
+        "comp_prob": comp_prob,
+        "d_max": d_max,
+        "K": K,
+        "change_update_rule": change_update_rule
+    }
+    _worker_state.update(parameters)
+
+    shared = SharedArrays()
+    shared_players = None
+    pool = None
+    try:
+        for name, column in players.columns().items():
+            shared.add(name, column)
+        shared.add("indptr", adjacency.indptr)
+        shared.add("indices", adjacency.indices)
+        shared.add("edges", edges)
+        largest_batch = int(batch_sizes.max()) if len(batch_sizes) else 0
+        shared.add("uniforms", np.zeros((largest_batch, 4)))
+        shared.add("won", np.zeros((largest_batch, 2), dtype=bool))
+        shared_players = PlayerStore.from_columns(shared.arrays)
+        _worker_state["shared"] = shared
+        _worker_state["players"] = shared_players
+        _worker_state["adjacency"] = CSRAdjacency(shared.arrays["indptr"], shared.arrays["indices"])
+        if checkpointer is not None:
+            # checkpoints have to see the players being played, not the caller's copy
+            checkpointer.players = shared_players
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(shared.specs, parameters))
+
+        for _ in range(generations):
+            for lo, hi in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+                for win_tallies, played_tallies in _run(pool, _play_chunk, lo, hi, workers):
+                    for rule in UpdateRule:
+                        update_rules_win_rates[rule] += int(win_tallies[rule.value])
+                        update_rules_played[rule] += int(played_tallies[rule.value])
+
+                batch = edges[lo:hi]
+                shared.arrays["won"][:hi - lo] = won_rounds(shared_players, batch[:, 0], batch[:, 1], pay_off_table)
+                shared.arrays["uniforms"][:hi - lo] = rng.random((hi - lo, 4))
+                old_strategies = shared_players.strategy[batch]
+                old_rules = shared_players.update_rule[batch]
+                # the row players update first, so the column players see their new strategies and rules
+                for side in (0, 1):
+                    decisions = _run(pool, partial(_decide_chunk, side=side), lo, hi, workers)
+                    new_strategies, new_rules = (np.concatenate(parts) for parts in zip(*decisions))
+                    shared_players.strategy[batch[:, side]] = new_strategies
+                    shared_players.update_rule[batch[:, side]] = new_rules
+                tracker.record_games(old_strategies, shared_players.strategy[batch], old_rules,
+                                     shared_players.update_rule[batch])
+                if monitor is not None and hi < offsets[-1] and monitor.out_of_time():
+                    break
+            if monitor is not None and (monitor.reason is not None or monitor.generation_done()):
+                break
+            if checkpointer is not None:
+                checkpointer.maybe_save()
+
+        for name, column in players.columns().items():
+            column[...] = shared.arrays[name]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _worker_state.clear()
+        if checkpointer is not None:
+            checkpointer.players = players
+        shared_players = None
+        shared.close(unlink=True)
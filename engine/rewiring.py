@@ -0,0 +1,52 @@
+from adjacency import DynamicAdjacency
+from player import PlayerStore
+from rng import random, randrange
+from strategy import Strategy
+
+# where a player who cuts a tie looks for a new partner: anyone, a neighbour of the partner it left,
+# or a node drawn proportionally to its degree
+POLICIES = ("random", "local", "preferential")
+# draws of a new partner before the player keeps the old one
+MAX_ATTEMPTS = 8
+
+
+class Rewiring:
+    """ After a pair played, a player whose partner is a defector cuts the tie with `probability` and
+        connects to a new partner found by the policy. The row player is asked first, an edge is rewired at
+        most once per visit; a defector on its last edge is never left isolated."""
+
+    def __init__(self, network: DynamicAdjacency, probability: float, policy: str = "local"):
+        if policy not in POLICIES:
+            raise ValueError("Unknown rewiring policy: {}".format(policy))
+        self.network = network
+        self.probability = probability
+        self.policy = policy
+
+    def _candidate(self, player: int, partner: int) -> int:
+        network = self.network
+        if self.policy == "local":
+            return network.random_neighbour(partner)
+        if self.policy == "preferential":
+            return network.edge(network.random_edge())[randrange(2)]
+        return randrange(network.n)
+
+    def new_partner(self, player: int, partner: int) -> int:
+        """ A node other than the player and its neighbours, -1 if none turned up """
+        for _ in range(MAX_ATTEMPTS):
+            candidate = self._candidate(player, partner)
+            if candidate >= 0 and candidate != player and not self.network.has_edge(player, candidate):
+                return candidate
+        return -1
+
+    def after_round(self, edge: int, players: PlayerStore) -> bool:
+        network = self.network
+        for player, partner in (network.edge(edge), network.edge(edge)[::-1]):
+            if players.strategy[partner] != Strategy.DEFECT.value or network.node_degree(partner) < 2:
+                continue
+            if random() >= self.probability:
+                continue
+            new = self.new_partner(player, partner)
+            if new >= 0:
+                network.rewire(edge, partner, new)
+                return True
+        return False
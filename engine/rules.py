@@ -0,0 +1,92 @@
+import numpy as np
+from adjacency import CSRAdjacency
+from player import PlayerStore
+from rules import RULES
+from rules.builtin import average_pay_offs
+from strategy import Strategy, UpdateRule, UPDATE_RULES, BUILT_IN_RULES
+
+
+def decide_updates(players: PlayerStore,
+                   adjacency: CSRAdjacency,
+                   nodes: np.ndarray,
+                   opponents: np.ndarray,
+                   won_round: np.ndarray,
+                   uniforms: np.ndarray,
+                   comp_prob,
+                   d_max: float,
+                   K: float,
+                   change_update_rule: bool,
+                   opponent_strategies: np.ndarray = None,
+                   opponent_rules: np.ndarray = None):
+    """ Vectorized update_strategy: new strategies and update rules of `nodes` after playing `opponents`.
+        uniforms: (len(nodes), 2) draws, the first for the rule decision, the second for the logit neighbour.
+        The built-in rules are decided inline, one mask per rule; the nodes of any other registered rule by
+        one call to its decide() per rule.
+        Reads the current state of `players` only, the caller applies the returned arrays."""
+    if opponent_strategies is None:
+        opponent_strategies = players.strategy[opponents]
+    if opponent_rules is None:
+        opponent_rules = players.update_rule[opponents]
+    current_rules = players.update_rule[nodes]
+    strategies = players.strategy[nodes].copy()
+    adopted_rules = np.full(len(nodes), -1, dtype=np.int64)
+    decision_uniforms = uniforms[:, 0]
+
+    if not isinstance(comp_prob, str):
+        selected = np.flatnonzero((current_rules == UpdateRule.RANDOM.value) & ~won_round)
+        drawn = np.where(decision_uniforms[selected] < comp_prob, Strategy.COOPERATION.value, Strategy.DEFECT.value)
+        flipped = selected[drawn != strategies[selected]]
+        strategies[selected] = drawn
+        adopted_rules[flipped] = opponent_rules[flipped]
+
+    selected = np.flatnonzero(((current_rules == UpdateRule.ADAPT.value) & ~won_round) |
+                              (current_rules == UpdateRule.TIT_FOR_TAT.value))
+    strategies[selected] = opponent_strategies[selected]
+    adopted_rules[selected] = opponent_rules[selected]
+
+    selected = np.flatnonzero(current_rules == UpdateRule.REPLICATOR_DYNAMICS.value)
+    if len(selected):
+        player_rounds = players.rounds_played[nodes[selected]]
+        opponent_rounds = players.rounds_played[opponents[selected]]
+        g_i = average_pay_offs(players, nodes[selected]) / np.maximum(player_rounds, 1)
+        g_j = average_pay_offs(players, opponents[selected]) / np.maximum(opponent_rounds, 1)
+        replicator_values = (g_i - g_j) / d_max
+        adopt = (g_i < g_j) & (decision_uniforms[selected] < replicator_values)
+        strategies[selected[adopt]] = opponent_strategies[selected[adopt]]
+
+    selected = np.flatnonzero((current_rules == UpdateRule.BEST_TAKES_OVER.value) & ~won_round)
+    if len(selected):
+        best = adjacency.neighbour_argmax(players.pay_off_sum, nodes[selected])
+        best_pay_offs = players.pay_off_sum[np.maximum(best, 0)]
+        best = np.where((best >= 0) & (0 < best_pay_offs), best, nodes[selected])
+        strategies[selected] = players.strategy[best]
+        adopted_rules[selected] = players.update_rule[best]
+
+    selected = np.flatnonzero(current_rules == UpdateRule.LOGIT_REPLICATOR_DYNAMICS.value)
+    if len(selected):
+        neighbours = adjacency.random_neighbours(nodes[selected], uniforms[selected, 1])
+        has_played = neighbours >= 0
+        has_played[has_played] = players.rounds_played[neighbours[has_played]] > 0
+        selected, neighbours = selected[has_played], neighbours[has_played]
+        player_avg_pay_offs = average_pay_offs(players, nodes[selected])
+        neighbour_avg_pay_offs = average_pay_offs(players, neighbours)
+        with np.errstate(over="ignore"):
+            change_probs = 1 / (1 + np.exp(-1 * (neighbour_avg_pay_offs - player_avg_pay_offs) / K))
+        adopt = decision_uniforms[selected] <= change_probs
+        strategies[selected[adopt]] = players.strategy[neighbours[adopt]]
+        adopted_rules[selected[adopt]] = players.update_rule[neighbours[adopt]]
+
+    if len(UPDATE_RULES) > BUILT_IN_RULES:
+        for value in np.unique(current_rules[current_rules >= BUILT_IN_RULES]).tolist():
+            group = np.flatnonzero(current_rules == value)
+            selected, new_strategies, new_rules = RULES[UPDATE_RULES[value]].decide(
+                players, adjacency, nodes[group], opponents[group], won_round[group], uniforms[group],
+                opponent_strategies[group], opponent_rules[group], comp_prob, d_max, K)
+            strategies[group[selected]] = new_strategies
+            adopted_rules[group[selected]] = new_rules
+
+    rules = current_rules.copy()
+    if change_update_rule:
+        adopted = adopted_rules >= 0
+        rules[adopted] = adopted_rules[adopted]
+    return strategies, rules
@@ -0,0 +1,120 @@
+import numpy as np
+from adjacency import CSRAdjacency
+from checkpoint import Checkpointer
+from convergence import ConvergenceMonitor
+from engine.rules import decide_updates
+from player import PlayerStore
+from population import PopulationTracker
+from strategy import Strategy, UpdateRule
+
+
+def _add_rule_tallies(tallies: dict, per_rule: np.ndarray):
+    for rule in UpdateRule:
+        tallies[rule] += int(per_rule[rule.value])
+
+
+def play_generation(adjacency: CSRAdjacency,
+                    players: PlayerStore,
+                    pay_off_table: np.ndarray,
+                    rounds: int,
+                    comp_prob,
+                    d_max: float,
+                    K: float,
+                    change_update_rule: bool,
+                    update_rules_win_rates: dict,
+                    update_rules_played: dict,
+                    tracker: PopulationTracker,
+                    rng: np.random.Generator):
+    """ Every player plays `rounds` rounds with all of its neighbours, then all players update at once.
+        On every edge the node with the smaller id is the row player, as in the edge order of the other engines."""
+    strategies = players.strategy.astype(np.int64)
+    degree = adjacency.degree
+    # [own strategy, opponent strategy] as the row player and as the column player
+    table = pay_off_table.reshape(len(Strategy), len(Strategy), 2)
+    as_row, row_opponent = table[:, :, 0], table[:, :, 1]
+    as_column, column_opponent = table[:, :, 1].T, table[:, :, 0].T
+    defecting_higher, defecting_lower = adjacency.dot_split((strategies == Strategy.DEFECT.value).astype(np.float64))
+    higher = np.bincount(adjacency.rows[adjacency.upper], minlength=adjacency.n)
+    higher_counts = np.column_stack((higher - defecting_higher, defecting_higher))
+    lower_counts = np.column_stack((degree - higher - defecting_lower, defecting_lower))
+
+    def per_player(row_values: np.ndarray, column_values: np.ndarray) -> np.ndarray:
+        return (higher_counts * row_values[strategies]).sum(axis=1) + \
+            (lower_counts * column_values[strategies]).sum(axis=1)
+
+    won_as_row, won_as_column = as_row > row_opponent, as_column > column_opponent
+    pay_offs = per_player(as_row, as_column)
+    wins = per_player(won_as_row, won_as_column).astype(np.int64)
+    wins_or_ties = per_player(as_row >= row_opponent, as_column >= column_opponent)
+
+    players.pay_off_sum += rounds * pay_offs
+    players.rounds_played += rounds * degree
+    players.rounds_won += rounds * wins
+    players.strategy_win_rate[np.arange(len(players)), strategies] += rounds * wins
+    _add_rule_tallies(update_rules_win_rates,
+                      rounds * np.bincount(players.update_rule, weights=wins_or_ties, minlength=len(UpdateRule)))
+    _add_rule_tallies(update_rules_played,
+                      rounds * np.bincount(players.update_rule, weights=degree, minlength=len(UpdateRule)))
+
+    nodes = np.flatnonzero(degree > 0)
+    uniforms = rng.random((len(nodes), 3))
+    opponents = adjacency.random_neighbours(nodes, uniforms[:, 0])
+    node_strategies, opponent_strategies = strategies[nodes], strategies[opponents]
+    won_round = np.where(nodes < opponents, won_as_row[node_strategies, opponent_strategies],
+                         won_as_column[node_strategies, opponent_strategies])
+    new_strategies, new_rules = decide_updates(
+        players,
+        adjacency,
+        nodes,
+        opponents,
+        won_round,
+        uniforms[:, 1:],
+        comp_prob,
+        d_max,
+        K,
+        change_update_rule
+    )
+    tracker.strategies_changed(players.strategy[nodes], new_strategies)
+    tracker.rules_changed(players.update_rule[nodes], new_rules)
+    players.strategy[nodes] = new_strategies
+    players.update_rule[nodes] = new_rules
+    tracker.record()
+
+
+def run_synchronous(adjacency: CSRAdjacency,
+                    players: PlayerStore,
+                    pay_off_table: np.ndarray,
+                    rounds: int,
+                    generations: int,
+                    comp_prob,
+                    d_max: float,
+                    K: float,
+                    change_update_rule: bool,
+                    update_rules_win_rates: dict,
+                    update_rules_played: dict,
+                    tracker: PopulationTracker,
+                    rng: np.random.Generator = None,
+                    monitor: ConvergenceMonitor = None,
+                    checkpointer: Checkpointer = None):
+    """ Up to `generations` generations, fewer if the monitor finds the population converged """
+    if rng is None:
+        rng = np.random.default_rng()
+    for _ in range(generations):
+        play_generation(
+            adjacency,
+            players,
+            pay_off_table,
+            rounds,
+            comp_prob,
+            d_max,
+            K,
+            change_update_rule,
+            update_rules_win_rates,
+            update_rules_played,
+            tracker,
+            rng
+        )
+        if monitor is not None and monitor.generation_done():
+            break
+        if checkpointer is not None:
+            checkpointer.maybe_save()
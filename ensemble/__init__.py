@@ -0,0 +1,161 @@
+import json
+import multiprocessing
+import os
+import sys
+import numpy as np
+from simulation import run_simulation
+from strategy import UpdateRule
+from sweep import replica_graph_seed, replica_seed
+
+DEFAULT_BINS = 64
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def columns() -> list:
+    """ Columns of the per step values: the competitive ratio, then the ratio of every update rule """
+    return ["competitive_ratio"] + ["rule_" + rule.name for rule in UpdateRule]
+
+
+class EnsembleStatistics:
+    """ Per step statistics over replicas, updated one replica at a time, O(steps) memory whatever the replica count:
+        Welford mean and variance of every column, a fixed bin histogram of the competitive ratio per step for
+        the quantiles and histograms of the final strategy and update rule mixes.
+
+        A replica that stopped early, e.g. in an absorbing state, keeps its final state for the later steps."""
+
+    def __init__(self, bins: int = DEFAULT_BINS, stride: int = 1):
+        self.bins = bins
+        self.stride = stride
+        self.count = 0
+        self.mean = np.zeros((0, len(columns())))
+        self.m2 = np.zeros((0, len(columns())))
+        self.histogram = np.zeros((0, bins), dtype=np.uint32)
+        # final values of every replica so far, to extend the steps when a longer replica comes in
+        self.finals = np.zeros((0, len(columns())))
+
+    def __len__(self) -> int:
+        return len(self.mean)
+
+    def _bin(self, ratios: np.ndarray) -> np.ndarray:
+        return np.minimum((ratios * self.bins).astype(np.int64), self.bins - 1)
+
+    def _extend(self, steps: int):
+        added = steps - len(self)
+        if self.count:
+            mean = self.finals.mean(axis=0)
+            m2 = ((self.finals - mean) ** 2).sum(axis=0)
+            histogram = np.bincount(self._bin(self.finals[:, 0]), minlength=self.bins).astype(np.uint32)
+        else:
+            mean = m2 = np.zeros(len(columns()))
+            histogram = np.zeros(self.bins, dtype=np.uint32)
+        self.mean = np.concatenate((self.mean, np.tile(mean, (added, 1))))
+        self.m2 = np.concatenate((self.m2, np.tile(m2, (added, 1))))
+        self.histogram = np.concatenate((self.histogram, np.tile(histogram, (added, 1))))
+
+    def _update(self, start: int, values: np.ndarray):
+        end = start + len(values)
+        delta = values - self.mean[start:end]
+        self.mean[start:end] += delta / self.count
+        self.m2[start:end] += delta * (values - self.mean[start:end])
+        rows = np.arange(start, end)
+        np.add.at(self.histogram, (rows, self._bin(values[:, 0])), 1)
+
+    def add(self, values: np.ndarray):
+        """ One replica's (steps, len(columns())) values """
+        if len(values) > len(self):
+            self._extend(len(values))
+        self.count += 1
+        self._update(0, values)
+        if len(values) < len(self):
+            self._update(len(values), np.tile(values[-1], (len(self) - len(values), 1)))
+        self.finals = np.vstack((self.finals, values[-1]))
+
+    @property
+    def steps(self) -> np.ndarray:
+        return np.arange(len(self)) * self.stride
+
+    def variance(self) -> np.ndarray:
+        return self.m2 / (self.count - 1) if self.count > 1 else np.zeros_like(self.m2)
+
+    def confidence_interval(self, z: float = 1.96) -> np.ndarray:
+        """ Half width of the normal confidence interval of the mean, per step and column """
+        return z * np.sqrt(self.variance() / max(self.count, 1))
+
+    def quantiles(self, quantiles=QUANTILES) -> np.ndarray:
+        """ (steps, len(quantiles)) competitive ratio quantiles, interpolated inside the histogram bins """
+        cumulative = np.cumsum(self.histogram, axis=1, dtype=np.int64)
+        result = np.empty((len(self), len(quantiles)))
+        for column, q in enumerate(quantiles):
+            target = q * self.count
+            index = np.minimum(np.argmax(cumulative >= target, axis=1), self.bins - 1)
+            rows = np.arange(len(self))
+            before = np.where(index > 0, cumulative[rows, index - 1], 0)
+            inside = np.maximum(self.histogram[rows, index], 1)
+            result[:, column] = (index + np.clip((target - before) / inside, 0, 1)) / self.bins
+        return result
+
+    def final_histograms(self) -> np.ndarray:
+        """ (len(columns()), bins) histograms of the final values over the replicas """
+        return np.stack([np.bincount(self._bin(self.finals[:, column]), minlength=self.bins)
+                         for column in range(len(columns()))])
+
+
+def _run_replica(job) -> np.ndarray:
+    config, seed = job
+    settings = dict(config["SIMULATION"], seed=seed)
+    result = run_simulation({"SIMULATION": settings})
+    ratios, rule_counts = [], []
+    for _, chunk_ratios, chunk_rule_counts in result.recorder.iter_chunks():
+        ratios.append(chunk_ratios)
+        rule_counts.append(chunk_rule_counts)
+    size = len(result.players)
+    return np.column_stack((np.concatenate(ratios), np.concatenate(rule_counts) / size))
+
+
+def run_ensemble(config: dict, replicas: int, seed: int = 0, processes: int = 1, bins: int = DEFAULT_BINS,
+                 vary_graph: bool = False) -> EnsembleStatistics:
+    """ Runs the config `replicas` times with seeds derived from `seed` and folds every replica into the statistics
+        as soon as it is done. Replicas play on the same network unless vary_graph."""
+    settings = dict(config["SIMULATION"], record_directory=None, checkpoint_directory=None)
+    if processes > 1:
+        settings["workers"] = 1
+    jobs = [({"SIMULATION": dict(settings, graph_seed=replica_graph_seed(settings["graph_seed"], seed, replica,
+                                                                         vary_graph))},
+             replica_seed(seed, replica)) for replica in range(replicas)]
+    statistics = EnsembleStatistics(bins, settings["record_stride"])
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.imap(_run_replica, jobs)
+            for done, values in enumerate(results, 1):
+                statistics.add(values)
+                print("{}/{} replicas done".format(done, replicas), file=sys.stderr)
+    else:
+        for done, job in enumerate(jobs, 1):
+            statistics.add(_run_replica(job))
+            print("{}/{} replicas done".format(done, replicas), file=sys.stderr)
+    return statistics
+
+
+def write_ensemble(directory: str, config: dict, statistics: EnsembleStatistics, **details) -> str:
+    """ ensemble.npz with the per step statistics and the final histograms, ensemble.json with the config """
+    os.makedirs(directory, exist_ok=True)
+    np.savez(
+        os.path.join(directory, "ensemble.npz"),
+        steps=statistics.steps,
+        mean=statistics.mean,
+        variance=statistics.variance(),
+        confidence_interval=statistics.confidence_interval(),
+        quantiles=statistics.quantiles(),
+        final_histograms=statistics.final_histograms()
+    )
+    run = {
+        "config": config,
+        "replicas": statistics.count,
+        "columns": columns(),
+        "quantiles": list(QUANTILES),
+        "bins": statistics.bins
+    }
+    run.update(details)
+    with open(os.path.join(directory, "ensemble.json"), "w") as f:
+        json.dump(run, f, indent=2)
+    return directory
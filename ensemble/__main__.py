@@ -0,0 +1,53 @@
+import time
+START = time.perf_counter()
+
+import argparse
+import os
+import sys
+from config_schema import schema
+from schema import SchemaError
+import yaml
+from ensemble import run_ensemble, write_ensemble
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Many replicas of one config, aggregated step by step")
+    parser.add_argument("--config", default="./config.yaml", help="path of the config file")
+    parser.add_argument("--replicas", type=int, default=100, help="number of runs")
+    parser.add_argument("--seed", type=int, default=0, help="seed the replica seeds are derived from")
+    parser.add_argument("--processes", type=int, default=1, help="replicas run at the same time")
+    parser.add_argument("--bins", type=int, default=64, help="histogram bins of the quantile sketches")
+    parser.add_argument("--vary-graph", action="store_true", help="a new network for every replica")
+    parser.add_argument("--headless", action="store_true", help="no plot windows, statistics go to --output")
+    parser.add_argument("--figures", choices=("png", "svg"),
+                        help="write the figures to --output in this format instead of showing them")
+    parser.add_argument("--output", default="./ensemble_output", help="directory of the statistics and figures")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    with open(arguments.config, "r") as f:
+        config = yaml.safe_load(f)
+    try:
+        config["SIMULATION"] = schema.validate(config["SIMULATION"])
+    except SchemaError as e:
+        sys.exit(str(e))
+
+    simulation_start = time.perf_counter()
+    statistics = run_ensemble(config, arguments.replicas, arguments.seed, arguments.processes, arguments.bins,
+                              arguments.vary_graph)
+    simulation_time = time.perf_counter() - simulation_start
+    print("Ensemble: {} replicas in {:.3f} s".format(statistics.count, simulation_time), file=sys.stderr)
+
+    if arguments.headless or arguments.figures:
+        write_ensemble(arguments.output, config, statistics, seed=arguments.seed,
+                       timings={"cold_start": simulation_start - START, "simulation": simulation_time})
+    if arguments.figures:
+        import matplotlib
+        matplotlib.use("Agg")
+        from plots import save_ensemble_plots
+        save_ensemble_plots(statistics, os.path.join(arguments.output, "figures"), arguments.figures)
+    elif not arguments.headless:
+        from plots import show_ensemble_plots
+        show_ensemble_plots(statistics)
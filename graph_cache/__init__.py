@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+import numpy as np
+from adjacency import CSRAdjacency
+from random_graphs import get_edges_from_name
+
+# bump when the generators or the stored layout change, old entries are then never hit again
+FORMAT_VERSION = 1
+
+_GENERATOR_PARAMETERS = {
+    "erdos_renyi": ("n", "p"),
+    "small_world": ("n", "m", "p"),
+    "barabasi_albert": ("n", "m")
+}
+
+
+# the file hashes a cache directory remembers across processes
+FILE_HASHES = "file_hashes.json"
+# real path -> ([size, mtime_ns], sha256) of the files hashed by this process
+_file_hashes = {}
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_file_hashes(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, FILE_HASHES)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_file_hashes(directory: str, hashes: dict):
+    """ Best effort, a hash that is not remembered is computed again """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".staging-", suffix=".json", delete=False) as f:
+            json.dump(hashes, f)
+        os.replace(f.name, os.path.join(directory, FILE_HASHES))
+    except OSError:
+        pass
+
+
+def file_hash(path: str, directory: str = None) -> str:
+    """ SHA-256 of the file's contents. The hash is remembered by path, size and modification time, in the process
+        and in `directory`'s FILE_HASHES if given, so an unchanged file is only read once."""
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    key = os.path.realpath(path)
+    known = _file_hashes.get(key)
+    if known is not None and known[0] == signature:
+        return known[1]
+    hashes = _read_file_hashes(directory) if directory else {}
+    known = hashes.get(key)
+    if known is not None and known[0] == signature:
+        digest = known[1]
+    else:
+        digest = _sha256(path)
+        if directory:
+            hashes[key] = [signature, digest]
+            _write_file_hashes(directory, hashes)
+    _file_hashes[key] = (signature, digest)
+    return digest
+
+
+def graph_key(name: str, n, p, m, pajek_path, seed, directory: str = None) -> Optional[str]:
+    """ Content address of a network: generator name, its parameters and seed, or the hash of the Pajek file.
+        None when the network is not reproducible, i.e. generated without a seed. `directory` remembers the
+        file hashes, see file_hash."""
+    if name == "pajek":
+        description = {"name": name, "file": file_hash(pajek_path, directory)}
+    elif seed is None or name not in _GENERATOR_PARAMETERS:
+        return None
+    else:
+        values = {"n": n, "p": p, "m": m}
+        description = {"name": name, "seed": seed}
+        description.update({parameter: values[parameter] for parameter in _GENERATOR_PARAMETERS[name]})
+    description["version"] = FORMAT_VERSION
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+class GraphCache:
+    """ CSR adjacencies as .npy files, one directory per key, loaded memory mapped.
+        Least recently used entries are evicted above max_bytes."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str) -> Optional[CSRAdjacency]:
+        entry = self._entry(key)
+        try:
+            indptr = np.load(os.path.join(entry, "indptr.npy"), mmap_mode="r")
+            indices = np.load(os.path.join(entry, "indices.npy"), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(entry)
+        return CSRAdjacency(indptr, indices)
+
+    def store(self, key: str, adjacency: CSRAdjacency):
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=".staging-")
+        try:
+            np.save(os.path.join(staging, "indptr.npy"), adjacency.indptr)
+            np.save(os.path.join(staging, "indices.npy"), adjacency.indices)
+            try:
+                os.rename(staging, self._entry(key))
+            except OSError:
+                # stored by someone else in the meantime
+                shutil.rmtree(staging, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep: str = None):
+        """ Removes the least recently used entries until the cache fits max_bytes, never the entry `keep`, e.g.
+            the one just stored even if it is larger than max_bytes on its own """
+        entries = []
+        for name in os.listdir(self.directory):
+            entry = self._entry(name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, entry, name == keep))
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, entry, kept in sorted(entries):
+            if kept:
+                continue
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def get_adjacency(name: str, n, p, m, pajek_path, seed, generator: np.random.Generator = None,
+                  cache: GraphCache = None) -> CSRAdjacency:
+    key = graph_key(name, n, p, m, pajek_path, seed, cache.directory) if cache is not None else None
+    if key is not None:
+        adjacency = cache.load(key)
+        if adjacency is not None:
+            return adjacency
+    n, edges = get_edges_from_name(name, n, p, m, pajek_path, generator)
+    adjacency = CSRAdjacency.from_edges(n, edges)
+    if key is not None:
+        cache.store(key, adjacency)
+    return adjacency
@@ -0,0 +1,287 @@
+import functools
+import importlib
+import json
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Callable, Optional
+import numpy as np
+from strategy import UpdateRule
+
+# the edge counter only looks at the clock this often
+PROGRESS_CHECK_EDGES = 1024
+
+
+class Timer:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed: float):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "total": self.total, "max": self.max,
+                "mean": self.total / self.calls if self.calls else 0.0}
+
+
+class RuleCounters(Timer):
+    __slots__ = ("strategy_flips", "rule_changes")
+
+    def __init__(self):
+        super().__init__()
+        self.strategy_flips = 0
+        self.rule_changes = 0
+
+    def to_dict(self) -> dict:
+        counters = super().to_dict()
+        counters.update(strategy_flips=self.strategy_flips, rule_changes=self.rule_changes)
+        return counters
+
+
+class SamplingProfiler:
+    """ Samples the Python stack of the main thread every `interval` seconds of CPU time (SIGPROF, Unix only).
+        Every sample goes to `hook(frame)` when one is given, otherwise it is counted as a collapsed stack."""
+
+    def __init__(self, interval: float = 0.005, hook: Callable = None):
+        self.interval = interval
+        self.hook = hook
+        self.stacks = Counter()
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        if self.hook is not None:
+            self.hook(frame)
+            return
+        stack = []
+        while frame is not None:
+            stack.append("{}:{}".format(frame.f_globals.get("__name__", "?"), frame.f_code.co_name))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        if not hasattr(signal, "setitimer"):
+            print("Sampling profiler needs signal.setitimer, profiling is off", file=sys.stderr)
+            return
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if self._previous_handler is None:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+        self._previous_handler = None
+
+    def write(self, path: str):
+        """ Collapsed stacks, one 'outer;...;inner count' line each, as flame graph tools read them """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write("{} {}\n".format(stack, count))
+
+
+class Instrumentation:
+    """ Opt-in counters and timers of the simulation hot paths. While installed, the hot path functions are
+        replaced by timed wrappers in the modules that call them; uninstalled, the original functions run
+        untouched, so a run without instrumentation pays nothing for it.
+
+        Timers are inclusive, e.g. simulate_round contains play_rounds, update_strategy and record.
+        With timed=False only the edges are counted, for progress reports at a fraction of the cost."""
+
+    def __init__(self, progress_interval: float = None, progress_file: str = None, timed: bool = True):
+        self.timers = {}
+        self.rules = {rule: RuleCounters() for rule in UpdateRule}
+        self.strategy_flips = 0
+        self.rule_changes = 0
+        self.edges = 0
+        self.expected_edges = None
+        self.progress_interval = progress_interval
+        self.progress_file = progress_file
+        self.timed = timed
+        self._start = None
+        self._last_report = None
+        self._next_check = PROGRESS_CHECK_EDGES
+        self._patched = []
+
+    def timer(self, name: str) -> Timer:
+        return self.timers.setdefault(name, Timer())
+
+    def expect(self, edges: int):
+        """ Total edges of the run, for the ETA """
+        self.expected_edges = edges
+
+    def count_edges(self, edges: int):
+        self.edges += edges
+        if self.progress_interval is not None and self.edges >= self._next_check:
+            self._next_check = self.edges + PROGRESS_CHECK_EDGES
+            now = time.perf_counter()
+            if now - self._last_report >= self.progress_interval:
+                self._last_report = now
+                self.report_progress(now)
+
+    def progress(self, now: float = None) -> dict:
+        elapsed = (now or time.perf_counter()) - self._start
+        throughput = self.edges / elapsed if elapsed > 0 else 0.0
+        eta = (self.expected_edges - self.edges) / throughput \
+            if self.expected_edges is not None and throughput > 0 else None
+        return {"elapsed": elapsed, "edges": self.edges, "expected_edges": self.expected_edges,
+                "edges_per_second": throughput, "eta": eta}
+
+    def report_progress(self, now: float = None):
+        progress = self.progress(now)
+        if self.progress_file is not None:
+            with open(self.progress_file, "a") as f:
+                f.write(json.dumps(progress) + "\n")
+            return
+        eta = "{:.0f} s".format(progress["eta"]) if progress["eta"] is not None else "?"
+        print("{:.1f} s: {} edges, {:.0f} edges/s, ETA {}".format(
+            progress["elapsed"], progress["edges"], progress["edges_per_second"], eta), file=sys.stderr)
+
+    def _patch(self, owner, name: str, wrapper_factory: Callable):
+        if isinstance(owner, str):
+            owner = importlib.import_module(owner)
+        original = getattr(owner, name)
+        setattr(owner, name, functools.wraps(original)(wrapper_factory(original)))
+        self._patched.append((owner, name, original))
+
+    def _timed(self, name: str, edges: Optional[Callable] = None):
+        timer = self.timer(name)
+        clock = time.perf_counter
+
+        def factory(function):
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    timer.add(clock() - start)
+                    if edges is not None:
+                        self.count_edges(edges(*args, **kwargs))
+            return wrapper
+        return factory
+
+    def _counted(self, edges: Callable):
+        def factory(function):
+            def wrapper(*args, **kwargs):
+                result = function(*args, **kwargs)
+                self.count_edges(edges(*args, **kwargs))
+                return result
+            return wrapper
+        return factory
+
+    def _update_strategy(self, function):
+        clock = time.perf_counter
+        rules = self.rules
+
+        def wrapper(network, players, result, *args, **kwargs):
+            player = result.node
+            counters = rules[player.update_rule]
+            strategy, rule = player.strategy, player.update_rule
+            start = clock()
+            try:
+                return function(network, players, result, *args, **kwargs)
+            finally:
+                counters.add(clock() - start)
+                counters.strategy_flips += player.strategy != strategy
+                counters.rule_changes += player.update_rule is not rule
+        return wrapper
+
+    def _strategies_changed(self, function):
+        def wrapper(tracker, old, new):
+            self.strategy_flips += int(np.count_nonzero(np.asarray(old) != np.asarray(new)))
+            return function(tracker, old, new)
+        return wrapper
+
+    def _rules_changed(self, function):
+        def wrapper(tracker, old, new):
+            self.rule_changes += int(np.count_nonzero(np.asarray(old) != np.asarray(new)))
+            return function(tracker, old, new)
+        return wrapper
+
+    def install(self):
+        from population import PopulationTracker
+        self._start = self._last_report = time.perf_counter()
+        if not self.timed:
+            self._patch("engine.asynchronous", "simulate_round", self._counted(lambda *a, **k: 1))
+            self._patch("engine.synchronous", "play_generation",
+                        self._counted(lambda adjacency, *a, **k: adjacency.number_of_edges()))
+            self._patch("engine.parallel", "_run", self._run)
+            return self
+        self._patch("engine.asynchronous", "simulate_round", self._timed("simulate_round", lambda *a, **k: 1))
+        self._patch("engine.asynchronous", "play_rounds", self._timed("play_rounds"))
+        self._patch("engine.asynchronous", "update_strategy", self._update_strategy)
+        self._patch("utilities", "play_a_round", self._timed("play_a_round"))
+        self._patch("engine.synchronous", "play_generation",
+                    self._timed("play_generation", lambda adjacency, *a, **k: adjacency.number_of_edges()))
+        self._patch("engine.synchronous", "decide_updates", self._timed("decide_updates"))
+        self._patch("engine.parallel", "_run", self._run)
+        self._patch(PopulationTracker, "record", self._timed("record"))
+        self._patch(PopulationTracker, "strategy_changed", self._strategies_changed)
+        self._patch(PopulationTracker, "strategies_changed", self._strategies_changed)
+        self._patch(PopulationTracker, "rule_changed", self._rules_changed)
+        self._patch(PopulationTracker, "rules_changed", self._rules_changed)
+        return self
+
+    def _run(self, function):
+        # the parallel engine's pool phases, timed in the parent by task
+        clock = time.perf_counter
+
+        def wrapper(pool, task, lo, hi, workers):
+            # the decide phase runs a functools.partial of _decide_chunk
+            name = getattr(task, "func", task).__name__
+            timer = self.timer("pool" + name)
+            start = clock()
+            try:
+                return function(pool, task, lo, hi, workers)
+            finally:
+                timer.add(clock() - start)
+                if name == "_play_chunk":
+                    self.count_edges(hi - lo)
+        return wrapper
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched.clear()
+
+    def __enter__(self) -> "Instrumentation":
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    def to_dict(self) -> dict:
+        return {
+            "timers": {name: timer.to_dict() for name, timer in self.timers.items() if timer.calls},
+            "update_rules": {rule.name: counters.to_dict() for rule, counters in self.rules.items()
+                             if counters.calls},
+            "strategy_flips": self.strategy_flips,
+            "rule_changes": self.rule_changes,
+            "progress": self.progress()
+        }
+
+    def summary(self) -> str:
+        lines = ["{:<44} {:>10} {:>12} {:>12}".format("", "calls", "total s", "max ms")]
+        for name, timer in sorted(self.timers.items(), key=lambda item: -item[1].total):
+            if timer.calls:
+                lines.append("{:<44} {:>10} {:>12.4f} {:>12.3f}".format(name, timer.calls, timer.total,
+                                                                     timer.max * 1000))
+        for rule, counters in self.rules.items():
+            if counters.calls:
+                lines.append("{:<44} {:>10} {:>12.4f} {:>12.3f}  {} flips, {} rule changes".format(
+                    "update_strategy " + rule.name, counters.calls, counters.total, counters.max * 1000,
+                    counters.strategy_flips, counters.rule_changes))
+        lines.append("strategy flips: {}, rule changes: {}, edges: {}".format(
+            self.strategy_flips, self.rule_changes, self.edges))
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
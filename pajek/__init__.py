@@ -1,6 +1,9 @@
-from typing import Any, Optional
+from typing import Any, Optional, List, Tuple, Iterable
 from networkx import Graph
 import networkx as nx
+import numpy as np
+
+CHUNK_LINES = 1 << 16
 
 
 def read_pajek(path: str) -> Any:
@@ -9,3 +12,99 @@ def read_pajek(path: str) -> Any:
 
 def write_pajek(_g: Graph, path: str) -> Optional[Any]:
     return nx.write_pajek(_g, path)
+
+
+def _parse_edge_lines(lines: List[str], as_lists: bool) -> np.ndarray:
+    if as_lists:
+        pairs = [(tokens[0], target) for tokens in (line.split() for line in lines) for target in tokens[1:]]
+    else:
+        pairs = [line.split(None, 2)[:2] for line in lines]
+    try:
+        # pajek vertex ids are 1-based
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2) - 1
+    except ValueError:
+        raise ValueError("Only numeric vertex ids are supported in edge sections")
+
+
+def _parse_label(rest: str) -> str:
+    if rest.startswith('"'):
+        end = rest.find('"', 1)
+        return rest[1:end] if end > 0 else rest[1:]
+    return rest.split()[0]
+
+
+def read_pajek_edges(path: str, with_labels: bool = False, chunk_lines: int = CHUNK_LINES) \
+        -> Tuple[int, np.ndarray, Optional[List[str]]]:
+    """ Streams a Pajek .net file into the node count, a (E, 2) array of 0-based node ids and,
+        if asked for, the vertex labels. *Edges, *Arcs and their list forms are read as undirected edges."""
+    n = 0
+    labels = [] if with_labels else None
+    chunks = []
+    section = None
+    pending = []
+
+    def flush():
+        if pending:
+            chunks.append(_parse_edge_lines(pending, section in ("*edgeslist", "*arcslist")))
+            pending.clear()
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("%"):
+                continue
+            if line.startswith("*"):
+                flush()
+                header = line.split()
+                section = header[0].lower()
+                if section == "*vertices":
+                    n = int(header[1])
+                    if with_labels:
+                        labels = [str(i + 1) for i in range(n)]
+                elif section == "*matrix":
+                    raise ValueError("Pajek *Matrix sections are not supported")
+                continue
+            if section == "*vertices":
+                if with_labels:
+                    tokens = line.split(None, 1)
+                    if len(tokens) > 1:
+                        labels[int(tokens[0]) - 1] = _parse_label(tokens[1])
+            elif section in ("*edges", "*arcs", "*edgeslist", "*arcslist"):
+                pending.append(line)
+                if len(pending) >= chunk_lines:
+                    flush()
+        flush()
+
+    edges = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    if len(edges):
+        n = max(n, int(edges.max()) + 1)
+    return n, edges, labels
+
+
+def _format_label(label: str) -> str:
+    if not label or '"' in label or any(c.isspace() for c in label):
+        return '"{}"'.format(label.replace('"', "'"))
+    return label
+
+
+def write_pajek_edges(path: str, n: int, edges: np.ndarray, labels: Iterable[str] = None,
+                      chunk_size: int = CHUNK_LINES):
+    """ Writes a Pajek .net file from 0-based node ids, in chunks and without a networkx graph. Without labels
+        the vertices are labelled by their 1-based Pajek id, as read_pajek_edges assumes."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("*vertices {}\n".format(n))
+        if labels is None:
+            labels = (str(i + 1) for i in range(n))
+        for node_id, label in enumerate(labels):
+            f.write("{} {} 0.0 0.0 ellipse\n".format(node_id + 1, _format_label(label)))
+        f.write("*edges\n")
+        for start in range(0, len(edges), chunk_size):
+            np.savetxt(f, np.asarray(edges[start:start + chunk_size]) + 1, fmt="%d %d 1.0")
+
+
+def write_pajek_partition(path: str, values: np.ndarray, chunk_size: int = CHUNK_LINES):
+    """ Writes one integer per vertex as a Pajek .clu partition, e.g. the final strategies of the players """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("*vertices {}\n".format(len(values)))
+        for start in range(0, len(values), chunk_size):
+            np.savetxt(f, np.asarray(values[start:start + chunk_size]), fmt="%d")
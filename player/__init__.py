@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from strategy import UpdateRule
+from player.store import PlayerStore, PlayerView, StrategyWinRateView, PLAYER_COLUMNS
 
 
 @dataclass
@@ -0,0 +1,133 @@
+from typing import Iterator
+import numpy as np
+from strategy import Strategy, UpdateRule, UPDATE_RULES
+
+_STRATEGIES = tuple(Strategy)
+PLAYER_COLUMNS = ("strategy", "update_rule", "pay_off_sum", "rounds_played", "rounds_won", "strategy_win_rate")
+
+
+class PlayerStore:
+    """ Column store of every player, indexed by node id """
+
+    def __init__(self, size: int):
+        self.strategy = np.zeros(size, dtype=np.int8)
+        self.update_rule = np.zeros(size, dtype=np.int8)
+        self.pay_off_sum = np.zeros(size, dtype=np.float64)
+        self.rounds_played = np.zeros(size, dtype=np.int64)
+        self.rounds_won = np.zeros(size, dtype=np.int64)
+        self.strategy_win_rate = np.zeros((size, len(Strategy)), dtype=np.int64)
+        # adjacency.NeighbourhoodBest that answers find_most_successful_player, if any
+        self.neighbourhood_best = None
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> "PlayerStore":
+        """ Store on top of existing column arrays, e.g. views of shared memory """
+        players = cls.__new__(cls)
+        for name in PLAYER_COLUMNS:
+            setattr(players, name, columns[name])
+        players.neighbourhood_best = None
+        return players
+
+    def columns(self) -> dict:
+        return {name: getattr(self, name) for name in PLAYER_COLUMNS}
+
+    def copy(self) -> "PlayerStore":
+        """ Independent copy of the columns, without the neighbourhood_best index """
+        return PlayerStore.from_columns({name: column.copy() for name, column in self.columns().items()})
+
+    def __len__(self) -> int:
+        return len(self.strategy)
+
+    def __getitem__(self, node_id: int) -> "PlayerView":
+        if node_id < 0 or node_id >= len(self.strategy):
+            raise IndexError("player with id not found: {}".format(node_id))
+        return PlayerView(self, node_id)
+
+    def __iter__(self) -> Iterator["PlayerView"]:
+        return (PlayerView(self, node_id) for node_id in range(len(self.strategy)))
+
+
+class StrategyWinRateView:
+    """ Dict-like access to one row of PlayerStore.strategy_win_rate, keyed by Strategy """
+    __slots__ = ("_row",)
+
+    def __init__(self, row: np.ndarray):
+        self._row = row
+
+    def __getitem__(self, strategy: Strategy) -> int:
+        return int(self._row[strategy.value])
+
+    def __setitem__(self, strategy: Strategy, value: int):
+        self._row[strategy.value] = value
+
+    def keys(self):
+        return _STRATEGIES
+
+    def values(self):
+        return [int(v) for v in self._row]
+
+    def items(self):
+        return [(s, int(self._row[s.value])) for s in _STRATEGIES]
+
+
+class PlayerView:
+    """ Attribute access to a single player of a PlayerStore, mirrors the Player dataclass """
+    __slots__ = ("_store", "id")
+
+    def __init__(self, store: PlayerStore, node_id: int):
+        self._store = store
+        self.id = node_id
+
+    @property
+    def strategy(self) -> int:
+        return int(self._store.strategy[self.id])
+
+    @strategy.setter
+    def strategy(self, value: int):
+        self._store.strategy[self.id] = value
+
+    @property
+    def update_rule(self) -> UpdateRule:
+        return UPDATE_RULES[self._store.update_rule[self.id]]
+
+    @update_rule.setter
+    def update_rule(self, value: UpdateRule):
+        self._store.update_rule[self.id] = value.value if isinstance(value, UpdateRule) else value
+
+    @property
+    def pay_off_sum(self) -> float:
+        return float(self._store.pay_off_sum[self.id])
+
+    @pay_off_sum.setter
+    def pay_off_sum(self, value: float):
+        self._store.pay_off_sum[self.id] = value
+
+    @property
+    def rounds_played(self) -> int:
+        return int(self._store.rounds_played[self.id])
+
+    @rounds_played.setter
+    def rounds_played(self, value: int):
+        self._store.rounds_played[self.id] = value
+
+    @property
+    def rounds_won(self) -> int:
+        return int(self._store.rounds_won[self.id])
+
+    @rounds_won.setter
+    def rounds_won(self, value: int):
+        self._store.rounds_won[self.id] = value
+
+    @property
+    def strategy_win_rate(self) -> StrategyWinRateView:
+        return StrategyWinRateView(self._store.strategy_win_rate[self.id])
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerView) and other._store is self._store and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self._store), self.id))
+
+    def __repr__(self):
+        return "PlayerView(id={}, strategy={}, update_rule={}, pay_off_sum={})".format(
+            self.id, self.strategy, self.update_rule, self.pay_off_sum)
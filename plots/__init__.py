@@ -1,19 +1,26 @@
+import os
 import random
-from networkx import Graph, nx
+import warnings
 import matplotlib.ticker as ticker
 from strategy import Strategy, get_formatted_rule_name, UpdateRule, get_formatted_name
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from utilities import get_user_by_id
-import pandas as pd
+from plots.network import NetworkLayout, get_layout, draw_network
+from recorder import SeriesRecorder
 
 FIG_SIZE = (8, 6)
+# longer series are thinned out before drawing
+MAX_PLOT_POINTS = 100000
 
 
-def show_plots(original_nodes, graph, nodes, update_rules_win_rates, competitive_ratio_by_games, update_rule_ratios):
-    plot_player_network(graph, original_nodes, "Cooperative and defective players before the game")
-    plot_player_network(graph, nodes, "Cooperative and defective players after the game", False)
+def show_plots(original_nodes, graph, nodes, update_rules_win_rates, competitive_ratio_by_games, update_rule_ratios,
+               layout_cache: str = None, final_graph=None):
+    """ final_graph: the network after the game when it was rewired, drawn on the layout of `graph` """
+    layout = get_layout(graph, layout_cache)
+    plt.figure(figsize=FIG_SIZE)
+    plot_player_network(graph, original_nodes, "Cooperative and defective players before the game", layout=layout)
+    plot_player_network(graph if final_graph is None else final_graph, nodes,
+                        "Cooperative and defective players after the game", False, layout)
     plot_win_ratios(nodes)
     plot_update_rule_win_ratios(update_rules_win_rates)
     plot_competitive_ratios(competitive_ratio_by_games)
@@ -21,51 +28,108 @@ def show_plots(original_nodes, graph, nodes, update_rules_win_rates, competitive
     plt.show()
 
 
-def plot_player_network(graph: Graph, players, title: str, before_plot: bool = True):
-    pos = nx.circular_layout(graph)
-    pos = nx.spring_layout(graph, dim=2, pos=pos)
-    plt.title(title)
-    color_map = []
-    for node in graph:
-        user = get_user_by_id(players, node)
-        if user.strategy == Strategy.COOPERATION.value:
-            color_map.append('darkorange')
-        else:
-            color_map.append('crimson')
-    nx.draw_networkx(graph, pos=pos, node_color=color_map, with_labels=True, node_size=300)
-    cooperative_patch = mpatches.Patch(color='darkorange', label='Cooperative player')
-    defective_patch = mpatches.Patch(color='crimson', label='Defective player')
-    plt.legend(loc='best', handles=[cooperative_patch, defective_patch])
+def save_plots(original_nodes, graph, nodes, update_rules_win_rates, competitive_ratio_by_games, update_rule_ratios,
+               directory: str, figure_format: str = "png", layout_cache: str = None, final_graph=None):
+    """ show_plots without windows, every figure is written to <directory>/<name>.<figure_format> """
+    layout = get_layout(graph, layout_cache)
+    final_graph = graph if final_graph is None else final_graph
+    figures = [
+        ("network_before",
+         lambda: plot_player_network(graph, original_nodes, "Cooperative and defective players before the game", False,
+                                     layout)),
+        ("network_after",
+         lambda: plot_player_network(final_graph, nodes, "Cooperative and defective players after the game", False,
+                                     layout)),
+        ("win_ratios", lambda: plot_win_ratios(nodes)),
+        ("update_rule_win_ratios", lambda: plot_update_rule_win_ratios(update_rules_win_rates)),
+        ("competitive_ratios", lambda: plot_competitive_ratios(competitive_ratio_by_games)),
+        ("update_rule_ratios", lambda: plot_update_rule_ratios(update_rule_ratios))
+    ]
+    return _save_figures(figures, directory, figure_format)
+
+
+def _save_figures(figures, directory: str, figure_format: str):
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    with warnings.catch_warnings():
+        # plt.show(block=False) of the plot functions complains on non-interactive backends
+        warnings.simplefilter("ignore", UserWarning)
+        for name, plot in figures:
+            plt.figure(figsize=FIG_SIZE)
+            plot()
+            figure = plt.gcf()
+            if figure.axes:
+                path = os.path.join(directory, "{}.{}".format(name, figure_format))
+                figure.savefig(path)
+                written.append(path)
+            plt.close("all")
+    return written
+
+
+def plot_player_network(graph, players, title: str, before_plot: bool = True, layout: NetworkLayout = None):
+    """ `graph` is a networkx graph or a CSRAdjacency, pass the same layout for the before and after plots """
+    if layout is None:
+        layout = get_layout(graph)
+    draw_network(graph, players, title, layout)
     if before_plot:
         plt.subplots(figsize=FIG_SIZE)
 
 
+def _competitive_ratio_chunks(competitive_ratio_by_games):
+    if isinstance(competitive_ratio_by_games, SeriesRecorder):
+        return ((steps, ratios) for steps, ratios, _ in competitive_ratio_by_games.iter_chunks())
+    ratios = np.asarray(competitive_ratio_by_games, dtype=np.float64)
+    return iter([(np.arange(len(ratios)), ratios)])
+
+
+def _rule_count_chunks(update_rule_ratios):
+    if isinstance(update_rule_ratios, SeriesRecorder):
+        return ((steps, rule_counts) for steps, _, rule_counts in update_rule_ratios.iter_chunks())
+    rule_counts = np.array([[ratios[rule] for rule in UpdateRule] for ratios in update_rule_ratios]) \
+        .reshape(-1, len(UpdateRule))
+    return iter([(np.arange(len(rule_counts)), rule_counts)])
+
+
+def _thinned(chunks, length: int):
+    """ Every k-th point of the chunks so at most about MAX_PLOT_POINTS are drawn, joined to the previous chunk """
+    step = max(1, -(-length // MAX_PLOT_POINTS))
+    previous = None
+    for x, y in chunks:
+        x, y = x[::step], np.asarray(y[::step])
+        if previous is not None:
+            x, y = np.concatenate((previous[0], x)), np.concatenate((previous[1], y))
+        if len(x):
+            previous = x[-1:], y[-1:]
+        yield x, y
+
+
 def plot_update_rule_ratios(update_rule_ratios):
-    every_update_rule = [e.value for e in UpdateRule]
-    fig, ax = plt.subplots(figsize=FIG_SIZE)
-    rule_rounds = dict()
-    for rule in every_update_rule:
-        rounds = []
-        only_zeros_for_rule = True
-        for ratios in update_rule_ratios:
-            players_for_this_rule = ratios[UpdateRule(rule)]
-            rounds.append(players_for_this_rule)
-            if players_for_this_rule != 0:
-                only_zeros_for_rule = False
-        if not only_zeros_for_rule:
-            rule_rounds.update({rule: rounds})
+    rules = list(UpdateRule)
+    length = 0
+    non_zero = np.zeros(len(rules), dtype=bool)
+    identical = np.ones((len(rules), len(rules)), dtype=bool)
+    for _, rule_counts in _rule_count_chunks(update_rule_ratios):
+        length += len(rule_counts)
+        non_zero |= (rule_counts != 0).any(axis=0)
+        identical &= (rule_counts[:, :, None] == rule_counts[:, None, :]).all(axis=0)
 
+    # rules with the same curve share one line and one label
+    labels = dict()
     displayed_rules = []
-    for rule_round in rule_rounds:
-        r = random.random()
-        b = random.random()
-        g = random.random()
-        color = (r, g, b)
-        plot_data = rule_rounds[rule_round]
-        label, labeled_rules = get_label_for_update_rule(rule_round, rule_rounds)
-        if rule_round not in displayed_rules:
-            ax.plot(plot_data, label=label, c=color)
-        displayed_rules = np.append(displayed_rules, labeled_rules)
+    for rule in rules:
+        if not non_zero[rule.value] or rule.value in displayed_rules:
+            continue
+        same = [r.value for r in rules if non_zero[r.value] and identical[rule.value, r.value]]
+        labels[rule.value] = ", ".join(get_formatted_name(r) for r in same)
+        displayed_rules.extend(same)
+    colors = {rule: (random.random(), random.random(), random.random()) for rule in labels}
+
+    fig, ax = plt.subplots(figsize=FIG_SIZE)
+    first_chunk = True
+    for x, rule_counts in _thinned(_rule_count_chunks(update_rule_ratios), length):
+        for rule, label in labels.items():
+            ax.plot(x, rule_counts[:, rule], label=label if first_chunk else None, c=colors[rule])
+        first_chunk = False
 
     plt.legend(loc='best')
     ax.set(xlabel='Games', ylabel='Number of players',
@@ -75,38 +139,23 @@ def plot_update_rule_ratios(update_rule_ratios):
         axis.set_major_locator(ticker.MaxNLocator(integer=True))
 
 
-def get_label_for_update_rule(rule_round, rule_rounds):
-    plot_data = rule_rounds[rule_round]
-    label = get_formatted_name(rule_round)
-    to_skip = [rule_round]
-    displayed_rules = [rule_round]
-    for r in list(rule_rounds):
-        if r in to_skip:
-            continue
-        data = rule_rounds[r]
-        if np.array_equal(plot_data, data):
-            label += ", " + get_formatted_name(r)
-            to_skip.append(r)
-            displayed_rules.append(r)
-    return label, displayed_rules
-
-
 def plot_competitive_ratios(competitive_ratio_by_games):
-    if len(competitive_ratio_by_games) < 2:
+    length = sum(len(ratios) for _, ratios in _competitive_ratio_chunks(competitive_ratio_by_games))
+    if length < 2:
         return
 
-    N = len(competitive_ratio_by_games)
-    defective_ratios = [1 - x for x in competitive_ratio_by_games]
-    ind = np.arange(N)
     fig, ax = plt.subplots(figsize=FIG_SIZE)
-    width = 0.3
-    df = pd.DataFrame({'x_values': range(0, N), 'Competitive ratio': competitive_ratio_by_games, 'Defective ratio': defective_ratios})
     plt.xlabel('Games')
     plt.ylabel('Ratios')
     plt.title('Competitive ratios over time')
-    ax.plot('x_values', 'Competitive ratio', data=df, marker='', color='darkorange', linewidth=2, label='Competitive ratio')
-    ax.plot('x_values', 'Defective ratio', data=df, marker='', color='crimson', linewidth=2, label='Defective ratio')
-    plt.xticks(ind + width / 2, (n for n in range(N)))
+    first_chunk = True
+    for x, ratios in _thinned(_competitive_ratio_chunks(competitive_ratio_by_games), length):
+        ax.plot(x, ratios, marker='', color='darkorange', linewidth=2,
+                label='Competitive ratio' if first_chunk else None)
+        ax.plot(x, 1 - ratios, marker='', color='crimson', linewidth=2,
+                label='Defective ratio' if first_chunk else None)
+        first_chunk = False
+    ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
     plt.legend(loc='best')
     plt.show(block=False)
 
@@ -181,3 +230,83 @@ def autolabel_count(rects, ax):
                     xytext=(0, 3),
                     textcoords="offset points",
                     ha='center', va='bottom')
+
+
+def _every_kth(length: int) -> slice:
+    return slice(None, None, max(1, -(-length // MAX_PLOT_POINTS)))
+
+
+def plot_ensemble_competitive_ratios(statistics):
+    """ Mean competitive ratio over the replicas with its 95% confidence band and the 5-95% quantile band """
+    if len(statistics) < 2:
+        return
+    rows = _every_kth(len(statistics))
+    x = statistics.steps[rows]
+    mean = statistics.mean[rows, 0]
+    half_width = statistics.confidence_interval()[rows, 0]
+    quantiles = statistics.quantiles((0.05, 0.95))[rows]
+
+    fig, ax = plt.subplots(figsize=FIG_SIZE)
+    ax.fill_between(x, quantiles[:, 0], quantiles[:, 1], color='darkorange', alpha=0.15,
+                    label='5-95% of the replicas')
+    ax.fill_between(x, mean - half_width, mean + half_width, color='darkorange', alpha=0.4,
+                    label='95% confidence interval')
+    ax.plot(x, mean, color='darkorange', linewidth=2, label='Mean competitive ratio')
+    ax.set(xlabel='Games', ylabel='Ratios',
+           title='Competitive ratios over time, {} replicas'.format(statistics.count))
+    ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+    plt.legend(loc='best')
+    plt.show(block=False)
+
+
+def plot_ensemble_update_rule_ratios(statistics):
+    """ Mean ratio of the players of every update rule with its 95% confidence band """
+    if len(statistics) < 2:
+        return
+    rows = _every_kth(len(statistics))
+    x = statistics.steps[rows]
+    half_width = statistics.confidence_interval()
+
+    fig, ax = plt.subplots(figsize=FIG_SIZE)
+    for rule in UpdateRule:
+        mean = statistics.mean[rows, 1 + rule.value]
+        if not mean.any():
+            continue
+        band = half_width[rows, 1 + rule.value]
+        line, = ax.plot(x, mean, label=get_formatted_name(rule))
+        ax.fill_between(x, mean - band, mean + band, color=line.get_color(), alpha=0.3)
+    ax.set(xlabel='Games', ylabel='Ratio of players',
+           title='Update rules during the game, mean of {} replicas'.format(statistics.count))
+    ax.grid()
+    ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+    plt.legend(loc='best')
+
+
+def plot_final_state_histograms(statistics):
+    """ Final competitive and update rule ratios over the replicas """
+    histograms = statistics.final_histograms()
+    edges = np.arange(statistics.bins) / statistics.bins
+    fig, ax = plt.subplots(figsize=FIG_SIZE)
+    ax.bar(edges, histograms[0], width=1 / statistics.bins, align='edge', color='darkorange', alpha=0.8,
+           label='Competitive ratio')
+    for rule in UpdateRule:
+        if histograms[1 + rule.value, 1:].any():
+            ax.step(edges, histograms[1 + rule.value], where='post', label=get_formatted_name(rule))
+    ax.set(xlabel='Final ratio', ylabel='Replicas', title='Final state of {} replicas'.format(statistics.count))
+    ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+    plt.legend(loc='best')
+
+
+def show_ensemble_plots(statistics):
+    plot_ensemble_competitive_ratios(statistics)
+    plot_ensemble_update_rule_ratios(statistics)
+    plot_final_state_histograms(statistics)
+    plt.show()
+
+
+def save_ensemble_plots(statistics, directory: str, figure_format: str = "png"):
+    return _save_figures([
+        ("ensemble_competitive_ratios", lambda: plot_ensemble_competitive_ratios(statistics)),
+        ("ensemble_update_rule_ratios", lambda: plot_ensemble_update_rule_ratios(statistics)),
+        ("ensemble_final_state", lambda: plot_final_state_histograms(statistics))
+    ], directory, figure_format)
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+import networkx as nx
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+from matplotlib.colors import LinearSegmentedColormap
+from adjacency import CSRAdjacency
+from player import PlayerStore
+from random_graphs import edges_to_graph
+from strategy import Strategy
+from utilities import get_user_by_id
+
+COOPERATIVE_COLOR = 'darkorange'
+DEFECTIVE_COLOR = 'crimson'
+# up to this many nodes every node, edge and label is drawn on a spring layout
+FULL_DETAIL_NODES = 1000
+# up to this many nodes a sample of the largest component is drawn as points, edges are hidden
+SAMPLED_NODES = 100000
+SAMPLE_SIZE = 5000
+# above SAMPLED_NODES the cooperative ratio of the largest component is drawn as a hexbin density
+DENSITY_GRID_SIZE = 80
+SPECTRAL_ITERATIONS = 60
+LAYOUT_VERSION = 1
+
+
+@dataclass
+class NetworkLayout:
+    """ Node positions of a network and the level of detail they were computed for.
+        `nodes` are the node ids drawn, `positions` their (len(nodes), 2) coordinates."""
+    mode: str
+    nodes: np.ndarray
+    positions: np.ndarray
+
+
+def as_adjacency(graph) -> CSRAdjacency:
+    if isinstance(graph, CSRAdjacency):
+        return graph
+    return CSRAdjacency.from_graph(graph, max(graph.nodes, default=-1) + 1)
+
+
+def layout_key(adjacency: CSRAdjacency) -> str:
+    """ Hash of the network, the neighbours of a node are hashed in order so any CSR of it has the same key """
+    digest = hashlib.sha256()
+    digest.update("{}:{}:".format(LAYOUT_VERSION, adjacency.n).encode())
+    digest.update(np.ascontiguousarray(adjacency.indptr, dtype=np.int64).tobytes())
+    neighbours = adjacency.indices[np.lexsort((adjacency.indices, adjacency.rows))]
+    digest.update(np.ascontiguousarray(neighbours, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def level_of_detail(n: int) -> str:
+    if n <= FULL_DETAIL_NODES:
+        return "full"
+    if n <= SAMPLED_NODES:
+        return "sampled"
+    return "density"
+
+
+def spectral_positions(adjacency: CSRAdjacency, iterations: int = SPECTRAL_ITERATIONS,
+                       seed: int = 0) -> np.ndarray:
+    """ Two leading non trivial eigenvectors of the lazy random walk, by power iteration over the CSR arrays.
+        O(E) per iteration, so it also works where a spring layout would not finish."""
+    weights = adjacency.degree + 1.0
+    positions = np.random.default_rng(seed).random((adjacency.n, 2)) - 0.5
+    for _ in range(iterations):
+        for axis in range(2):
+            column = positions[:, axis]
+            # every node also keeps itself
+            column = (adjacency.dot(column) + column) / weights
+            column -= np.dot(weights, column) / weights.sum()
+            if axis == 1:
+                first = positions[:, 0]
+                column -= np.dot(weights, column * first) / np.dot(weights, first * first) * first
+            norm = np.sqrt(np.dot(weights, column * column))
+            positions[:, axis] = column / norm if norm > 0 else column
+    return positions
+
+
+def compute_layout(adjacency: CSRAdjacency, seed: int = 0) -> NetworkLayout:
+    n = adjacency.n
+    mode = level_of_detail(n)
+    if mode == "full":
+        graph = edges_to_graph(n, adjacency.edges())
+        pos = nx.circular_layout(graph)
+        pos = nx.spring_layout(graph, dim=2, pos=pos, seed=seed)
+        nodes = np.arange(n)
+        return NetworkLayout(mode, nodes, np.array([pos[node] for node in nodes], dtype=np.float64).reshape(-1, 2))
+    # other components would each be an eigenvector of their own, so only the largest one is laid out
+    labels = adjacency.component_labels()
+    nodes = np.flatnonzero(labels == np.argmax(np.bincount(labels)))
+    index = np.full(n, -1, dtype=np.int64)
+    index[nodes] = np.arange(len(nodes))
+    edges = adjacency.edges()
+    component = CSRAdjacency.from_edges(len(nodes), index[edges[index[edges[:, 0]] >= 0]])
+    positions = spectral_positions(component, seed=seed).astype(np.float32)
+    if mode == "sampled" and len(nodes) > SAMPLE_SIZE:
+        sample = np.sort(np.random.default_rng(seed).choice(len(nodes), SAMPLE_SIZE, replace=False))
+        return NetworkLayout(mode, nodes[sample], positions[sample])
+    return NetworkLayout(mode, nodes, positions)
+
+
+class LayoutCache:
+    """ Network layouts as .npz files keyed by a hash of the adjacency, so a graph is laid out once """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key: str) -> Optional[NetworkLayout]:
+        try:
+            with np.load(self._path(key)) as stored:
+                return NetworkLayout(str(stored["mode"]), stored["nodes"], stored["positions"])
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def store(self, key: str, layout: NetworkLayout):
+        handle, staging = tempfile.mkstemp(dir=self.directory, prefix=".staging-", suffix=".npz")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                np.savez(f, mode=layout.mode, nodes=layout.nodes, positions=layout.positions)
+            os.replace(staging, self._path(key))
+        except BaseException:
+            os.unlink(staging)
+            raise
+
+
+def get_layout(graph, cache_directory: str = None) -> NetworkLayout:
+    adjacency = as_adjacency(graph)
+    if cache_directory is None:
+        return compute_layout(adjacency)
+    cache = LayoutCache(cache_directory)
+    key = layout_key(adjacency)
+    layout = cache.load(key)
+    if layout is None:
+        layout = compute_layout(adjacency)
+        cache.store(key, layout)
+    return layout
+
+
+def is_cooperative(players, nodes: np.ndarray) -> np.ndarray:
+    if isinstance(players, PlayerStore):
+        strategies = players.strategy[nodes]
+    else:
+        strategies = np.array([get_user_by_id(players, node).strategy for node in nodes.tolist()])
+    return strategies == Strategy.COOPERATION.value
+
+
+def node_colors(players, nodes: np.ndarray) -> np.ndarray:
+    return np.where(is_cooperative(players, nodes), COOPERATIVE_COLOR, DEFECTIVE_COLOR)
+
+
+def _legend():
+    cooperative_patch = mpatches.Patch(color=COOPERATIVE_COLOR, label='Cooperative player')
+    defective_patch = mpatches.Patch(color=DEFECTIVE_COLOR, label='Defective player')
+    plt.legend(loc='best', handles=[cooperative_patch, defective_patch])
+
+
+def _zoom(positions: np.ndarray) -> tuple:
+    """ Axis limits around the bulk of the nodes, long dangling chains would otherwise squeeze it into a corner """
+    low, high = np.percentile(positions, [1, 99], axis=0)
+    margin = (high - low) * 0.05 + 1e-9
+    return low[0] - margin[0], high[0] + margin[0], low[1] - margin[1], high[1] + margin[1]
+
+
+def draw_network(graph, players, title: str, layout: NetworkLayout):
+    if layout.mode == "full":
+        if isinstance(graph, CSRAdjacency):
+            graph = edges_to_graph(graph.n, graph.edges())
+        pos = dict(zip(layout.nodes.tolist(), layout.positions))
+        plt.title(title)
+        nx.draw_networkx(graph, pos=pos, node_color=node_colors(players, layout.nodes).tolist(),
+                         nodelist=layout.nodes.tolist(), with_labels=True, node_size=300)
+        _legend()
+    elif layout.mode == "sampled":
+        plt.title("{} ({} sampled nodes)".format(title, len(layout.nodes)))
+        plt.scatter(layout.positions[:, 0], layout.positions[:, 1], c=node_colors(players, layout.nodes), s=8,
+                    linewidths=0)
+        plt.axis(_zoom(layout.positions))
+        plt.axis('off')
+        _legend()
+    else:
+        plt.title("{} (cooperative ratio density)".format(title))
+        cooperative = is_cooperative(players, layout.nodes)
+        color_map = LinearSegmentedColormap.from_list("strategies", [DEFECTIVE_COLOR, COOPERATIVE_COLOR])
+        plt.hexbin(layout.positions[:, 0], layout.positions[:, 1], C=cooperative.astype(np.float64),
+                   reduce_C_function=np.mean, gridsize=DENSITY_GRID_SIZE, cmap=color_map, vmin=0, vmax=1,
+                   extent=_zoom(layout.positions))
+        plt.colorbar(label='Cooperative ratio')
+        plt.axis('off')
+
@@ -0,0 +1,78 @@
+import numpy as np
+from player import PlayerStore
+from recorder import SeriesRecorder
+from strategy import Strategy, UpdateRule, UPDATE_RULES
+
+
+class PopulationTracker:
+    """ Running cooperator and update rule counts, updated by deltas instead of player sweeps """
+
+    def __init__(self, players: PlayerStore, recorder: SeriesRecorder = None, record: bool = True):
+        self.size = len(players)
+        self.cooperators = int(np.count_nonzero(players.strategy == Strategy.COOPERATION.value))
+        self.rule_counts = np.bincount(players.update_rule, minlength=len(UpdateRule)).astype(np.int64)
+        self.recorder = recorder if recorder is not None else SeriesRecorder()
+        # a resumed run already has the initial state in its recorder
+        if record:
+            self.record()
+
+    def strategy_changed(self, old_strategy: int, new_strategy: int):
+        if old_strategy == new_strategy:
+            return
+        if new_strategy == Strategy.COOPERATION.value:
+            self.cooperators += 1
+        elif old_strategy == Strategy.COOPERATION.value:
+            self.cooperators -= 1
+
+    def rule_changed(self, old_rule: UpdateRule, new_rule: UpdateRule):
+        if old_rule is new_rule:
+            return
+        self.rule_counts[old_rule.value] -= 1
+        self.rule_counts[new_rule.value] += 1
+
+    def strategies_changed(self, old_strategies: np.ndarray, new_strategies: np.ndarray):
+        self.cooperators += int(np.count_nonzero(new_strategies == Strategy.COOPERATION.value)) - \
+            int(np.count_nonzero(old_strategies == Strategy.COOPERATION.value))
+
+    def rules_changed(self, old_rules: np.ndarray, new_rules: np.ndarray):
+        self.rule_counts += np.bincount(new_rules, minlength=len(UpdateRule)) - \
+            np.bincount(old_rules, minlength=len(UpdateRule))
+
+    def record_games(self, old_strategies: np.ndarray, new_strategies: np.ndarray, old_rules: np.ndarray,
+                     new_rules: np.ndarray):
+        """ The changes of a batch of games, recorded one game at a time as if record() ran after each.
+            Row k of the (games, players per game) arrays holds the players of game k."""
+        if not len(old_strategies):
+            return
+        cooperation = Strategy.COOPERATION.value
+        cooperators = self.cooperators + np.cumsum(np.count_nonzero(new_strategies == cooperation, axis=1) -
+                                                   np.count_nonzero(old_strategies == cooperation, axis=1))
+        games, rules = len(old_rules), len(UpdateRule)
+        # flat index game * rules + rule, counted per game with one bincount
+        offsets = np.arange(games)[:, None] * rules
+        changes = np.bincount((offsets + new_rules).ravel(), minlength=games * rules) - \
+            np.bincount((offsets + old_rules).ravel(), minlength=games * rules)
+        rule_counts = self.rule_counts + np.cumsum(changes.reshape(games, rules), axis=0)
+        self.recorder.extend(cooperators / self.size, rule_counts)
+        self.cooperators = int(cooperators[-1])
+        self.rule_counts = rule_counts[-1].copy()
+
+    def competitive_ratio(self) -> float:
+        return self.cooperators / self.size
+
+    def update_rule_ratios(self) -> dict:
+        return {rule: int(count) for rule, count in zip(UPDATE_RULES, self.rule_counts)}
+
+    def record(self):
+        self.recorder.append(self.competitive_ratio(), self.rule_counts)
+
+    @property
+    def competitive_ratio_by_games(self) -> list:
+        """ The competitive ratio after every recorded game as a list. The recorder's first row, the state
+            before the game, is left out, as in the list that was appended to after each edge."""
+        return [ratio for ratios in self.recorder.competitive_ratios() for ratio in ratios.tolist()][1:]
+
+    @property
+    def update_rule_ratios_holder(self) -> list:
+        return [dict(zip(UPDATE_RULES, counts)) for _, _, rule_counts in self.recorder.iter_chunks()
+                for counts in rule_counts.tolist()]
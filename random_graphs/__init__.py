@@ -1,30 +1,126 @@
+from typing import Tuple
 import networkx as nx
-from networkx import Graph, read_pajek
-import matplotlib.pyplot as plt
-import random
+from networkx import Graph
+import numpy as np
+import rng
+from pajek import read_pajek_edges
 
-from plots import FIG_SIZE
 
+def _no_edges() -> np.ndarray:
+    return np.empty((0, 2), dtype=np.int64)
 
-def erdos_renyi(n, p=0.15) -> Graph:
-    plt.figure(figsize=FIG_SIZE)
+
+def _pair_from_index(n: int, index: np.ndarray) -> np.ndarray:
+    """ Inverse of the row-major numbering of the node pairs i < j """
+    def row_start(i):
+        return i * (2 * n - i - 1) // 2
+
+    i = np.floor(((2 * n - 1) - np.sqrt(np.maximum((2 * n - 1) ** 2 - 8 * index, 0))) / 2).astype(np.int64)
+    # the square root can be one off for large n
+    i -= row_start(i) > index
+    i += row_start(i + 1) <= index
+    j = index - row_start(i) + i + 1
+    return np.column_stack((i, j))
+
+
+def edges_to_graph(n: int, edges: np.ndarray) -> Graph:
     g = nx.Graph()
     g.add_nodes_from(range(n))
-    for i in g.nodes():
-        for j in g.nodes():
-            if i < j:
-                _r = random.random()
-                if _r < p:
-                    g.add_edge(i, j)
+    g.add_edges_from(edges.tolist())
     return g
 
 
+def erdos_renyi_edges(n, p=0.15, generator: np.random.Generator = None) -> np.ndarray:
+    """ G(n, p) by geometric skipping over the node pairs, O(n + edges) instead of testing every pair """
+    pairs = n * (n - 1) // 2
+    if p <= 0 or pairs == 0:
+        return _no_edges()
+    if p >= 1:
+        return np.column_stack(np.triu_indices(n, 1)).astype(np.int64)
+    if generator is None:
+        generator = rng.generator()
+    expected = pairs * p
+    block = int(expected + 5 * np.sqrt(expected)) + 16
+    chunks = []
+    position = -1
+    while position < pairs:
+        indices = position + np.cumsum(generator.geometric(p, block))
+        chunks.append(indices[indices < pairs])
+        position = indices[-1]
+        block = max(16, int((pairs - position) * p * 1.1) + 16)
+    return _pair_from_index(n, np.concatenate(chunks))
+
+
+def erdos_renyi(n, p=0.15) -> Graph:
+    return edges_to_graph(n, erdos_renyi_edges(n, p))
+
+
+def small_world_edges(n, m, p=0.15, generator: np.random.Generator = None) -> np.ndarray:
+    """ Newman-Watts-Strogatz: ring lattice of the m nearest neighbours plus a random shortcut for each
+        lattice edge with probability p. Shortcuts that would duplicate an edge are dropped, not redrawn."""
+    if m > n:
+        raise ValueError("m > n, choose smaller m or larger n")
+    if m == n:
+        return np.column_stack(np.triu_indices(n, 1)).astype(np.int64)
+    if generator is None:
+        generator = rng.generator()
+    nodes = np.arange(n, dtype=np.int64)
+    lattice = np.concatenate([np.column_stack((nodes, (nodes + offset) % n)) for offset in range(1, m // 2 + 1)]) \
+        if m >= 2 else _no_edges()
+    with_shortcut = lattice[generator.random(len(lattice)) < p]
+    shortcuts = np.column_stack((with_shortcut[:, 0], generator.integers(n, size=len(with_shortcut))))
+    shortcuts = shortcuts[shortcuts[:, 0] != shortcuts[:, 1]]
+    edges = np.concatenate((lattice, shortcuts))
+    edges = np.sort(edges, axis=1)
+    _, first = np.unique(edges, axis=0, return_index=True)
+    return edges[np.sort(first)]
+
+
 def small_world(n, m, p=0.15) -> Graph:
-    return nx.newman_watts_strogatz_graph(n, m, p)
+    return edges_to_graph(n, small_world_edges(n, m, p))
+
+
+def barabasi_albert_edges(n, m, generator: np.random.Generator = None) -> np.ndarray:
+    """ Preferential attachment, every new node connects to m distinct existing nodes """
+    if m < 1 or m >= n:
+        raise ValueError("Barabási–Albert network must have m >= 1 and m < n, m = %d, n = %d" % (m, n))
+    if generator is None:
+        generator = rng.generator()
+    edges = np.empty(((n - m) * m, 2), dtype=np.int64)
+    # every node appears once per edge end, sampling from it is sampling proportional to degree
+    repeated_nodes = np.empty(2 * (n - m) * m, dtype=np.int64)
+    repeated = 0
+    targets = list(range(m))
+    for source in range(m, n):
+        row = (source - m) * m
+        edges[row:row + m, 0] = source
+        edges[row:row + m, 1] = targets
+        repeated_nodes[repeated:repeated + m] = targets
+        repeated_nodes[repeated + m:repeated + 2 * m] = source
+        repeated += 2 * m
+        chosen = set()
+        while len(chosen) < m:
+            chosen.update(repeated_nodes[generator.integers(repeated, size=m - len(chosen))].tolist())
+        targets = list(chosen)
+    return edges
 
 
 def barabasi_albert_graph(n, m):
-    return nx.barabasi_albert_graph(n, m)
+    return edges_to_graph(n, barabasi_albert_edges(n, m))
+
+
+def get_edges_from_name(name: str, n, p, m, pajek_path, generator: np.random.Generator = None) \
+        -> Tuple[int, np.ndarray]:
+    """ Node count and (E, 2) edge array of the named network, without building a networkx graph """
+    if name == "erdos_renyi":
+        return n, erdos_renyi_edges(n, p, generator)
+    if name == "small_world":
+        return n, small_world_edges(n, m, p, generator)
+    if name == "barabasi_albert":
+        return n, barabasi_albert_edges(n, m, generator)
+    if name == "pajek":
+        n, edges, _ = read_pajek_edges(pajek_path)
+        return n, edges
 
 
 def get_graph_from_name(name: str, n, p, m, pajek_path) -> Graph:
@@ -35,4 +131,4 @@ def get_graph_from_name(name: str, n, p, m, pajek_path) -> Graph:
     if name == "barabasi_albert":
         return barabasi_albert_graph(n, m)
     if name == "pajek":
-        return read_pajek(pajek_path)
+        return edges_to_graph(*get_edges_from_name(name, n, p, m, pajek_path))
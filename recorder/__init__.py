@@ -0,0 +1,144 @@
+import os
+from typing import Iterator, Tuple
+import numpy as np
+from strategy import UpdateRule
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class SeriesRecorder:
+    """ Competitive ratio and per update rule player counts over time, in preallocated NumPy chunks.
+        Only every `stride`-th step is kept. Full chunks are spilled to .npy files when a directory is given,
+        otherwise they stay in memory."""
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, stride: int = 1, directory: str = None):
+        self.chunk_size = chunk_size
+        self.stride = stride
+        self.directory = directory
+        self.steps = 0
+        self._ratios = np.empty(chunk_size, dtype=np.float64)
+        self._rule_counts = np.empty((chunk_size, len(UpdateRule)), dtype=np.int64)
+        self._filled = 0
+        self._chunks = []
+        self._rows = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_lists(cls, competitive_ratio_by_games, update_rule_ratios) -> "SeriesRecorder":
+        """ Recorder of the old list based series: a list of ratios and a list of {UpdateRule: count} dicts """
+        recorder = cls()
+        rows = min(len(competitive_ratio_by_games), len(update_rule_ratios))
+        ratios = list(competitive_ratio_by_games)[-rows:] if rows else []
+        for ratio, counts in zip(ratios, list(update_rule_ratios)[-rows:]):
+            recorder.append(ratio, [counts[rule] for rule in UpdateRule])
+        return recorder
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, competitive_ratio: float, rule_counts):
+        step = self.steps
+        self.steps += 1
+        if step % self.stride:
+            return
+        self._ratios[self._filled] = competitive_ratio
+        self._rule_counts[self._filled] = rule_counts
+        self._filled += 1
+        self._rows += 1
+        if self._filled == self.chunk_size:
+            self._spill()
+
+    def extend(self, competitive_ratios: np.ndarray, rule_counts: np.ndarray):
+        """ append() of every row at once, rule_counts: (len(competitive_ratios), len(UpdateRule)) """
+        first = self.steps
+        self.steps += len(competitive_ratios)
+        kept = slice(-first % self.stride, None, self.stride)
+        competitive_ratios, rule_counts = competitive_ratios[kept], rule_counts[kept]
+        start = 0
+        while start < len(competitive_ratios):
+            count = min(self.chunk_size - self._filled, len(competitive_ratios) - start)
+            self._ratios[self._filled:self._filled + count] = competitive_ratios[start:start + count]
+            self._rule_counts[self._filled:self._filled + count] = rule_counts[start:start + count]
+            self._filled += count
+            self._rows += count
+            start += count
+            if self._filled == self.chunk_size:
+                self._spill()
+
+    def _spill(self):
+        if self.directory is None:
+            self._chunks.append((self._ratios.copy(), self._rule_counts.copy()))
+        else:
+            index = len(self._chunks)
+            ratios_path = os.path.join(self.directory, "competitive_ratios_{:06d}.npy".format(index))
+            rule_counts_path = os.path.join(self.directory, "rule_counts_{:06d}.npy".format(index))
+            np.save(ratios_path, self._ratios)
+            np.save(rule_counts_path, self._rule_counts)
+            self._chunks.append((ratios_path, rule_counts_path))
+        self._filled = 0
+
+    def _load(self, chunk) -> Tuple[np.ndarray, np.ndarray]:
+        ratios, rule_counts = chunk
+        if isinstance(ratios, str):
+            return np.load(ratios, mmap_mode="r"), np.load(rule_counts, mmap_mode="r")
+        return ratios, rule_counts
+
+    def iter_chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """ (steps, competitive ratios, rule counts) chunk by chunk, rule counts have one column per UpdateRule """
+        row = 0
+        for chunk in self._chunks:
+            ratios, rule_counts = self._load(chunk)
+            yield np.arange(row, row + len(ratios)) * self.stride, ratios, rule_counts
+            row += len(ratios)
+        if self._filled:
+            yield np.arange(row, row + self._filled) * self.stride, \
+                self._ratios[:self._filled], self._rule_counts[:self._filled]
+
+    def competitive_ratios(self) -> Iterator[np.ndarray]:
+        return (ratios for _, ratios, _ in self.iter_chunks())
+
+    def rule_counts(self, rule: UpdateRule) -> Iterator[np.ndarray]:
+        return (rule_counts[:, rule.value] for _, _, rule_counts in self.iter_chunks())
+
+    def last(self) -> Tuple[float, np.ndarray]:
+        if self._filled:
+            return float(self._ratios[self._filled - 1]), self._rule_counts[self._filled - 1]
+        ratios, rule_counts = self._load(self._chunks[-1])
+        return float(ratios[-1]), np.array(rule_counts[-1])
+
+    def get_state(self) -> dict:
+        """ Everything needed to continue recording, spilled chunks are referenced by path, not copied """
+        spilled = [chunk for chunk in self._chunks if isinstance(chunk[0], str)]
+        in_memory = [chunk for chunk in self._chunks if not isinstance(chunk[0], str)]
+        return {
+            "steps": self.steps,
+            "spilled": spilled,
+            "ratios": np.concatenate([ratios for ratios, _ in in_memory] + [self._ratios[:self._filled]]),
+            "rule_counts": np.concatenate([counts for _, counts in in_memory] + [self._rule_counts[:self._filled]])
+        }
+
+    def set_state(self, state: dict):
+        """ Restores get_state() into a recorder with the same chunk size, stride and directory """
+        self.steps = int(state["steps"])
+        self._chunks = [tuple(chunk) for chunk in state["spilled"]]
+        self._rows = sum(len(self._load(chunk)[0]) for chunk in self._chunks)
+        self._filled = 0
+        ratios, rule_counts = state["ratios"], state["rule_counts"]
+        # in memory rows are appended again, without the stride they were already thinned out with
+        for start in range(0, len(ratios), self.chunk_size):
+            end = min(start + self.chunk_size, len(ratios))
+            self._ratios[:end - start] = ratios[start:end]
+            self._rule_counts[:end - start] = rule_counts[start:end]
+            self._filled = end - start
+            self._rows += end - start
+            if self._filled == self.chunk_size:
+                self._spill()
+
+    def flush(self):
+        """ Spills the partly filled chunk too, e.g. before the files are read by another process """
+        if self._filled and self.directory is not None:
+            ratios, rule_counts = self._ratios, self._rule_counts
+            self._ratios, self._rule_counts = ratios[:self._filled], rule_counts[:self._filled]
+            self._spill()
+            self._ratios, self._rule_counts = ratios, rule_counts
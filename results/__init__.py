@@ -0,0 +1,278 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Callable, Iterator, List, Optional
+import numpy as np
+from adjacency import CSRAdjacency
+from player import PlayerStore, PLAYER_COLUMNS
+from recorder import SeriesRecorder
+from strategy import UpdateRule
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "run.json"
+INDEX_FILE = "index.jsonl"
+PLAYERS_DIRECTORY = "players"
+SERIES = ("steps", "competitive_ratios", "rule_counts")
+# run.json keys that are not details of the run
+_MANIFEST_KEYS = ("format", "config", "arrays", "update_rules", "update_rules_win_rates", "update_rules_played")
+
+
+def _write_series(directory: str, recorder: SeriesRecorder):
+    """ Copies the recorded series chunk by chunk into .npy files, without joining them in memory """
+    rows = len(recorder)
+    files = {
+        "steps": np.lib.format.open_memmap(os.path.join(directory, "steps.npy"), mode="w+",
+                                           dtype=np.int64, shape=(rows,)),
+        "competitive_ratios": np.lib.format.open_memmap(os.path.join(directory, "competitive_ratios.npy"), mode="w+",
+                                                        dtype=np.float64, shape=(rows,)),
+        "rule_counts": np.lib.format.open_memmap(os.path.join(directory, "rule_counts.npy"), mode="w+",
+                                                 dtype=np.int64, shape=(rows, len(UpdateRule)))
+    }
+    row = 0
+    for steps, ratios, rule_counts in recorder.iter_chunks():
+        files["steps"][row:row + len(steps)] = steps
+        files["competitive_ratios"][row:row + len(steps)] = ratios
+        files["rule_counts"][row:row + len(steps)] = rule_counts
+        row += len(steps)
+    for array in files.values():
+        array.flush()
+
+
+def _describe(directory: str, files: dict) -> dict:
+    """ dtype and shape of every array of a run, read from the .npy headers """
+    arrays = {}
+    for name, file in files.items():
+        array = np.load(os.path.join(directory, file), mmap_mode="r")
+        arrays[name] = {"file": file, "dtype": array.dtype.str, "shape": list(array.shape)}
+    return arrays
+
+
+def write_results(directory: str,
+                  config: dict,
+                  players: PlayerStore,
+                  update_rules_win_rates: dict,
+                  update_rules_played: dict,
+                  recorder: SeriesRecorder,
+                  final_adjacency: CSRAdjacency = None,
+                  **details) -> str:
+    """ Raw results of a run, every array in its own .npy file so it can be memory mapped: the final player
+        columns in players/, the time series, the update rule tallies and, for a co-evolving run, the network it
+        ended with. run.json is the manifest: the config, the dtype and shape of every array and any extra details
+        such as the seed and timings."""
+    os.makedirs(os.path.join(directory, PLAYERS_DIRECTORY), exist_ok=True)
+    files = {}
+    for name, column in players.columns().items():
+        files["player_" + name] = os.path.join(PLAYERS_DIRECTORY, name + ".npy")
+        np.save(os.path.join(directory, files["player_" + name]), column)
+    for name, tallies in (("update_rules_win_rates", update_rules_win_rates),
+                          ("update_rules_played", update_rules_played)):
+        files[name] = name + ".npy"
+        np.save(os.path.join(directory, files[name]), np.array([tallies[rule] for rule in UpdateRule], np.int64))
+    if final_adjacency is not None:
+        files["final_indptr"] = "final_indptr.npy"
+        files["final_indices"] = "final_indices.npy"
+        np.save(os.path.join(directory, files["final_indptr"]), final_adjacency.indptr)
+        np.save(os.path.join(directory, files["final_indices"]), final_adjacency.indices)
+    _write_series(directory, recorder)
+    files.update({name: name + ".npy" for name in SERIES})
+    run = {
+        "format": FORMAT_VERSION,
+        "config": config,
+        "arrays": _describe(directory, files),
+        "update_rules_win_rates": {rule.name: int(count) for rule, count in update_rules_win_rates.items()},
+        "update_rules_played": {rule.name: int(count) for rule, count in update_rules_played.items()},
+        "update_rules": [rule.name for rule in UpdateRule]
+    }
+    run.update(details)
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(run, f, indent=2)
+    return directory
+
+
+class StoredRun:
+    """ A run written by write_results, opened lazily: run.json is read on first use and the arrays are memory
+        mapped on access, so slicing a series reads only the pages of the slice """
+
+    def __init__(self, path: str, entry: dict = None):
+        self.path = path
+        self._entry = entry
+        self._manifest = None
+
+    @property
+    def key(self) -> str:
+        return os.path.basename(os.path.normpath(self.path))
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    @property
+    def settings(self) -> dict:
+        """ The SIMULATION settings, from the store's index when the run came from one """
+        if self._entry is not None:
+            return self._entry["settings"]
+        return self.manifest["config"]["SIMULATION"]
+
+    @property
+    def details(self) -> dict:
+        """ seed, generations_played, stop_reason, timings, ... """
+        if self._entry is not None:
+            return self._entry["details"]
+        return _details(self.manifest)
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self.details.get("seed")
+
+    def arrays(self) -> List[str]:
+        return list(self.manifest["arrays"])
+
+    def array(self, name: str, mode: str = "r") -> np.ndarray:
+        """ np.memmap of one array of the manifest, 'r' read only or 'c' copy on write """
+        description = self.manifest["arrays"][name]
+        return np.load(os.path.join(self.path, description["file"]), mmap_mode=mode)
+
+    def series(self, name: str, start: int = None, stop: int = None, step: int = None) -> np.ndarray:
+        """ A slice of steps, competitive_ratios or rule_counts, still memory mapped """
+        return self.array(name)[start:stop:step]
+
+    def players(self, mode: str = "c") -> PlayerStore:
+        return PlayerStore.from_columns({name: self.array("player_" + name, mode) for name in PLAYER_COLUMNS})
+
+    def update_rules_win_rates(self) -> dict:
+        return {rule: int(count) for rule, count in zip(UpdateRule, self.array("update_rules_win_rates"))}
+
+    def update_rules_played(self) -> dict:
+        return {rule: int(count) for rule, count in zip(UpdateRule, self.array("update_rules_played"))}
+
+    def recorder(self) -> SeriesRecorder:
+        """ The stored series as a SeriesRecorder for the plots, backed by the memory mapped files """
+        ratios = os.path.join(self.path, self.manifest["arrays"]["competitive_ratios"]["file"])
+        rule_counts = os.path.join(self.path, self.manifest["arrays"]["rule_counts"]["file"])
+        recorder = SeriesRecorder(chunk_size=1, stride=self.settings.get("record_stride", 1))
+        steps = self.series("steps")
+        recorder.set_state({
+            "steps": int(steps[-1]) + 1 if len(steps) else 0,
+            "spilled": [(ratios, rule_counts)],
+            "ratios": np.empty(0),
+            "rule_counts": np.empty((0, len(UpdateRule)), dtype=np.int64)
+        })
+        return recorder
+
+    def final_adjacency(self) -> Optional[CSRAdjacency]:
+        """ The network a co-evolving run ended with, None for a run on a fixed network """
+        if "final_indptr" not in self.manifest["arrays"]:
+            return None
+        return CSRAdjacency(self.array("final_indptr"), self.array("final_indices"))
+
+
+def _details(manifest: dict) -> dict:
+    return {name: value for name, value in manifest.items() if name not in _MANIFEST_KEYS}
+
+
+def _matches(value, condition) -> bool:
+    return condition(value) if callable(condition) else value == condition
+
+
+class ResultStore:
+    """ A directory of runs, <root>/<key>/ each, with an index.jsonl of their settings and details so runs
+        can be selected without opening them. The index is appended to as runs are written; reindex() rebuilds
+        it from the run directories, e.g. for a directory filled by another tool."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self.path(key), MANIFEST_FILE))
+
+    def write(self, key: str, config: dict, players: PlayerStore, update_rules_win_rates: dict,
+              update_rules_played: dict, recorder: SeriesRecorder, final_adjacency: CSRAdjacency = None,
+              extras: Callable[[str], None] = None, **details) -> StoredRun:
+        """ write_results into <root>/<key> through a staging directory and one rename, then indexes the run.
+            `extras` is called with the staging directory to add files of its own, e.g. figures.
+            A key that is already stored keeps its first run."""
+        staging = tempfile.mkdtemp(dir=self.root, prefix=".staging-")
+        try:
+            write_results(staging, config, players, update_rules_win_rates, update_rules_played, recorder,
+                          final_adjacency, **details)
+            if extras is not None:
+                extras(staging)
+            try:
+                os.rename(staging, self.path(key))
+            except OSError:
+                # stored by someone else in the meantime
+                shutil.rmtree(staging, ignore_errors=True)
+                return self.open(key)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return self.add(key)
+
+    def add(self, key: str) -> StoredRun:
+        """ Indexes the run in <root>/<key> """
+        manifest = StoredRun(self.path(key)).manifest
+        entry = {"key": key, "settings": manifest["config"]["SIMULATION"], "details": _details(manifest)}
+        # one short write in append mode, so concurrent writers do not interleave lines
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        return StoredRun(self.path(key), entry)
+
+    def reindex(self) -> int:
+        entries = []
+        for key in sorted(os.listdir(self.root)):
+            if not key.startswith(".") and key in self:
+                manifest = StoredRun(self.path(key)).manifest
+                entries.append({"key": key, "settings": manifest["config"]["SIMULATION"],
+                                "details": _details(manifest)})
+        with open(self.index_path + ".tmp", "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(self.index_path + ".tmp", self.index_path)
+        return len(entries)
+
+    def entries(self) -> List[dict]:
+        """ The index, one entry per key, built on first use """
+        if not os.path.isfile(self.index_path):
+            self.reindex()
+        entries = {}
+        with open(self.index_path) as f:
+            for line in f:
+                if line.endswith("\n"):
+                    entry = json.loads(line)
+                    entries[entry["key"]] = entry
+        return list(entries.values())
+
+    def open(self, key: str) -> StoredRun:
+        if key not in self:
+            raise KeyError(key)
+        return StoredRun(self.path(key))
+
+    def __iter__(self) -> Iterator[StoredRun]:
+        return (StoredRun(self.path(entry["key"]), entry) for entry in self.entries())
+
+    def __len__(self) -> int:
+        return len(self.entries())
+
+    def query(self, where: Callable[[StoredRun], bool] = None, **fields) -> List[StoredRun]:
+        """ Runs whose SIMULATION settings match every field, by equality or by a predicate on the value,
+            and for which `where` holds, e.g. query(engine="synchronous", K=lambda k: k > 0.1).
+            Only the index is read; the runs' files are opened when their data is accessed."""
+        runs = []
+        for run in self:
+            settings = run.settings
+            if all(name in settings and _matches(settings[name], condition) for name, condition in fields.items()) \
+                    and (where is None or where(run)):
+                runs.append(run)
+        return runs
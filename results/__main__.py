@@ -0,0 +1,37 @@
+import argparse
+import sys
+import yaml
+from results import ResultStore
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="List the runs of a result store that match SIMULATION settings")
+    parser.add_argument("store", help="directory of the result store, e.g. a sweep's results directory")
+    parser.add_argument("filters", nargs="*", metavar="NAME=VALUE", help="settings the runs must have")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the index from the run directories first")
+    return parser.parse_args()
+
+
+def parse_filters(filters) -> dict:
+    fields = {}
+    for item in filters:
+        name, separator, value = item.partition("=")
+        if not separator:
+            sys.exit("Filters are NAME=VALUE, got {!r}".format(item))
+        fields[name] = yaml.safe_load(value)
+    return fields
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    store = ResultStore(arguments.store)
+    if arguments.reindex:
+        print("{} runs indexed".format(store.reindex()), file=sys.stderr)
+    runs = store.query(**parse_filters(arguments.filters))
+    print("{:<16} {:>20} {:>12} {:>14} {:>10}".format("key", "seed", "generations", "stop", "final C"))
+    for run in runs:
+        ratios = run.series("competitive_ratios")
+        print("{:<16} {:>20} {:>12} {:>14} {:>10}".format(
+            run.key[:16], str(run.seed), str(run.details.get("generations_played")),
+            str(run.details.get("stop_reason")), "{:.4f}".format(ratios[-1]) if len(ratios) else "-"))
+    print("{} of {} runs match".format(len(runs), len(store)), file=sys.stderr)
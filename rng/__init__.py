@@ -0,0 +1,87 @@
+from typing import Sequence, Any
+import numpy as np
+
+BLOCK_SIZE = 4096
+# spawn keys of named streams, far above the key 0 of the default stream
+GRAPH_STREAM = 2 ** 31
+
+
+class RandomStream:
+    """ Wraps a NumPy Generator and hands out single values from pre-drawn blocks """
+
+    def __init__(self, generator: np.random.Generator, block_size: int = BLOCK_SIZE):
+        self.generator = generator
+        self.block_size = block_size
+        self._block = np.empty(0)
+        self._position = 0
+
+    def random(self) -> float:
+        if self._position == len(self._block):
+            self._block = self.generator.random(self.block_size)
+            self._position = 0
+        value = self._block[self._position]
+        self._position += 1
+        return float(value)
+
+    def randrange(self, stop: int) -> int:
+        return int(self.random() * stop)
+
+    def choice(self, sequence: Sequence) -> Any:
+        return sequence[self.randrange(len(sequence))]
+
+    def get_state(self) -> dict:
+        return {
+            "bit_generator": self.generator.bit_generator.state,
+            "block": self._block[self._position:].copy()
+        }
+
+    def set_state(self, state: dict):
+        self.generator.bit_generator.state = state["bit_generator"]
+        self._block = np.asarray(state["block"], dtype=np.float64)
+        self._position = 0
+
+
+_root = None
+_stream = None
+
+
+def seed(value: int = None):
+    """ Reseeds the default stream, None draws fresh entropy from the OS """
+    global _root, _stream
+    _root = np.random.SeedSequence(value)
+    _stream = RandomStream(np.random.default_rng(_root.spawn(1)[0]))
+
+
+def get_seed() -> int:
+    return _root.entropy
+
+
+def named_generator(stream: int, seed: int = None) -> np.random.Generator:
+    """ Generator that only depends on the seed and `stream`, not on how much was drawn elsewhere.
+        `seed` overrides the seed of the default stream, e.g. to keep the network fixed across replicas."""
+    entropy = _root.entropy if seed is None else seed
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(stream,)))
+
+
+def get_stream() -> RandomStream:
+    return _stream
+
+
+def generator() -> np.random.Generator:
+    """ Generator of the default stream, for vectorized draws """
+    return _stream.generator
+
+
+def random() -> float:
+    return _stream.random()
+
+
+def randrange(stop: int) -> int:
+    return _stream.randrange(stop)
+
+
+def choice(sequence: Sequence) -> Any:
+    return _stream.choice(sequence)
+
+
+seed()
@@ -0,0 +1,3 @@
+from rules.base import RULES, Rule, register
+from rules.neighbours import get_user_by_id, get_neighbours, draw_neighbour, find_most_successful_player
+from rules import builtin
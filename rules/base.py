@@ -0,0 +1,53 @@
+import abc
+from typing import Optional, Tuple, Union
+import numpy as np
+from strategy import UpdateRule
+
+# UpdateRule -> the Rule instance that implements it
+RULES = {}
+
+
+class Rule(abc.ABC):
+    """ An update rule: how a player changes its strategy, and possibly its rule, after a game.
+
+        update() decides for one player, right after its game, as the asynchronous engine plays; decide() for
+        a batch of players that all follow the rule, as the synchronous and parallel engines do. The engines
+        look the rule up in RULES, so a new rule is a subclass decorated with @register whose update_rule is
+        the name of its new UpdateRule member."""
+
+    # the UpdateRule of a built-in rule, the member name of a new one
+    update_rule: Union[UpdateRule, str] = None
+    # name on the update rule win rate plot
+    label = ""
+    # name in the legends of the update rule plots
+    title = ""
+
+    @abc.abstractmethod
+    def update(self, player, opponent, won_round: bool, network, players, comp_prob, d_max: float,
+               K: float) -> Optional[Tuple[int, Optional[UpdateRule]]]:
+        """ The player's new strategy and the update rule it adopts, None to keep its own, or None when the
+            player does not update. Draws come from the rng module's default stream."""
+
+    @abc.abstractmethod
+    def decide(self, players, adjacency, nodes: np.ndarray, opponents: np.ndarray, won_round: np.ndarray,
+               uniforms: np.ndarray, opponent_strategies: np.ndarray, opponent_rules: np.ndarray, comp_prob,
+               d_max: float, K: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Positions in `nodes` of the players that update, their new strategies and the update rule values
+            they adopt, -1 to keep their own. uniforms: (len(nodes), 2) draws, the first for the decision,
+            the second for a random neighbour. Reads the current state of `players` only."""
+
+
+def register(rule_class):
+    """ Class decorator, makes the rule the implementation of its update_rule. A name adds that UpdateRule
+        member, see UpdateRule.extend."""
+    if isinstance(rule_class.update_rule, str):
+        rule_class.update_rule = UpdateRule.extend(rule_class.update_rule)
+    if rule_class.update_rule in RULES:
+        raise ValueError("update rule {} is already registered".format(rule_class.update_rule.name))
+    RULES[rule_class.update_rule] = rule_class()
+    return rule_class
+
+
+def no_updates() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    empty = np.zeros(0, dtype=np.int64)
+    return empty, empty, empty
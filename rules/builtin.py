@@ -0,0 +1,149 @@
+import numpy as np
+from rng import random
+from strategy import Strategy, UpdateRule, replicator_dynamics, logit_replicator_dynamics
+from rules.base import Rule, register, no_updates
+from rules.neighbours import get_user_by_id, draw_neighbour, find_most_successful_player
+
+
+def average_pay_offs(players, nodes: np.ndarray) -> np.ndarray:
+    rounds_played = players.rounds_played[nodes]
+    return np.divide(players.pay_off_sum[nodes], rounds_played,
+                     out=np.zeros(len(nodes)), where=rounds_played > 0)
+
+
+@register
+class Random(Rule):
+    """ A player who lost draws a new strategy with the competitive probability, and takes over the
+        opponent's rule if the strategy changed. Off when strategies come from a file."""
+    update_rule = UpdateRule.RANDOM
+    label = "Random"
+    title = "Random"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        if won_round or isinstance(comp_prob, str):
+            return None
+        strategy = Strategy.COOPERATION.value if random() < comp_prob else Strategy.DEFECT.value
+        return strategy, opponent.update_rule if strategy != player.strategy else None
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        if isinstance(comp_prob, str):
+            return no_updates()
+        selected = np.flatnonzero(~won_round)
+        drawn = np.where(uniforms[selected, 0] < comp_prob, Strategy.COOPERATION.value, Strategy.DEFECT.value)
+        flipped = drawn != players.strategy[nodes[selected]]
+        return selected, drawn, np.where(flipped, opponent_rules[selected], -1)
+
+
+@register
+class Adapt(Rule):
+    """ A player who lost copies the opponent """
+    update_rule = UpdateRule.ADAPT
+    label = "Adapt"
+    title = "Adapt"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        if won_round:
+            return None
+        return opponent.strategy, opponent.update_rule
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        selected = np.flatnonzero(~won_round)
+        return selected, opponent_strategies[selected], opponent_rules[selected]
+
+
+@register
+class TitForTat(Rule):
+    """ The player copies the opponent after every game """
+    update_rule = UpdateRule.TIT_FOR_TAT
+    label = "TitForTat"
+    title = "Tit for tat"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        return opponent.strategy, opponent.update_rule
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        return np.arange(len(nodes)), opponent_strategies, opponent_rules
+
+
+@register
+class ReplicatorDynamics(Rule):
+    """ A player who earns less per round than the opponent takes over its strategy with the replicator
+        probability. The rule is never passed on."""
+    update_rule = UpdateRule.REPLICATOR_DYNAMICS
+    label = "Replicator Dynamics"
+    title = "Replicator dynamics"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        replicator_value = replicator_dynamics(player, opponent, d_max)
+        if replicator_value is None:
+            return None
+        return opponent.strategy if random() < replicator_value else player.strategy, None
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        g_i = average_pay_offs(players, nodes) / np.maximum(players.rounds_played[nodes], 1)
+        g_j = average_pay_offs(players, opponents) / np.maximum(players.rounds_played[opponents], 1)
+        replicator_values = (g_i - g_j) / d_max
+        selected = np.flatnonzero((g_i < g_j) & (uniforms[:, 0] < replicator_values))
+        return selected, opponent_strategies[selected], np.full(len(selected), -1, dtype=np.int64)
+
+
+@register
+class BestTakesOver(Rule):
+    """ A player who lost copies its neighbour with the highest pay off """
+    update_rule = UpdateRule.BEST_TAKES_OVER
+    label = "BestTakesOver"
+    title = "Best takes over"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        if won_round:
+            return None
+        most_successful_player = get_user_by_id(players, find_most_successful_player(network, player, players))
+        return most_successful_player.strategy, most_successful_player.update_rule
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        selected = np.flatnonzero(~won_round)
+        if not len(selected):
+            return no_updates()
+        best = adjacency.neighbour_argmax(players.pay_off_sum, nodes[selected])
+        best_pay_offs = players.pay_off_sum[np.maximum(best, 0)]
+        best = np.where((best >= 0) & (0 < best_pay_offs), best, nodes[selected])
+        return selected, players.strategy[best], players.update_rule[best]
+
+
+@register
+class LogitReplicatorDynamics(Rule):
+    """ The player compares its average pay off with a random neighbour's and copies it with the logit
+        probability, K is the noise."""
+    update_rule = UpdateRule.LOGIT_REPLICATOR_DYNAMICS
+    label = "Logit Replicator Dynamics"
+    title = "Logit replicator dynamics"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        random_neighbour = get_user_by_id(players, draw_neighbour(player.id, network))
+        if random_neighbour.rounds_played == 0:
+            return None
+        player_avg_pay_off = player.pay_off_sum / player.rounds_played
+        random_neighbour_avg_pay_off = random_neighbour.pay_off_sum / random_neighbour.rounds_played
+        change_prob = logit_replicator_dynamics(player_avg_pay_off, random_neighbour_avg_pay_off, K)
+        if random() <= change_prob:
+            return random_neighbour.strategy, random_neighbour.update_rule
+        return None
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        neighbours = adjacency.random_neighbours(nodes, uniforms[:, 1])
+        has_played = neighbours >= 0
+        has_played[has_played] = players.rounds_played[neighbours[has_played]] > 0
+        selected, neighbours = np.flatnonzero(has_played), neighbours[has_played]
+        player_avg_pay_offs = average_pay_offs(players, nodes[selected])
+        neighbour_avg_pay_offs = average_pay_offs(players, neighbours)
+        with np.errstate(over="ignore"):
+            change_probs = 1 / (1 + np.exp(-1 * (neighbour_avg_pay_offs - player_avg_pay_offs) / K))
+        adopt = uniforms[selected, 0] <= change_probs
+        neighbours = neighbours[adopt]
+        return selected[adopt], players.strategy[neighbours], players.update_rule[neighbours]
@@ -0,0 +1,35 @@
+from rng import choice
+from adjacency import DynamicAdjacency
+from player import PlayerStore
+
+
+def get_user_by_id(users, node_id):
+    if isinstance(users, PlayerStore):
+        return users[node_id]
+    return next((user for user in users if user.id == node_id))
+
+
+def get_neighbours(player_id: int, network) -> list:
+    """ network: a networkx graph or a DynamicAdjacency """
+    if isinstance(network, DynamicAdjacency):
+        return network.neighbours(player_id)
+    return list(network.neighbors(player_id))
+
+
+def draw_neighbour(player_id: int, network) -> int:
+    if isinstance(network, DynamicAdjacency):
+        return network.random_neighbour(player_id)
+    return choice(get_neighbours(player_id, network))
+
+
+def find_most_successful_player(network, player, players):
+    if isinstance(players, PlayerStore) and players.neighbourhood_best is not None:
+        return players.neighbourhood_best.best(player.id)
+    max_pay_off = 0
+    best_id = player.id
+    for related_player_id in get_neighbours(player.id, network):
+        related_player = get_user_by_id(players, related_player_id)
+        if max_pay_off < related_player.pay_off_sum:
+            max_pay_off = related_player.pay_off_sum
+            best_id = related_player.id
+    return best_id
@@ -0,0 +1,291 @@
+import asyncio
+import json
+import os
+import secrets
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+from schema import SchemaError
+from config_schema import schema
+from instrumentation import Instrumentation
+from results import StoredRun
+from sweep import FIGURES_DIRECTORY, GRAPHS_DIRECTORY, RESULTS_DIRECTORY, job_key, is_done, result_path, run_job
+
+SOCKET_PATH = "./service.sock"
+CACHE_DIRECTORY = "./service_cache"
+PROGRESS_DIRECTORY = "progress"
+PROGRESS_INTERVAL = 1.0
+# longest request line, a config is far below it
+LINE_LIMIT = 1 << 20
+# SIMULATION settings that may hold a path, the service may run in another working directory than the client
+PATH_KEYS = ("pajek_path", "competitive_probability", "graph_cache", "layout_cache")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    def __init__(self, key: str, settings: dict):
+        self.key = key
+        self.settings = settings
+        self.state = QUEUED
+        self.progress = None
+        self.error = None
+        self.submitted = time.time()
+        self.watchers = set()
+
+    def to_dict(self) -> dict:
+        return {"key": self.key, "state": self.state, "seed": self.settings["seed"], "progress": self.progress,
+                "error": self.error, "submitted": self.submitted}
+
+
+def _progress_path(directory: str, key: str) -> str:
+    return os.path.join(directory, PROGRESS_DIRECTORY, key + ".jsonl")
+
+
+def _work(directory: str, key: str, settings: dict, figure_format: str, progress_interval: float) -> str:
+    """ Runs in a pool process, progress is appended to a JSON lines file the service follows """
+    progress_file = _progress_path(directory, key)
+    open(progress_file, "w").close()
+    instrumentation = Instrumentation(progress_interval, progress_file, timed=False).install()
+    try:
+        return run_job(directory, key, settings, figure_format, instrumentation)
+    finally:
+        instrumentation.uninstall()
+
+
+class JobService:
+    """ Runs submitted configs on a bounded process pool, one job per process at a time.
+
+        A job is keyed like a sweep run, by its settings and seed, and its results are kept in
+        <directory>/results/<key>: a submission that is already computed is answered from there, one that is
+        queued or running is attached to the existing job. A config without a seed gets a random one, so
+        unseeded submissions are never merged. Only queued, running and failed jobs are kept in memory, a done
+        job is answered from the results."""
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, processes: int = 1, figure_format: str = "png",
+                 progress_interval: float = PROGRESS_INTERVAL):
+        self.directory = directory
+        self.processes = processes
+        self.figure_format = figure_format
+        self.progress_interval = progress_interval
+        self.jobs = {}
+        self.queue = None
+        self.executor = None
+        for name in (RESULTS_DIRECTORY, PROGRESS_DIRECTORY):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def prepare(self, config: dict) -> dict:
+        """ Validated SIMULATION settings of a submitted config, raises SchemaError """
+        if not isinstance(config, dict) or not isinstance(config.get("SIMULATION"), dict):
+            raise SchemaError("the config needs a SIMULATION section")
+        settings = schema.validate(dict(config["SIMULATION"]))
+        if settings["seed"] is None:
+            settings["seed"] = secrets.randbelow(2 ** 63)
+        settings["graph_cache"] = settings["graph_cache"] or os.path.join(self.directory, GRAPHS_DIRECTORY)
+        settings["record_directory"] = None
+        settings["checkpoint_directory"] = None
+        if self.processes > 1:
+            settings["workers"] = 1
+        return settings
+
+    def submit(self, config: dict) -> dict:
+        settings = self.prepare(config)
+        key = job_key(settings)
+        job = self.jobs.get(key)
+        if job is not None and job.state in (QUEUED, RUNNING):
+            return dict(job.to_dict(), deduplicated=True)
+        if is_done(self.directory, key):
+            return {"key": key, "state": DONE, "seed": settings["seed"], "cached": True}
+        job = self.jobs[key] = Job(key, settings)
+        self.queue.put_nowait(job)
+        return job.to_dict()
+
+    def status(self, key: str = None) -> dict:
+        if key is None:
+            return {"jobs": [job.to_dict() for job in self.jobs.values()]}
+        if key in self.jobs:
+            return self.jobs[key].to_dict()
+        if is_done(self.directory, key):
+            return {"key": key, "state": DONE}
+        raise KeyError(key)
+
+    def result(self, key: str) -> dict:
+        """ run.json of a finished job and the paths of its arrays, see results.write_results, and figures """
+        if not is_done(self.directory, key):
+            raise KeyError(key)
+        run = StoredRun(os.path.abspath(result_path(self.directory, key)))
+        figures = os.path.join(run.path, FIGURES_DIRECTORY)
+        return {
+            "key": key,
+            "state": DONE,
+            "directory": run.path,
+            "arrays": {name: os.path.join(run.path, description["file"])
+                       for name, description in run.manifest["arrays"].items()},
+            "figures": sorted(os.path.join(figures, name) for name in os.listdir(figures))
+            if os.path.isdir(figures) else [],
+            "run": run.manifest
+        }
+
+    def _publish(self, job: Job):
+        event = job.to_dict()
+        for watcher in job.watchers:
+            watcher.put_nowait(event)
+
+    def _read_progress(self, job: Job, path: str, position: int) -> int:
+        try:
+            with open(path) as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    position += len(line)
+                    job.progress = json.loads(line)
+                    self._publish(job)
+        except FileNotFoundError:
+            pass
+        return position
+
+    async def _run(self, job: Job):
+        loop = asyncio.get_running_loop()
+        job.state = RUNNING
+        self._publish(job)
+        future = loop.run_in_executor(self.executor, _work, self.directory, job.key, job.settings,
+                                      self.figure_format, self.progress_interval)
+        path = _progress_path(self.directory, job.key)
+        position = 0
+        while True:
+            finished = future.done()
+            position = self._read_progress(job, path, position)
+            if finished:
+                break
+            await asyncio.wait({future}, timeout=self.progress_interval)
+        try:
+            future.result()
+            job.state = DONE
+        except Exception as e:
+            job.state = FAILED
+            job.error = "{}: {}".format(type(e).__name__, e)
+        if os.path.exists(path):
+            os.remove(path)
+        self._publish(job)
+        if job.state == DONE:
+            del self.jobs[job.key]
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self.queue.task_done()
+
+    async def _watch(self, key: str, writer: asyncio.StreamWriter):
+        job = self.jobs.get(key)
+        if job is None:
+            await _send(writer, self.status(key))
+            return
+        watcher = asyncio.Queue()
+        job.watchers.add(watcher)
+        try:
+            event = job.to_dict()
+            while True:
+                await _send(writer, event)
+                if event["state"] in (DONE, FAILED):
+                    return
+                event = await watcher.get()
+        finally:
+            job.watchers.discard(watcher)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ One JSON request line per connection, answered by one JSON line, or a line per event for 'watch' """
+        try:
+            request = json.loads(await reader.readline())
+            operation = request.get("op")
+            if operation == "submit":
+                await _send(writer, self.submit(request.get("config")))
+            elif operation == "status":
+                await _send(writer, self.status(request.get("key")))
+            elif operation == "watch":
+                await self._watch(request["key"], writer)
+            elif operation == "result":
+                await _send(writer, self.result(request["key"]))
+            else:
+                await _send(writer, {"error": "unknown operation {!r}".format(operation)})
+        except SchemaError as e:
+            await _send(writer, {"error": "invalid config: {}".format(e)})
+        except KeyError as e:
+            await _send(writer, {"error": "unknown job {}".format(e)})
+        except (ValueError, AttributeError) as e:
+            await _send(writer, {"error": "bad request: {}".format(e)})
+        except ConnectionError:
+            pass
+        except OSError as e:
+            await _send(writer, {"error": "cannot read a file of the config: {}".format(e)})
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = SOCKET_PATH):
+        """ Serves on a Unix socket until cancelled or terminated """
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        self.queue = asyncio.Queue()
+        self.executor = ProcessPoolExecutor(self.processes)
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.processes)]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(self.handle, socket_path, limit=LINE_LIMIT)
+        print("Serving on {} with {} process(es), cache in {}".format(socket_path, self.processes, self.directory),
+              file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+async def _send(writer: asyncio.StreamWriter, message: dict):
+    writer.write((json.dumps(message) + "\n").encode())
+    await writer.drain()
+
+
+def absolute_paths(config: dict) -> dict:
+    """ Client side: the config with the relative paths of its SIMULATION settings made absolute, as the client
+        resolves them """
+    settings = dict(config["SIMULATION"])
+    for name in PATH_KEYS:
+        path = settings.get(name)
+        # an unused pajek_path stays as it is, it is part of the job key
+        if name == "pajek_path" and settings.get("G") != "pajek":
+            continue
+        if isinstance(path, str) and path and path != "random":
+            settings[name] = os.path.abspath(path)
+    return dict(config, SIMULATION=settings)
+
+
+def _connect(socket_path: str, message: dict):
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(socket_path)
+    connection.sendall((json.dumps(message) + "\n").encode())
+    return connection
+
+
+def request(socket_path: str, message: dict) -> dict:
+    """ Client side: one request, one answer """
+    with _connect(socket_path, message) as connection, connection.makefile() as lines:
+        return json.loads(lines.readline())
+
+
+def watch(socket_path: str, key: str) -> Iterator[dict]:
+    """ Client side: the job's events until it is done or failed """
+    with _connect(socket_path, {"op": "watch", "key": key}) as connection, connection.makefile() as lines:
+        for line in lines:
+            yield json.loads(line)
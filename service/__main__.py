@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import yaml
+from service import SOCKET_PATH, CACHE_DIRECTORY, PROGRESS_INTERVAL, DONE, FAILED, JobService, absolute_paths, \
+    request, watch
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Local simulation job service and its client")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="path of the service's Unix socket")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the service")
+    serve.add_argument("--cache", default=CACHE_DIRECTORY, help="directory of the cached results")
+    serve.add_argument("--processes", type=int, default=1, help="simulations running at the same time")
+    serve.add_argument("--figures", choices=("png", "svg", "none"), default="png",
+                       help="format of the figures written with every result")
+    serve.add_argument("--progress", type=float, default=PROGRESS_INTERVAL, metavar="SECONDS",
+                       help="interval of the progress reports of a running job")
+
+    submit = commands.add_parser("submit", help="submit a config file, prints the job")
+    submit.add_argument("config", help="path of the config file")
+    submit.add_argument("--seed", type=int, help="seed of the run, overrides the config's")
+    submit.add_argument("--watch", action="store_true", help="follow the job until it is done")
+
+    status = commands.add_parser("status", help="state of a job, or of every job of the running service")
+    status.add_argument("key", nargs="?")
+
+    follow = commands.add_parser("watch", help="follow a job until it is done")
+    follow.add_argument("key")
+
+    result = commands.add_parser("result", help="paths and run.json of a finished job")
+    result.add_argument("key")
+    result.add_argument("--output", help="copy the results to this directory")
+    return parser.parse_args()
+
+
+def follow_job(socket_path: str, key: str) -> dict:
+    event = None
+    for event in watch(socket_path, key):
+        progress = event.get("progress")
+        if event.get("state") and progress:
+            eta = "{:.0f} s".format(progress["eta"]) if progress["eta"] is not None else "?"
+            print("{} {}: {} edges, {:.0f} edges/s, ETA {}".format(
+                key[:12], event["state"], progress["edges"], progress["edges_per_second"], eta), file=sys.stderr)
+        else:
+            print("{} {}".format(key[:12], event.get("state", event.get("error"))), file=sys.stderr)
+    return event
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    if arguments.command == "serve":
+        service = JobService(arguments.cache, arguments.processes,
+                             None if arguments.figures == "none" else arguments.figures, arguments.progress)
+        try:
+            asyncio.run(service.serve(arguments.socket))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        sys.exit()
+
+    if arguments.command == "submit":
+        with open(arguments.config, "r") as f:
+            config = yaml.safe_load(f)
+        if arguments.seed is not None:
+            config["SIMULATION"]["seed"] = arguments.seed
+        answer = request(arguments.socket, {"op": "submit", "config": absolute_paths(config)})
+        if arguments.watch and not answer.get("error") and answer["state"] != DONE:
+            answer = follow_job(arguments.socket, answer["key"])
+    elif arguments.command == "status":
+        answer = request(arguments.socket, {"op": "status", "key": arguments.key})
+    elif arguments.command == "watch":
+        answer = follow_job(arguments.socket, arguments.key)
+    else:
+        answer = request(arguments.socket, {"op": "result", "key": arguments.key})
+        if arguments.output and not answer.get("error"):
+            shutil.copytree(answer["directory"], arguments.output, dirs_exist_ok=True)
+    print(json.dumps(answer, indent=2))
+    if answer.get("error") or answer.get("state") == FAILED:
+        sys.exit(1)
@@ -0,0 +1,196 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import rng
+from adjacency import CSRAdjacency, DynamicAdjacency
+from checkpoint import Checkpointer, restore, save_baseline, load_baseline
+from convergence import ConvergenceMonitor
+from engine import Rewiring, run_asynchronous, run_synchronous, run_parallel
+from graph_cache import GraphCache, get_adjacency
+from instrumentation import Instrumentation
+from player import PlayerStore
+from population import PopulationTracker
+from recorder import SeriesRecorder
+from strategy import UpdateRule
+from utilities import calculate_d_max, init_random_players, build_pay_off_table
+
+
+@dataclass
+class SimulationResult:
+    seed: int
+    adjacency: CSRAdjacency
+    original_players: PlayerStore
+    players: PlayerStore
+    update_rules_win_rates: dict
+    update_rules_played: dict
+    recorder: SeriesRecorder
+    generations_played: int
+    stop_reason: Optional[str]
+    simulation_time: float
+    # the network at the end of a co-evolving run, `adjacency` stays the initial one
+    final_adjacency: Optional[CSRAdjacency] = None
+    rewired: int = 0
+
+
+def graph_seed(settings: dict) -> Optional[int]:
+    return settings["graph_seed"] if settings["graph_seed"] is not None else settings["seed"]
+
+
+def build_adjacency(settings: dict) -> CSRAdjacency:
+    """ The network of a validated SIMULATION config, through the graph cache if one is configured """
+    cache = GraphCache(settings["graph_cache"], settings["graph_cache_size"] * 2 ** 20) \
+        if settings["graph_cache"] else None
+    return get_adjacency(
+        settings["G"],
+        settings["n"],
+        settings["p"],
+        settings["m"],
+        settings["pajek_path"],
+        graph_seed(settings),
+        rng.named_generator(rng.GRAPH_STREAM, graph_seed(settings)),
+        cache
+    )
+
+
+def run_simulation(config: dict, checkpoint_directory: str = None, state: dict = None,
+                   instrumentation: Instrumentation = None) -> SimulationResult:
+    """ One run of the config's SIMULATION settings, validated by config_schema.schema.
+        `state` is a checkpoint loaded from `checkpoint_directory` to continue instead of starting over.
+        An installed `instrumentation` is told the number of edges to expect for its ETA."""
+    settings = config["SIMULATION"]
+    if settings["rewiring_probability"] > 0 and settings["engine"] != "asynchronous":
+        raise ValueError("Rewiring is only supported by the asynchronous engine")
+    rng.seed(state["seed"] if state else settings["seed"])
+    comp_prob = settings["competitive_probability"]
+
+    if state:
+        original_players, adjacency = load_baseline(checkpoint_directory)
+        players = state["players"]
+    else:
+        adjacency = build_adjacency(settings)
+        players = init_random_players(adjacency.n, comp_prob)
+        if checkpoint_directory:
+            # the snapshot a resume starts from, its copy-on-write memory maps stand in for a copy in memory
+            save_baseline(checkpoint_directory, players, adjacency)
+            original_players, adjacency = load_baseline(checkpoint_directory)
+        else:
+            original_players = players.copy()
+
+    pay_off_matrix = np.array(settings["pay_off"])
+    pay_off_table = build_pay_off_table(pay_off_matrix)
+    d_max = calculate_d_max(pay_off_matrix)
+    update_rules_win_rates = {rule: 0 for rule in UpdateRule}
+    update_rules_played = {rule: 0 for rule in UpdateRule}
+    recorder = SeriesRecorder(settings["record_chunk_size"], settings["record_stride"], settings["record_directory"])
+    tracker = PopulationTracker(players, recorder, record=state is None)
+    monitor = ConvergenceMonitor(
+        tracker,
+        comp_prob,
+        settings["generations"],
+        settings["max_seconds"],
+        settings["stop_on_absorbing"],
+        settings["stable_window"],
+        settings["stable_tolerance"]
+    )
+    start_edge = 0
+    if state:
+        restore(state, update_rules_win_rates, update_rules_played, recorder, monitor)
+        start_edge = state["edge"]
+    rewiring = None
+    if settings["rewiring_probability"] > 0:
+        network = DynamicAdjacency.from_state(state["network"]) if state and state["network"] \
+            else DynamicAdjacency.from_csr(adjacency)
+        rewiring = Rewiring(network, settings["rewiring_probability"], settings["rewiring_policy"])
+    checkpointer = Checkpointer(
+        checkpoint_directory,
+        settings["checkpoint_interval"],
+        config,
+        players,
+        update_rules_win_rates,
+        update_rules_played,
+        recorder,
+        monitor,
+        rewiring.network if rewiring is not None else None
+    ) if checkpoint_directory else None
+    generations = 0 if monitor.reason else settings["generations"] - monitor.generation
+    if instrumentation is not None:
+        instrumentation.expect(adjacency.number_of_edges() * generations - start_edge)
+
+    simulation_start = time.perf_counter()
+    if generations == 0:
+        pass
+    elif settings["engine"] == "synchronous":
+        run_synchronous(
+            adjacency,
+            players,
+            pay_off_table,
+            settings["ROUNDS"],
+            generations,
+            comp_prob,
+            d_max,
+            settings["K"],
+            settings["change_update_rule"],
+            update_rules_win_rates,
+            update_rules_played,
+            tracker,
+            rng.generator(),
+            monitor,
+            checkpointer
+        )
+    elif settings["engine"] == "parallel":
+        run_parallel(
+            adjacency,
+            players,
+            pay_off_table,
+            settings["ROUNDS"],
+            comp_prob,
+            d_max,
+            settings["K"],
+            settings["change_update_rule"],
+            update_rules_win_rates,
+            update_rules_played,
+            tracker,
+            settings["workers"],
+            rng.generator(),
+            generations,
+            monitor,
+            checkpointer
+        )
+    else:
+        run_asynchronous(
+            adjacency,
+            players,
+            pay_off_table,
+            settings["ROUNDS"],
+            generations,
+            comp_prob,
+            d_max,
+            settings["K"],
+            settings["change_update_rule"],
+            update_rules_win_rates,
+            update_rules_played,
+            tracker,
+            monitor,
+            checkpointer,
+            start_edge,
+            rewiring
+        )
+    simulation_time = time.perf_counter() - simulation_start
+    if checkpointer is not None:
+        checkpointer.save()
+
+    return SimulationResult(
+        rng.get_seed(),
+        adjacency,
+        original_players,
+        players,
+        update_rules_win_rates,
+        update_rules_played,
+        recorder,
+        monitor.generation,
+        monitor.reason,
+        simulation_time,
+        rewiring.network.to_csr() if rewiring is not None else None,
+        rewiring.network.rewired if rewiring is not None else 0
+    )
@@ -9,30 +9,14 @@ class Strategy(enum.Enum):
 
 
 def get_formatted_rule_name(rule):
-    if rule is UpdateRule.RANDOM:
-        return "Random"
-    if rule is UpdateRule.ADAPT:
-        return "Adapt"
-    if rule is UpdateRule.TIT_FOR_TAT:
-        return "TitForTat"
-    if rule is UpdateRule.REPLICATOR_DYNAMICS:
-        return "Replicator Dynamics"
-    if rule is UpdateRule.BEST_TAKES_OVER:
-        return "BestTakesOver"
-    if rule is UpdateRule.LOGIT_REPLICATOR_DYNAMICS:
-        return "Logit Replicator Dynamics"
-
-
-def get_formatted_name(rule_id: int):
-    switch = {
-        0: "Random",
-        1: "Adapt",
-        2: "Tit for tat",
-        3: "Replicator dynamics",
-        4: "Best takes over",
-        5: "Logit replicator dynamics"
-    }
-    return switch.get(rule_id)
+    from rules import RULES
+    return RULES[UpdateRule(rule)].label
+
+
+def get_formatted_name(rule_id):
+    """ rule_id: an UpdateRule or its value """
+    from rules import RULES
+    return RULES[UpdateRule(rule_id)].title
 
 
 class UpdateRule(enum.Enum):
@@ -43,6 +27,29 @@ class UpdateRule(enum.Enum):
     BEST_TAKES_OVER = 4
     LOGIT_REPLICATOR_DYNAMICS = 5
 
+    @classmethod
+    def extend(cls, name: str) -> "UpdateRule":
+        """ Adds a member with the next free value, rules.register does it for a rule that is not built in.
+            Every per rule count and tally grows by a column, so extend before the first run."""
+        if name in cls.__members__:
+            raise ValueError("update rule {} already exists".format(name))
+        member = object.__new__(cls)
+        member._name_ = name
+        member._value_ = len(UPDATE_RULES)
+        member._sort_order_ = len(cls._member_names_)
+        cls._member_names_.append(name)
+        cls._member_map_[name] = member
+        cls._value2member_map_[member.value] = member
+        type.__setattr__(cls, name, member)
+        UPDATE_RULES.append(member)
+        return member
+
+
+# UpdateRule members by value, including the ones UpdateRule.extend adds
+UPDATE_RULES = list(UpdateRule)
+# the rules above, extensions get the values from here on
+BUILT_IN_RULES = len(UPDATE_RULES)
+
 
 def replicator_dynamics(player, opponent, d_max):
     G_i = (player.pay_off_sum / player.rounds_played) / player.rounds_played
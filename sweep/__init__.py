@@ -0,0 +1,176 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from typing import List, Optional
+import numpy as np
+from config_schema import schema
+from graph_cache import file_hash, graph_key
+from instrumentation import Instrumentation
+from results import ResultStore
+from simulation import run_simulation, build_adjacency, graph_seed
+
+GRAPHS_DIRECTORY = "graphs"
+RESULTS_DIRECTORY = "results"
+FIGURES_DIRECTORY = "figures"
+INDEX_FILE = "sweep.json"
+# settings that do not change what a run computes, they are left out of the cache key
+RUNTIME_KEYS = ("workers", "graph_cache", "graph_cache_size", "record_chunk_size", "record_directory",
+                "layout_cache", "checkpoint_directory", "checkpoint_interval")
+
+
+def expand(grid: dict = None, parameter_sets: List[dict] = None) -> List[dict]:
+    """ Every combination of the grid's values followed by the explicit parameter sets """
+    cells = []
+    if grid:
+        names = list(grid)
+        cells.extend(dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names)))
+    cells.extend(dict(parameters) for parameters in parameter_sets or ())
+    return cells or [{}]
+
+
+def replica_seed(seed: int, replica: int) -> int:
+    return int(np.random.SeedSequence([seed, replica]).generate_state(1, np.uint64)[0] >> np.uint64(1))
+
+
+def replica_graph_seed(base_graph_seed: Optional[int], seed: int, replica: int, vary_graph: bool) -> Optional[int]:
+    """ graph_seed of a replica: the base graph_seed, or the sweep seed, for every replica; with vary_graph one
+        derived from the base graph_seed per replica, or None to follow the replica's seed """
+    if not vary_graph:
+        return base_graph_seed if base_graph_seed is not None else seed
+    return replica_seed(base_graph_seed, replica) if base_graph_seed is not None else None
+
+
+def job_key(settings: dict) -> str:
+    """ Content address of a run: its SIMULATION settings, seed included, without the runtime only keys.
+        The Pajek and initial strategy files are addressed by their contents, so editing one in place is a new run."""
+    description = {name: value for name, value in settings.items() if name not in RUNTIME_KEYS}
+    if settings["G"] == "pajek":
+        description["pajek_path"] = file_hash(settings["pajek_path"], settings["graph_cache"])
+    comp_prob = settings["competitive_probability"]
+    if isinstance(comp_prob, str) and comp_prob != "random":
+        description["competitive_probability"] = file_hash(comp_prob, settings["graph_cache"])
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def result_path(directory: str, key: str) -> str:
+    return os.path.join(directory, RESULTS_DIRECTORY, key)
+
+
+def is_done(directory: str, key: str) -> bool:
+    return key in ResultStore(os.path.join(directory, RESULTS_DIRECTORY))
+
+
+def run_job(directory: str, key: str, settings: dict, figure_format: str = None,
+            instrumentation: Instrumentation = None) -> str:
+    """ Runs the settings and stores the raw results, and the figures if a format is given, in the result store
+        <directory>/results as run <key> """
+    config = {"SIMULATION": settings}
+    result = run_simulation(config, instrumentation=instrumentation)
+    result.recorder.flush()
+
+    def figures(staging: str):
+        import matplotlib
+        matplotlib.use("Agg")
+        from plots import save_plots
+        save_plots(result.original_players, result.adjacency, result.players, result.update_rules_win_rates,
+                   result.recorder, result.recorder, os.path.join(staging, FIGURES_DIRECTORY), figure_format,
+                   settings["layout_cache"], result.final_adjacency)
+
+    ResultStore(os.path.join(directory, RESULTS_DIRECTORY)).write(
+        key,
+        config,
+        result.players,
+        result.update_rules_win_rates,
+        result.update_rules_played,
+        result.recorder,
+        result.final_adjacency,
+        figures if figure_format else None,
+        seed=result.seed,
+        generations_played=result.generations_played,
+        stop_reason=result.stop_reason,
+        rewired=result.rewired,
+        timings={"simulation": result.simulation_time}
+    )
+    return key
+
+
+def _run_job(job) -> str:
+    return run_job(*job)
+
+
+def run_sweep(base_settings: dict,
+              directory: str,
+              grid: dict = None,
+              parameter_sets: List[dict] = None,
+              replicas: int = 1,
+              seed: int = 0,
+              processes: int = 1,
+              vary_graph: bool = False) -> List[dict]:
+    """ Runs every parameter cell `replicas` times on a process pool and returns the index of the cells.
+
+        Results are memoised in <directory>/results/<key>, keyed by the settings and the replica's seed, so an
+        interrupted or extended sweep only runs the missing cells. The networks are generated once, before the
+        pool starts, into a shared graph cache; replicas of a cell play on the same network unless vary_graph.
+        Jobs run with one worker each and without record or checkpoint directories."""
+    os.makedirs(os.path.join(directory, RESULTS_DIRECTORY), exist_ok=True)
+    cells = []
+    jobs = {}
+    for parameters in expand(grid, parameter_sets):
+        for replica in range(replicas):
+            settings = dict(base_settings)
+            settings.update(parameters)
+            settings["seed"] = replica_seed(seed, replica)
+            settings["graph_seed"] = replica_graph_seed(base_settings["graph_seed"], seed, replica, vary_graph)
+            settings["graph_cache"] = base_settings["graph_cache"] or os.path.join(directory, GRAPHS_DIRECTORY)
+            settings["record_directory"] = None
+            settings["checkpoint_directory"] = None
+            if processes > 1:
+                settings["workers"] = 1
+            settings = schema.validate(settings)
+            key = job_key(settings)
+            cells.append({
+                "key": key,
+                "parameters": parameters,
+                "replica": replica,
+                "seed": settings["seed"],
+                "path": os.path.join(RESULTS_DIRECTORY, key)
+            })
+            if not is_done(directory, key):
+                jobs[key] = (directory, key, settings)
+
+    pending = list(jobs.values())
+    graphs = {}
+    for _, _, settings in pending:
+        graphs.setdefault(graph_key(settings["G"], settings["n"], settings["p"], settings["m"],
+                                    settings["pajek_path"], graph_seed(settings), settings["graph_cache"]), settings)
+    for settings in graphs.values():
+        build_adjacency(settings)
+
+    print("{} of {} runs cached, {} to go".format(len(cells) - len(pending), len(cells), len(pending)),
+          file=sys.stderr)
+    if processes > 1 and len(pending) > 1:
+        with multiprocessing.Pool(processes) as pool:
+            for done, _ in enumerate(pool.imap_unordered(_run_job, pending), 1):
+                print("{}/{} runs done".format(done, len(pending)), file=sys.stderr)
+    else:
+        for done, job in enumerate(pending, 1):
+            _run_job(job)
+            print("{}/{} runs done".format(done, len(pending)), file=sys.stderr)
+
+    index = os.path.join(directory, INDEX_FILE)
+    with open(index + ".tmp", "w") as f:
+        json.dump({"cells": cells}, f, indent=2)
+    os.replace(index + ".tmp", index)
+    return cells
+
+
+def load_cell(directory: str, cell: dict) -> Optional[dict]:
+    """ run.json of a cell of the index, None while it is not computed """
+    path = os.path.join(directory, cell["path"], "run.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,35 @@
+import argparse
+import sys
+import yaml
+from schema import SchemaError
+from config_schema import schema, sweep_schema
+from sweep import run_sweep
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Parameter sweep over the simulation config")
+    parser.add_argument("spec", help="path of the sweep file, see sweep.yaml")
+    parser.add_argument("--output", default="./sweeps", help="directory of the cached runs and the sweep index")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    try:
+        with open(arguments.spec, "r") as f:
+            spec = sweep_schema.validate(yaml.safe_load(f)["SWEEP"])
+        with open(spec["config"], "r") as f:
+            base_settings = schema.validate(yaml.safe_load(f)["SIMULATION"])
+        cells = run_sweep(
+            base_settings,
+            arguments.output,
+            spec["grid"],
+            spec["parameter_sets"],
+            spec["replicas"],
+            spec["seed"],
+            spec["processes"],
+            spec["vary_graph"]
+        )
+    except SchemaError as e:
+        sys.exit(str(e))
+    print("{} runs indexed in {}".format(len(cells), arguments.output), file=sys.stderr)
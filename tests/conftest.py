@@ -0,0 +1,90 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import yaml
+from config_schema import schema
+from player import PLAYER_COLUMNS
+from simulation import run_simulation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a run small enough for every test, on top of config.yaml
+SMALL_RUN = {"n": 40, "p": 0.15, "ROUNDS": 10, "generations": 3, "stop_on_absorbing": False, "seed": 11}
+
+
+@pytest.fixture
+def make_settings():
+    """ Validated SIMULATION settings: config.yaml, then SMALL_RUN, then the keyword overrides """
+    def make(**overrides) -> dict:
+        with open(os.path.join(ROOT, "config.yaml")) as f:
+            settings = yaml.safe_load(f)["SIMULATION"]
+        settings.update(SMALL_RUN)
+        settings.update(overrides)
+        return schema.validate(settings)
+    return make
+
+
+@pytest.fixture
+def make_config(make_settings):
+    """ make_settings wrapped in a config, as run_simulation takes it """
+    return lambda **overrides: {"SIMULATION": make_settings(**overrides)}
+
+
+@pytest.fixture
+def run(make_config):
+    """ run_simulation of make_config(**overrides) """
+    return lambda **overrides: run_simulation(make_config(**overrides))
+
+
+def outputs_of(result) -> dict:
+    """ Everything a run leaves behind as arrays: players before and after, the series, the tallies and the
+        networks before and after """
+    outputs = {name: np.array(getattr(result.players, name)) for name in PLAYER_COLUMNS}
+    outputs.update({"original_" + name: np.array(getattr(result.original_players, name)) for name in PLAYER_COLUMNS})
+    outputs.update({name: np.concatenate([np.asarray(chunk[i]) for chunk in result.recorder.iter_chunks()])
+                    for i, name in enumerate(("steps", "ratios", "rule_counts"))})
+    outputs["win_rates"] = np.array(list(result.update_rules_win_rates.values()))
+    outputs["played"] = np.array(list(result.update_rules_played.values()))
+    outputs["edges"] = result.adjacency.edges()
+    outputs["final_edges"] = np.zeros((0, 2), dtype=np.int64) if result.final_adjacency is None \
+        else result.final_adjacency.edges()
+    return outputs
+
+
+def assert_same_outputs(actual, expected):
+    """ Runs, or their outputs_of, left the same arrays behind """
+    actual = actual if isinstance(actual, dict) else outputs_of(actual)
+    expected = expected if isinstance(expected, dict) else outputs_of(expected)
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_array_equal(actual[name], expected[name], err_msg=name)
+
+
+@pytest.fixture
+def outputs():
+    return outputs_of
+
+
+@pytest.fixture
+def assert_same():
+    return assert_same_outputs
+
+
+@pytest.fixture
+def pajek_file(tmp_path) -> str:
+    """ A copy of files/test.net that the test may edit """
+    path = str(tmp_path / "network.net")
+    shutil.copy(os.path.join(ROOT, "files", "test.net"), path)
+    return path
+
+
+@pytest.fixture
+def edit_file():
+    """ Appends `text` to a file and moves its mtime on, so the edit shows in a (size, mtime) signature """
+    def edit(path: str, text: str = "\n"):
+        with open(path, "a") as f:
+            f.write(text)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    return edit
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import pytest
+from benchmarks import FAMILIES, PRESETS, _network, compare, graph_parameters, measure, run_benchmarks, settings_for
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TINY = {"n": [200], "degree": [4], "rounds": [3], "families": FAMILIES, "engines": ("asynchronous",),
+        "repeat": 2, "min_seconds": 0, "calls": 10}
+
+
+def _report(*results) -> dict:
+    return {"results": [{"name": name, "params": params, "seconds": seconds} for name, params, seconds in results]}
+
+
+def test_compare_sorts_results_by_their_slowdown():
+    baseline = _report(("a", {"n": 1}, 1.0), ("b", {"n": 1}, 1.0), ("c", {"n": 1}, 1.0), ("a", {"n": 2}, 0.0))
+    current = _report(("a", {"n": 1}, 1.3), ("b", {"n": 1}, 0.8), ("c", {"n": 1}, 1.1), ("a", {"n": 2}, 1.0),
+                      ("d", {"n": 1}, 1.0))
+    statuses = [(entry["name"], entry["status"]) for entry in compare(current, baseline, 1.2)]
+    assert statuses == [("a", "regression"), ("b", "improvement"), ("c", "ok"), ("a", "regression"), ("d", "new")]
+    assert compare(current, baseline, 1.5)[0]["status"] == "ok"
+
+
+def test_measure_leaves_the_setup_out():
+    def setup():
+        time.sleep(0.02)
+
+    timing = measure(lambda _: time.sleep(0.001), setup, repeat=3, min_seconds=0.005)
+    assert timing["repeat"] == 3 and timing["iterations"] >= 1
+    assert 0.001 <= timing["best"] <= timing["seconds"] < 0.015
+    timed_by_run = measure(lambda _: 0.5, repeat=2, min_seconds=0, timed_by_run=True)
+    assert timed_by_run["seconds"] == 0.5
+
+
+@pytest.mark.parametrize("family", FAMILIES)
+def test_networks_have_about_the_asked_degree(family):
+    adjacency = _network(family, 2000, 8)
+    assert abs(adjacency.degree.mean() - 8) < 1.5
+    # the settings of the same network pass the config schema
+    settings = settings_for(family, 2000, 8, 10)
+    assert (settings["p"], settings["m"]) == tuple(graph_parameters(family, 2000, 8).values())
+
+
+def test_suites_report_every_combination(monkeypatch):
+    monkeypatch.setitem(PRESETS, "tiny", TINY)
+    report = run_benchmarks("tiny", ["graph_generation", "init_random_players"])
+    assert report["meta"]["preset"] == "tiny"
+    names = [(result["name"], result["params"].get("family")) for result in report["results"]]
+    assert names == [("graph_generation", family) for family in FAMILIES] + [("init_random_players", None)]
+    for result in report["results"]:
+        assert result["seconds"] > 0 and result["per_item"] == pytest.approx(result["seconds"] / 200)
+
+
+def test_a_regression_fails_the_command(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(_report(("init_random_players", {"n": 1000}, 1e-12))))
+    output = tmp_path / "benchmark.json"
+    completed = subprocess.run([sys.executable, "-m", "benchmarks", "--only", "init_random_players", "--output",
+                                str(output), "--baseline", str(baseline)], cwd=ROOT, capture_output=True, text=True)
+    assert completed.returncode != 0 and "1 benchmark(s) regressed" in completed.stderr
+    comparison = json.loads(output.read_text())["comparison"]
+    assert [entry["status"] for entry in comparison] == ["regression"]
+    assert np.isfinite(comparison[0]["ratio"])
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+import engine.asynchronous
+import rng
+from adjacency import CSRAdjacency
+from checkpoint import Checkpointer, load_baseline, load_checkpoint, restore, save_baseline
+from convergence import ConvergenceMonitor
+from player import PLAYER_COLUMNS
+from population import PopulationTracker
+from recorder import SeriesRecorder
+from simulation import run_simulation
+from strategy import UpdateRule
+from utilities import init_random_players
+
+
+def _run_state(seed: int):
+    rng.seed(seed)
+    players = init_random_players(30, 0.5)
+    players.pay_off_sum[:] = rng.generator().random(30)
+    recorder = SeriesRecorder(chunk_size=4)
+    tracker = PopulationTracker(players, recorder)
+    for _ in range(9):
+        tracker.record()
+    monitor = ConvergenceMonitor(tracker, 0.5, max_generations=5, stable_window=2)
+    monitor.generation_done()
+    tallies = {rule: rule.value * 3 for rule in UpdateRule}, {rule: rule.value * 5 for rule in UpdateRule}
+    return players, recorder, tracker, monitor, tallies
+
+
+def test_a_checkpoint_restores_the_run_state(tmp_path):
+    players, recorder, tracker, monitor, (win_rates, played) = _run_state(4)
+    # part of the rng block is used up, resume has to continue right after the last draw
+    [rng.random() for _ in range(13)]
+    directory = str(tmp_path / "checkpoint")
+    Checkpointer(directory, 600, {"SIMULATION": {}}, players, win_rates, played, recorder, monitor).save(17)
+    expected_draws = [rng.random() for _ in range(5)]
+
+    state = load_checkpoint(directory)
+    assert state["edge"] == 17
+    for name in PLAYER_COLUMNS:
+        np.testing.assert_array_equal(getattr(state["players"], name), getattr(players, name), err_msg=name)
+    rng.seed(state["seed"])
+    restored_win_rates, restored_played = dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0)
+    restored_recorder = SeriesRecorder(chunk_size=4)
+    restored_monitor = ConvergenceMonitor(PopulationTracker(state["players"], restored_recorder, record=False), 0.5,
+                                          max_generations=5, stable_window=2)
+    restore(state, restored_win_rates, restored_played, restored_recorder, restored_monitor)
+    assert [rng.random() for _ in range(5)] == expected_draws
+    assert (restored_win_rates, restored_played) == (win_rates, played)
+    assert restored_monitor.generation == monitor.generation
+    for expected, actual in zip(recorder.iter_chunks(), restored_recorder.iter_chunks()):
+        for expected_column, actual_column in zip(expected, actual):
+            np.testing.assert_array_equal(expected_column, actual_column)
+
+
+def test_the_baseline_is_a_copy_on_write_snapshot(tmp_path):
+    rng.seed(2)
+    players = init_random_players(20, 0.5)
+    adjacency = CSRAdjacency.from_edges(20, np.column_stack((np.arange(19), np.arange(1, 20))))
+    directory = str(tmp_path / "checkpoint")
+    save_baseline(directory, players, adjacency)
+    baseline, loaded_adjacency = load_baseline(directory)
+    np.testing.assert_array_equal(loaded_adjacency.indices, adjacency.indices)
+    np.testing.assert_array_equal(baseline.strategy, players.strategy)
+    # writes stay in memory, the snapshot on disk is unchanged
+    baseline.pay_off_sum[:] = 1
+    assert not load_baseline(directory)[0].pay_off_sum.any()
+
+
+def test_player_store_copy_is_independent():
+    rng.seed(2)
+    players = init_random_players(20, 0.5)
+    copy = players.copy()
+    players.pay_off_sum[:] = 3
+    players[0].strategy = 1 - copy.strategy[0]
+    assert not copy.pay_off_sum.any()
+    assert copy.strategy[0] != players.strategy[0]
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.mark.parametrize("overrides", [
+    {"engine": "asynchronous"},
+    {"engine": "asynchronous", "rewiring_probability": 0.3},
+    {"engine": "synchronous"},
+    {"engine": "parallel", "workers": 1},
+], ids=["asynchronous", "rewiring", "synchronous", "parallel"])
+@pytest.mark.parametrize("kill_after", [1, 3])
+def test_resume_matches_an_uninterrupted_run(tmp_path, monkeypatch, make_config, run, assert_same, overrides,
+                                             kill_after):
+    monkeypatch.setattr(engine.asynchronous, "CHECKPOINT_EDGES", 16)
+    overrides = dict(overrides, generations=4, checkpoint_interval=1e-9)
+    expected = run(**overrides)
+
+    save = Checkpointer.save
+    saves = []
+
+    def save_then_die(self, edge=0):
+        save(self, edge)
+        saves.append(edge)
+        if len(saves) == kill_after:
+            raise Killed()
+
+    directory = str(tmp_path / "checkpoint")
+    monkeypatch.setattr(Checkpointer, "save", save_then_die)
+    with pytest.raises(Killed):
+        run_simulation(make_config(**overrides), directory)
+    monkeypatch.setattr(Checkpointer, "save", save)
+
+    state = load_checkpoint(directory)
+    assert_same(run_simulation(state["config"], directory, state), expected)
+
+
+def test_runs_without_checkpoints_keep_the_baseline_in_memory(run):
+    result = run(generations=1)
+    for name in PLAYER_COLUMNS:
+        assert not isinstance(getattr(result.original_players, name), np.memmap)
+    # the snapshot is the initial state, not a view of the played columns
+    assert not np.shares_memory(result.original_players.pay_off_sum, result.players.pay_off_sum)
+    assert not result.original_players.pay_off_sum.any()
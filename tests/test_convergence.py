@@ -0,0 +1,29 @@
+import pytest
+import engine.asynchronous
+from convergence import TIME
+
+
+@pytest.mark.parametrize("overrides", [
+    {"engine": "asynchronous"},
+    {"engine": "asynchronous", "rewiring_probability": 0.3},
+    {"engine": "parallel", "workers": 1},
+], ids=["asynchronous", "rewiring", "parallel"])
+def test_time_budget_stops_a_pass_part_way(run, monkeypatch, overrides):
+    monkeypatch.setattr(engine.asynchronous, "CHECKPOINT_EDGES", 16)
+    result = run(max_seconds=1e-9, **overrides)
+    assert result.stop_reason == TIME
+    assert result.generations_played == 0
+    played = sum(result.update_rules_played.values())
+    assert 0 < played < 2 * result.adjacency.number_of_edges() * 10
+
+
+def test_without_a_budget_every_pass_is_played(run, monkeypatch):
+    monkeypatch.setattr(engine.asynchronous, "CHECKPOINT_EDGES", 16)
+    result = run()
+    assert result.generations_played == 3
+    assert sum(result.update_rules_played.values()) == 3 * 2 * result.adjacency.number_of_edges() * 10
+
+
+@pytest.mark.parametrize("tolerance", [0, 0.0, 1])
+def test_stable_tolerance_takes_any_real_number(make_settings, tolerance):
+    assert make_settings(stable_window=2, stable_tolerance=tolerance)["stable_tolerance"] == tolerance
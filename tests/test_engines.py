@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from player import PLAYER_COLUMNS
+
+ENGINES = {
+    "asynchronous": {"engine": "asynchronous"},
+    "rewiring": {"engine": "asynchronous", "rewiring_probability": 0.3},
+    "synchronous": {"engine": "synchronous"},
+    "parallel": {"engine": "parallel", "workers": 1},
+}
+
+
+@pytest.mark.parametrize("overrides", ENGINES.values(), ids=ENGINES.keys())
+def test_same_seed_same_outputs(run, assert_same, overrides):
+    assert_same(run(seed=21, **overrides), run(seed=21, **overrides))
+
+
+@pytest.mark.parametrize("overrides", ENGINES.values(), ids=ENGINES.keys())
+def test_other_seed_other_outputs(run, outputs, overrides):
+    first, second = outputs(run(seed=21, **overrides)), outputs(run(seed=22, **overrides))
+    assert any(not np.array_equal(first[name], second[name]) for name in first)
+
+
+def test_all_engines_start_from_the_same_population(run, outputs):
+    runs = [outputs(run(seed=21, **overrides)) for overrides in ENGINES.values()]
+    for other in runs[1:]:
+        for name in ["edges"] + ["original_" + name for name in PLAYER_COLUMNS]:
+            np.testing.assert_array_equal(other[name], runs[0][name], err_msg=name)
+
+
+def test_parallel_outputs_do_not_depend_on_the_worker_count(run, assert_same):
+    assert_same(run(seed=21, engine="parallel", workers=2), run(seed=21, engine="parallel", workers=1))
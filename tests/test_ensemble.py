@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pytest
+from ensemble import EnsembleStatistics, _run_replica, columns, run_ensemble, write_ensemble
+from sweep import replica_seed
+
+
+def _replicas(seed: int, lengths) -> list:
+    generator = np.random.default_rng(seed)
+    return [generator.random((length, len(columns()))) for length in lengths]
+
+
+def _padded(replicas: list) -> np.ndarray:
+    """ Every replica held at its final values up to the longest one """
+    steps = max(len(values) for values in replicas)
+    return np.stack([np.vstack((values, np.tile(values[-1], (steps - len(values), 1)))) for values in replicas])
+
+
+@pytest.mark.parametrize("lengths", [[30] * 8, [30, 10, 45, 1, 45, 20]], ids=["equal", "stopped_early"])
+def test_statistics_match_numpy_over_the_replicas(lengths):
+    replicas = _replicas(len(lengths), lengths)
+    statistics = EnsembleStatistics()
+    for values in replicas:
+        statistics.add(values)
+    padded = _padded(replicas)
+    assert statistics.count == len(replicas) and len(statistics) == padded.shape[1]
+    np.testing.assert_allclose(statistics.mean, padded.mean(axis=0))
+    np.testing.assert_allclose(statistics.variance(), padded.var(axis=0, ddof=1))
+    np.testing.assert_allclose(statistics.confidence_interval(),
+                               1.96 * np.sqrt(padded.var(axis=0, ddof=1) / len(replicas)))
+    finals = np.array([values[-1] for values in replicas])
+    expected = [np.histogram(finals[:, column], bins=statistics.bins, range=(0, 1))[0]
+                for column in range(len(columns()))]
+    np.testing.assert_array_equal(statistics.final_histograms(), expected)
+
+
+def test_quantiles_are_within_a_bin_of_numpy():
+    replicas = _replicas(5, [40] * 200)
+    statistics = EnsembleStatistics(bins=50, stride=3)
+    for values in replicas:
+        statistics.add(values)
+    ratios = np.stack(replicas)[:, :, 0]
+    expected = np.quantile(ratios, [0.05, 0.25, 0.5, 0.75, 0.95], axis=0).T
+    # a bin, and the gap between neighbouring replicas the two interpolate over
+    assert np.abs(statistics.quantiles() - expected).max() <= 1 / 50 + 1 / 100
+    np.testing.assert_array_equal(statistics.steps, np.arange(40) * 3)
+
+
+def test_replicas_are_runs_with_derived_seeds(make_config):
+    # without vary_graph every replica plays on the network of graph_seed
+    config = make_config(graph_seed=7)
+    statistics = run_ensemble(config, 3, seed=5)
+    replicas = [_run_replica((config, replica_seed(5, replica))) for replica in range(3)]
+    np.testing.assert_allclose(statistics.mean, _padded(replicas).mean(axis=0))
+    # the rule ratios of a step add up to one
+    np.testing.assert_allclose(statistics.mean[:, 1:].sum(axis=1), 1)
+
+
+def test_processes_give_the_same_statistics(make_config, tmp_path):
+    config = make_config()
+    one, two = run_ensemble(config, 4, seed=2), run_ensemble(config, 4, seed=2, processes=2)
+    np.testing.assert_allclose(two.mean, one.mean)
+    np.testing.assert_allclose(two.variance(), one.variance())
+    directory = write_ensemble(str(tmp_path), config, two, seed=2)
+    with np.load(os.path.join(directory, "ensemble.npz")) as stored:
+        np.testing.assert_allclose(stored["mean"], one.mean)
+        assert stored["quantiles"].shape == (len(one), 5)
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import graph_cache
+from adjacency import CSRAdjacency
+from graph_cache import GraphCache, get_adjacency, graph_key
+
+def _adjacency(n: int) -> CSRAdjacency:
+    return CSRAdjacency.from_edges(n, np.column_stack((np.arange(n - 1), np.arange(1, n))))
+
+
+def _count_hashes(monkeypatch) -> list:
+    hashed = []
+    sha256 = graph_cache._sha256
+
+    def counting(path):
+        hashed.append(path)
+        return sha256(path)
+
+    monkeypatch.setattr(graph_cache, "_sha256", counting)
+    monkeypatch.setattr(graph_cache, "_file_hashes", {})
+    return hashed
+
+
+def test_an_entry_larger_than_the_budget_is_kept_until_the_next_store(tmp_path):
+    cache = GraphCache(str(tmp_path / "graphs"), max_bytes=1)
+    cache.store("first", _adjacency(100))
+    first = cache.load("first")
+    assert first is not None
+    np.testing.assert_array_equal(first.indices, _adjacency(100).indices)
+    cache.store("second", _adjacency(50))
+    assert cache.load("second") is not None
+    assert cache.load("first") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = GraphCache(str(tmp_path / "graphs"), max_bytes=10 ** 6)
+    for key in ("a", "b", "c"):
+        cache.store(key, _adjacency(1000))
+    entry_size = sum(os.path.getsize(os.path.join(cache.directory, "a", name))
+                     for name in os.listdir(os.path.join(cache.directory, "a")))
+    cache.max_bytes = 3 * entry_size
+    past = os.path.getmtime(os.path.join(cache.directory, "b")) - 60
+    os.utime(os.path.join(cache.directory, "b"), (past, past))
+    cache.store("d", _adjacency(1000))
+    assert sorted(name for name in os.listdir(cache.directory) if not name.endswith(".json")) == ["a", "c", "d"]
+
+
+def test_pajek_key_follows_the_file_contents(monkeypatch, pajek_file, edit_file):
+    hashed = _count_hashes(monkeypatch)
+    path = pajek_file
+    key = graph_key("pajek", None, None, None, path, None)
+    assert graph_key("pajek", None, None, None, path, None) == key
+    assert len(hashed) == 1
+    edit_file(path)
+    assert graph_key("pajek", None, None, None, path, None) != key
+    assert len(hashed) == 2
+
+
+def test_file_hashes_are_remembered_in_the_cache_directory(tmp_path, monkeypatch, pajek_file, edit_file):
+    hashed = _count_hashes(monkeypatch)
+    path = pajek_file
+    cache = GraphCache(str(tmp_path / "graphs"), 2 ** 20)
+    stored = get_adjacency("pajek", None, None, None, path, None, cache=cache)
+    assert len(hashed) == 1
+    # a new process only has the cache directory
+    monkeypatch.setattr(graph_cache, "_file_hashes", {})
+    loaded = get_adjacency("pajek", None, None, None, path, None, cache=cache)
+    assert len(hashed) == 1
+    np.testing.assert_array_equal(stored.indices, loaded.indices)
+    edit_file(path)
+    get_adjacency("pajek", None, None, None, path, None, cache=cache)
+    assert len(hashed) == 2
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import rng
+from random_graphs import _pair_from_index, barabasi_albert_edges, erdos_renyi_edges, get_edges_from_name, \
+    get_graph_from_name, small_world_edges
+
+
+def _assert_simple(n: int, edges: np.ndarray):
+    """ Undirected edges between nodes 0..n-1, without loops or duplicates """
+    assert edges.dtype == np.int64 and edges.shape[1:] == (2,)
+    assert ((0 <= edges) & (edges < n)).all()
+    assert (edges[:, 0] != edges[:, 1]).all()
+    assert len(np.unique(np.sort(edges, axis=1), axis=0)) == len(edges)
+
+
+@pytest.mark.parametrize("n", [2, 3, 10, 57])
+def test_pair_from_index_inverts_the_pair_numbering(n):
+    rows, columns = np.triu_indices(n, 1)
+    np.testing.assert_array_equal(_pair_from_index(n, np.arange(n * (n - 1) // 2)), np.column_stack((rows, columns)))
+
+
+def test_pair_from_index_is_exact_on_large_networks():
+    n = 200_000
+    starts = np.array([0, 1, 99_999, n - 3, n - 2], dtype=np.int64)
+    row_start = starts * (2 * n - starts - 1) // 2
+    # the first and last pair of each row
+    indices = np.concatenate((row_start, row_start + n - starts - 2))
+    expected = np.concatenate((np.column_stack((starts, starts + 1)), np.column_stack((starts, np.full(5, n - 1)))))
+    np.testing.assert_array_equal(_pair_from_index(n, indices), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_erdos_renyi_edges_are_a_sample_of_the_pairs(seed):
+    n, p = 300, 0.05
+    edges = erdos_renyi_edges(n, p, np.random.default_rng(seed))
+    _assert_simple(n, edges)
+    assert (edges[:, 0] < edges[:, 1]).all()
+    # pairs come out in order
+    numbering = edges[:, 0] * n + edges[:, 1]
+    assert (np.diff(numbering) > 0).all()
+    pairs = n * (n - 1) // 2
+    assert abs(len(edges) - pairs * p) < 5 * np.sqrt(pairs * p * (1 - p))
+    np.testing.assert_array_equal(edges, erdos_renyi_edges(n, p, np.random.default_rng(seed)))
+
+
+def test_erdos_renyi_edges_at_the_extremes():
+    assert erdos_renyi_edges(10, 0).shape == (0, 2)
+    assert erdos_renyi_edges(1, 0.5).shape == (0, 2)
+    np.testing.assert_array_equal(erdos_renyi_edges(5, 1), np.column_stack(np.triu_indices(5, 1)))
+
+
+def test_every_pair_is_equally_likely():
+    n, p = 12, 0.2
+    generator = np.random.default_rng(3)
+    counts = np.zeros((n, n))
+    for _ in range(2000):
+        edges = erdos_renyi_edges(n, p, generator)
+        counts[edges[:, 0], edges[:, 1]] += 1
+    frequencies = counts[np.triu_indices(n, 1)] / 2000
+    assert np.abs(frequencies - p).max() < 0.05
+
+
+@pytest.mark.parametrize("m", [1, 2, 4])
+def test_small_world_edges_keep_the_lattice(m):
+    n = 50
+    edges = small_world_edges(n, m, 0.3, np.random.default_rng(m))
+    _assert_simple(n, edges)
+    ring = {(node, (node + offset) % n) for node in range(n) for offset in range(1, m // 2 + 1)}
+    present = {tuple(edge) for edge in np.sort(edges, axis=1).tolist()}
+    assert {tuple(sorted(edge)) for edge in ring} <= present
+    with pytest.raises(ValueError):
+        small_world_edges(3, 4)
+
+
+@pytest.mark.parametrize("m", [1, 3])
+def test_barabasi_albert_nodes_attach_to_m_earlier_nodes(m):
+    n = 200
+    edges = barabasi_albert_edges(n, m, np.random.default_rng(m))
+    _assert_simple(n, edges)
+    assert len(edges) == (n - m) * m
+    assert (edges[:, 1] < edges[:, 0]).all()
+    np.testing.assert_array_equal(np.bincount(edges[:, 0], minlength=n)[m:], m)
+    with pytest.raises(ValueError):
+        barabasi_albert_edges(5, 5)
+
+
+@pytest.mark.parametrize("name", ["erdos_renyi", "small_world", "barabasi_albert"])
+def test_graphs_are_built_from_the_edges(name):
+    rng.seed(1)
+    n, edges = get_edges_from_name(name, 60, 0.1, 2, None)
+    rng.seed(1)
+    graph = get_graph_from_name(name, 60, 0.1, 2, None)
+    assert sorted(graph.nodes()) == list(range(n))
+    assert {frozenset(edge) for edge in graph.edges()} == {frozenset(edge) for edge in edges.tolist()}
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import yaml
+from player import PLAYER_COLUMNS
+from results import write_results
+from strategy import UpdateRule
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main.py run in this interpreter, the plotting modules it imported are printed last
+RUN_MAIN = """
+import runpy, sys
+sys.argv = ["main.py"] + sys.argv[1:]
+runpy.run_path("main.py", run_name="__main__")
+print(sorted(name for name in ("matplotlib", "matplotlib.pyplot", "plots") if name in sys.modules))
+"""
+
+
+def _main(tmp_path, make_config, *arguments) -> str:
+    config = tmp_path / "config.yaml"
+    config.write_text(yaml.safe_dump(make_config()))
+    completed = subprocess.run([sys.executable, "-c", RUN_MAIN, "--config", str(config),
+                                "--output", str(tmp_path / "output"), *arguments],
+                               cwd=ROOT, check=True, capture_output=True, text=True)
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def test_write_results_round_trips_the_run(tmp_path, run, make_config):
+    result = run()
+    result.recorder.flush()
+    directory = write_results(str(tmp_path), make_config(), result.players, result.update_rules_win_rates,
+                              result.update_rules_played, result.recorder, seed=result.seed, timings={"simulation": 1.0})
+    with open(os.path.join(directory, "run.json")) as f:
+        manifest = json.load(f)
+    assert manifest["config"] == make_config()
+    assert manifest["seed"] == result.seed and manifest["timings"] == {"simulation": 1.0}
+    assert manifest["update_rules"] == [rule.name for rule in UpdateRule]
+    assert manifest["update_rules_played"] == {rule.name: count for rule, count in result.update_rules_played.items()}
+    for name in PLAYER_COLUMNS:
+        np.testing.assert_array_equal(np.load(os.path.join(directory, "players", name + ".npy")),
+                                      getattr(result.players, name), err_msg=name)
+    chunks = list(result.recorder.iter_chunks())
+    for i, name in enumerate(("steps", "competitive_ratios", "rule_counts")):
+        stored = np.load(os.path.join(directory, name + ".npy"))
+        np.testing.assert_array_equal(stored, np.concatenate([chunk[i] for chunk in chunks]), err_msg=name)
+        assert manifest["arrays"][name]["shape"] == list(stored.shape)
+    # a run on a fixed network has no final network
+    assert "final_indptr" not in manifest["arrays"]
+
+
+def test_headless_runs_write_results_without_plotting(tmp_path, make_config):
+    assert _main(tmp_path, make_config, "--headless") == "[]"
+    with open(tmp_path / "output" / "run.json") as f:
+        manifest = json.load(f)
+    assert manifest["seed"] == 11 and manifest["generations_played"] == 3
+    assert set(manifest["timings"]) == {"cold_start", "simulation"}
+    assert not (tmp_path / "output" / "figures").exists()
+
+
+@pytest.mark.parametrize("figure_format", ["png", "svg"])
+def test_figures_are_written_to_files(tmp_path, make_config, figure_format):
+    _main(tmp_path, make_config, "--figures", figure_format)
+    names = ["network_before", "network_after", "win_ratios", "update_rule_win_ratios", "competitive_ratios",
+             "update_rule_ratios"]
+    assert sorted(os.listdir(tmp_path / "output" / "figures")) == \
+        sorted("{}.{}".format(name, figure_format) for name in names)
+    assert (tmp_path / "output" / "run.json").is_file()
@@ -0,0 +1,77 @@
+import json
+import time
+import pytest
+from engine import asynchronous
+import instrumentation
+from instrumentation import Instrumentation, SamplingProfiler
+from population import PopulationTracker
+from simulation import run_simulation
+
+
+def _engine_functions() -> list:
+    """ The functions an installed Instrumentation replaces """
+    return [asynchronous.simulate_round, asynchronous.play_rounds, asynchronous.update_strategy,
+            PopulationTracker.record, PopulationTracker.strategy_changed, PopulationTracker.rules_changed]
+
+
+@pytest.mark.parametrize("engine", ["asynchronous", "synchronous", "parallel"])
+@pytest.mark.parametrize("timed", [True, False], ids=["timed", "counted"])
+def test_instrumented_runs_play_the_same_game(make_config, run, assert_same, engine, timed):
+    originals = _engine_functions()
+    with Instrumentation(timed=timed) as instruments:
+        instrumented = run_simulation(make_config(engine=engine), instrumentation=instruments)
+    assert _engine_functions() == originals
+    assert_same(instrumented, run(engine=engine))
+    edges = instrumented.adjacency.number_of_edges() * instrumented.generations_played
+    assert instruments.edges == instruments.expected_edges == edges
+    # the parallel engine's pool phases are timed either way, they cost a clock read per batch
+    hot_paths = [name for name in instruments.to_dict()["timers"] if not name.startswith("pool")]
+    assert bool(hot_paths) == timed
+
+
+def test_timers_and_rule_counters_of_an_asynchronous_run(make_config):
+    with Instrumentation() as instruments:
+        result = run_simulation(make_config(), instrumentation=instruments)
+    report = instruments.to_dict()
+    edges = result.adjacency.number_of_edges() * result.generations_played
+    assert report["timers"]["simulate_round"]["calls"] == report["timers"]["play_rounds"]["calls"] == edges
+    # both players of an edge update
+    assert sum(rule["calls"] for rule in report["update_rules"].values()) == 2 * edges
+    assert sum(rule["strategy_flips"] for rule in report["update_rules"].values()) == report["strategy_flips"]
+    assert sum(rule["rule_changes"] for rule in report["update_rules"].values()) == report["rule_changes"]
+    assert report["strategy_flips"] > 0
+    assert "simulate_round" in instruments.summary()
+
+
+def test_progress_is_reported_to_the_file(tmp_path, monkeypatch, make_config):
+    monkeypatch.setattr(instrumentation, "PROGRESS_CHECK_EDGES", 50)
+    path = tmp_path / "progress.jsonl"
+    with Instrumentation(progress_interval=0, progress_file=str(path), timed=False) as instruments:
+        run_simulation(make_config(), instrumentation=instruments)
+    reports = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(reports) > 1
+    assert [report["edges"] for report in reports] == sorted(report["edges"] for report in reports)
+    assert all(report["expected_edges"] == instruments.expected_edges for report in reports)
+    assert reports[-1]["eta"] >= 0
+
+
+def _busy(seconds: float):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_the_profiler_samples_the_running_stack(tmp_path):
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    try:
+        _busy(0.2)
+    finally:
+        profiler.stop()
+    assert sum(profiler.stacks.values()) > 10
+    assert all(stack.split(";")[-1].endswith(":_busy") for stack in profiler.stacks)
+    path = tmp_path / "stacks.txt"
+    profiler.write(str(path))
+    lines = path.read_text().splitlines()
+    assert len(lines) == len(profiler.stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,37 @@
+from sweep import job_key, replica_graph_seed, replica_seed
+
+
+def test_pajek_file_edited_in_place_is_a_new_job(make_settings, pajek_file, edit_file):
+    settings = make_settings(G="pajek", pajek_path=pajek_file, seed=1)
+    before = job_key(settings)
+    assert job_key(settings) == before
+    edit_file(pajek_file)
+    assert job_key(settings) != before
+
+
+def test_strategy_file_edited_in_place_is_a_new_job(tmp_path, make_settings, edit_file):
+    path = str(tmp_path / "strategies.json")
+    with open(path, "w") as f:
+        f.write('{"1": "C", "2": "D"}')
+    settings = make_settings(competitive_probability=path, seed=1)
+    before = job_key(settings)
+    with open(path, "w") as f:
+        f.write('{"1": "D", "2": "D"}')
+    edit_file(path, "")
+    assert job_key(settings) != before
+
+
+def test_runtime_settings_do_not_change_the_key(make_settings):
+    settings = make_settings(seed=1)
+    assert job_key(settings) == job_key(dict(settings, workers=4, graph_cache="/elsewhere"))
+    assert job_key(settings) != job_key(dict(settings, seed=2))
+
+
+def test_replica_graph_seeds():
+    # the same network for every replica unless vary_graph
+    assert {replica_graph_seed(None, 7, replica, False) for replica in range(4)} == {7}
+    assert {replica_graph_seed(3, 7, replica, False) for replica in range(4)} == {3}
+    # with vary_graph every replica gets its own network, also when a base graph_seed is set
+    assert len({replica_graph_seed(3, 7, replica, True) for replica in range(4)}) == 4
+    assert replica_graph_seed(3, 7, 1, True) == replica_seed(3, 1)
+    assert replica_graph_seed(None, 7, 1, True) is None
@@ -0,0 +1,108 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import pytest
+import rng
+from adjacency import CSRAdjacency
+from plots import network
+from plots.network import LayoutCache, NetworkLayout, compute_layout, draw_network, get_layout, layout_key, \
+    level_of_detail
+from player import PlayerStore
+from random_graphs import barabasi_albert_edges, erdos_renyi_edges
+
+
+@pytest.fixture
+def small_thresholds(monkeypatch):
+    """ Level of detail switches at 20 and 200 nodes and samples 50 of them, so every mode is quick to reach """
+    monkeypatch.setattr(network, "FULL_DETAIL_NODES", 20)
+    monkeypatch.setattr(network, "SAMPLED_NODES", 200)
+    monkeypatch.setattr(network, "SAMPLE_SIZE", 50)
+
+
+def _adjacency(n: int, seed: int = 0) -> CSRAdjacency:
+    return CSRAdjacency.from_edges(n, barabasi_albert_edges(n, 2, np.random.default_rng(seed)))
+
+
+def test_level_of_detail_thresholds():
+    assert level_of_detail(1) == level_of_detail(network.FULL_DETAIL_NODES) == "full"
+    assert level_of_detail(network.FULL_DETAIL_NODES + 1) == level_of_detail(network.SAMPLED_NODES) == "sampled"
+    assert level_of_detail(network.SAMPLED_NODES + 1) == "density"
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_component_labels_match_networkx(seed):
+    rng.seed(seed)
+    adjacency = CSRAdjacency.from_edges(80, erdos_renyi_edges(80, 0.02))
+    labels = adjacency.component_labels()
+    graph = nx.Graph(adjacency.edges().tolist())
+    graph.add_nodes_from(range(80))
+    for component in nx.connected_components(graph):
+        nodes = sorted(component)
+        assert (labels[nodes] == nodes[0]).all()
+    assert len(np.unique(labels)) == nx.number_connected_components(graph)
+
+
+@pytest.mark.parametrize("n, mode, drawn", [(20, "full", 20), (150, "sampled", 50), (300, "density", 300)])
+def test_layouts_by_level_of_detail(small_thresholds, n, mode, drawn):
+    layout = compute_layout(_adjacency(n))
+    assert layout.mode == mode
+    assert layout.nodes.shape == (drawn,) and layout.positions.shape == (drawn, 2)
+    assert len(np.unique(layout.nodes)) == drawn and np.isfinite(layout.positions).all()
+    # the same graph is laid out the same way
+    again = compute_layout(_adjacency(n))
+    np.testing.assert_array_equal(again.nodes, layout.nodes)
+    np.testing.assert_allclose(again.positions, layout.positions)
+
+
+def test_lower_detail_lays_out_the_largest_component(small_thresholds):
+    edges = np.concatenate((barabasi_albert_edges(100, 2, np.random.default_rng(1)),
+                            np.array([[100, 101], [102, 103]])))
+    layout = compute_layout(CSRAdjacency.from_edges(104, edges))
+    assert layout.mode == "sampled" and len(layout.nodes) == 50
+    assert layout.nodes.max() < 100
+
+
+def test_spectral_positions_separate_loosely_joined_groups():
+    graph = nx.barbell_graph(30, 0)
+    positions = network.spectral_positions(CSRAdjacency.from_graph(graph, 60))
+    left, right = positions[:30, 0], positions[30:, 0]
+    assert (np.sign(left) == np.sign(left[0])).all() and (np.sign(right) == -np.sign(left[0])).all()
+
+
+def test_layouts_are_cached_by_the_network(tmp_path, monkeypatch, small_thresholds):
+    adjacency = _adjacency(150)
+    layout = get_layout(adjacency, str(tmp_path))
+    monkeypatch.setattr(network, "compute_layout", lambda adjacency: pytest.fail("laid out again"))
+    cached = get_layout(adjacency, str(tmp_path))
+    assert cached.mode == layout.mode
+    np.testing.assert_array_equal(cached.nodes, layout.nodes)
+    np.testing.assert_array_equal(cached.positions, layout.positions)
+    # the networkx graph of the same network has the same key
+    graph = nx.Graph(adjacency.edges().tolist())
+    assert layout_key(network.as_adjacency(graph)) == layout_key(adjacency)
+    assert layout_key(_adjacency(150, seed=1)) != layout_key(adjacency)
+
+
+def test_a_broken_cache_file_is_laid_out_again(tmp_path):
+    cache = LayoutCache(str(tmp_path))
+    (tmp_path / "broken.npz").write_bytes(b"not an npz")
+    assert cache.load("broken") is None and cache.load("missing") is None
+    layout = NetworkLayout("full", np.arange(3), np.zeros((3, 2)))
+    cache.store("broken", layout)
+    assert cache.load("broken").mode == "full"
+    assert [path.name for path in tmp_path.iterdir()] == ["broken.npz"]
+
+
+@pytest.mark.parametrize("n", [20, 150, 300])
+def test_every_level_of_detail_draws(small_thresholds, n):
+    adjacency = _adjacency(n)
+    players = PlayerStore(n)
+    players.strategy[::2] = 1
+    plt.figure()
+    try:
+        draw_network(adjacency, players, "players", compute_layout(adjacency))
+        assert plt.gcf().axes
+    finally:
+        plt.close("all")
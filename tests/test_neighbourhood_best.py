@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import rng
+from adjacency import CSRAdjacency, NeighbourhoodBest
+from engine import run_asynchronous
+from population import PopulationTracker
+from random_graphs import edges_to_graph, erdos_renyi_edges
+from strategy import UpdateRule
+from utilities import init_random_players, build_pay_off_table, calculate_d_max, find_most_successful_player
+
+PAY_OFF = np.array([[[-1, -1], [0, 10]], [[10, 0], [5, 5]]])
+
+
+def _network(seed: int, n: int = 60, p: float = 0.1):
+    rng.seed(seed)
+    adjacency = CSRAdjacency.from_edges(n, erdos_renyi_edges(n, p))
+    return adjacency, edges_to_graph(adjacency.n, adjacency.edges())
+
+
+def _scan(graph, players, node: int) -> int:
+    index, players.neighbourhood_best = players.neighbourhood_best, None
+    try:
+        return find_most_successful_player(graph, players[node], players)
+    finally:
+        players.neighbourhood_best = index
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_and_scan_agree_on_tied_pay_offs(seed):
+    adjacency, graph = _network(seed)
+    players = init_random_players(adjacency.n, 0.5)
+    generator = np.random.default_rng(seed)
+    # few distinct values, so most neighbourhoods have tied maxima
+    players.pay_off_sum[:] = generator.integers(-1, 3, adjacency.n) * 100
+    index = NeighbourhoodBest(CSRAdjacency.from_graph_order(graph, adjacency.n), players.pay_off_sum)
+    index.attach(players)
+    for node in range(adjacency.n):
+        assert index.best(node) == _scan(graph, players, node)
+    # pay off changes through the players show in the next query
+    for node in generator.integers(0, adjacency.n, 200).tolist():
+        players[node].pay_off_sum = float(generator.integers(-1, 3) * 100)
+        changed = int(generator.integers(0, adjacency.n))
+        assert index.best(changed) == _scan(graph, players, changed)
+
+
+def _best_takes_over_run(seed: int, attach: bool):
+    adjacency, _ = _network(seed)
+    players = init_random_players(adjacency.n, 0.5)
+    players.update_rule[::2] = UpdateRule.BEST_TAKES_OVER.value
+    attach_index = NeighbourhoodBest.attach
+    if not attach:
+        NeighbourhoodBest.attach = lambda self, store: None
+    try:
+        run_asynchronous(adjacency, players, build_pay_off_table(PAY_OFF), 100, 5, 0.5, calculate_d_max(PAY_OFF),
+                         0.13, True, dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0),
+                         PopulationTracker(players))
+    finally:
+        NeighbourhoodBest.attach = attach_index
+    return players
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_asynchronous_runs_match_with_and_without_the_index(seed):
+    indexed = _best_takes_over_run(seed, True)
+    scanned = _best_takes_over_run(seed, False)
+    for column in ("strategy", "update_rule", "pay_off_sum"):
+        np.testing.assert_array_equal(getattr(indexed, column), getattr(scanned, column))
@@ -0,0 +1,18 @@
+import numpy as np
+from pajek import read_pajek_edges, write_pajek_edges
+
+
+def test_default_labels_read_back_unchanged(tmp_path):
+    path = str(tmp_path / "network.net")
+    edges = np.array([[0, 1], [1, 2], [0, 3]])
+    write_pajek_edges(path, 5, edges)
+    n, read_edges, labels = read_pajek_edges(path, with_labels=True)
+    assert n == 5
+    assert (read_edges == edges).all()
+    assert labels == [str(i + 1) for i in range(5)]
+
+
+def test_given_labels_are_written(tmp_path):
+    path = str(tmp_path / "network.net")
+    write_pajek_edges(path, 2, np.array([[0, 1]]), labels=["a", "b c"])
+    assert read_pajek_edges(path, with_labels=True)[2] == ["a", "b c"]
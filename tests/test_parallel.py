@@ -0,0 +1,88 @@
+import networkx as nx
+import numpy as np
+import pytest
+import rng
+from adjacency import CSRAdjacency
+from engine import run_asynchronous, run_parallel
+from player import PLAYER_COLUMNS, PlayerStore
+from population import PopulationTracker
+from random_graphs import erdos_renyi_edges
+from strategy import UpdateRule
+from utilities import build_pay_off_table, calculate_d_max
+
+PAY_OFF = np.array([[[-1, -1], [0, 10]], [[10, 0], [5, 5]]])
+# rules that draw nothing, so the two engines can only differ in the order they play and update in
+DETERMINISTIC = [UpdateRule.ADAPT, UpdateRule.TIT_FOR_TAT, UpdateRule.REPLICATOR_DYNAMICS,
+                 UpdateRule.BEST_TAKES_OVER]
+# graphs whose edges all share a node, the edge colouring puts every edge in a batch of its own
+ONE_EDGE_BATCHES = {"star": nx.star_graph(9), "triangle": nx.complete_graph(3), "edge": nx.path_graph(2)}
+
+
+def _players(n: int, seed: int) -> PlayerStore:
+    generator = np.random.default_rng(seed)
+    players = PlayerStore(n)
+    players.strategy[:] = generator.integers(0, 2, n)
+    players.update_rule[:] = generator.choice([rule.value for rule in DETERMINISTIC], n)
+    return players
+
+
+def _run(engine: str, adjacency: CSRAdjacency, players: PlayerStore, generations: int):
+    win_rates, played = dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0)
+    tracker = PopulationTracker(players)
+    arguments = (adjacency, players, build_pay_off_table(PAY_OFF), 3)
+    if engine == "parallel":
+        run_parallel(*arguments, 0.5, calculate_d_max(PAY_OFF), 0.13, True, win_rates, played, tracker, 1,
+                     np.random.default_rng(0), generations)
+    else:
+        rng.seed(0)
+        run_asynchronous(*arguments, generations, 0.5, calculate_d_max(PAY_OFF), 0.13, True, win_rates, played,
+                         tracker)
+    series = [np.concatenate([np.asarray(chunk[i]) for chunk in tracker.recorder.iter_chunks()]) for i in (1, 2)]
+    return players, win_rates, played, series
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("graph", ONE_EDGE_BATCHES.values(), ids=ONE_EDGE_BATCHES.keys())
+def test_one_edge_batches_play_like_the_asynchronous_engine(graph, seed):
+    adjacency = CSRAdjacency.from_graph(graph, graph.number_of_nodes())
+    parallel = _run("parallel", adjacency, _players(adjacency.n, seed), 6)
+    asynchronous = _run("asynchronous", adjacency, _players(adjacency.n, seed), 6)
+    for column in PLAYER_COLUMNS:
+        np.testing.assert_array_equal(getattr(parallel[0], column), getattr(asynchronous[0], column),
+                                      err_msg=column)
+    assert parallel[1:3] == asynchronous[1:3]
+    # one row per edge, the same rows
+    for actual, expected in zip(parallel[3], asynchronous[3]):
+        np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_the_series_has_a_row_per_edge(seed):
+    rng.seed(seed)
+    adjacency = CSRAdjacency.from_edges(50, erdos_renyi_edges(50, 0.1))
+    players = _players(adjacency.n, seed)
+    _, _, _, (ratios, rule_counts) = _run("parallel", adjacency, players, 4)
+    assert len(ratios) == len(rule_counts) == 1 + 4 * adjacency.number_of_edges()
+    # the last row is the final population
+    assert ratios[-1] == np.count_nonzero(players.strategy == 0) / adjacency.n
+    np.testing.assert_array_equal(rule_counts[-1], np.bincount(players.update_rule, minlength=len(UpdateRule)))
+
+
+def test_record_games_records_like_record_after_every_game():
+    generator = np.random.default_rng(4)
+    players = _players(30, 4)
+    batched, one_by_one = PopulationTracker(players), PopulationTracker(players)
+    games = generator.permutation(30).reshape(15, 2)
+    new_strategies = generator.integers(0, 2, (15, 2))
+    new_rules = generator.integers(0, len(UpdateRule), (15, 2))
+
+    batched.record_games(players.strategy[games], new_strategies, players.update_rule[games], new_rules)
+    for game, strategies, rules in zip(games, new_strategies, new_rules):
+        one_by_one.strategies_changed(players.strategy[game], strategies)
+        one_by_one.rules_changed(players.update_rule[game], rules)
+        one_by_one.record()
+    for actual, expected in zip(batched.recorder.iter_chunks(), one_by_one.recorder.iter_chunks()):
+        for actual_values, expected_values in zip(actual, expected):
+            np.testing.assert_array_equal(actual_values, expected_values)
+    assert batched.cooperators == one_by_one.cooperators
+    np.testing.assert_array_equal(batched.rule_counts, one_by_one.rule_counts)
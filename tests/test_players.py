@@ -0,0 +1,80 @@
+import copy
+import numpy as np
+import pytest
+from player import PLAYER_COLUMNS, Player, PlayerStore, PlayerView
+from rules import get_user_by_id
+from strategy import Strategy, UpdateRule
+
+
+def _store(n: int, seed: int) -> PlayerStore:
+    generator = np.random.default_rng(seed)
+    players = PlayerStore(n)
+    players.strategy[:] = generator.integers(0, len(Strategy), n)
+    players.update_rule[:] = generator.integers(0, len(UpdateRule), n)
+    players.pay_off_sum[:] = generator.normal(size=n)
+    players.rounds_played[:] = generator.integers(0, 100, n)
+    players.rounds_won[:] = generator.integers(0, 100, n)
+    players.strategy_win_rate[:] = generator.integers(0, 100, (n, len(Strategy)))
+    return players
+
+
+def _as_player(view: PlayerView) -> Player:
+    return Player(view.id, view.rounds_played, view.rounds_won, view.update_rule, dict(view.strategy_win_rate.items()),
+                  view.strategy, view.pay_off_sum)
+
+
+def test_views_write_through_to_the_columns():
+    players = PlayerStore(5)
+    view = players[3]
+    view.strategy = Strategy.DEFECT.value
+    view.update_rule = UpdateRule.LOGIT_REPLICATOR_DYNAMICS
+    view.pay_off_sum += 2.5
+    view.rounds_played += 4
+    view.rounds_won += 1
+    view.strategy_win_rate[Strategy.DEFECT] += 3
+    assert players.strategy.tolist() == [0, 0, 0, Strategy.DEFECT.value, 0]
+    assert players.update_rule[3] == UpdateRule.LOGIT_REPLICATOR_DYNAMICS.value
+    assert (players.pay_off_sum[3], players.rounds_played[3], players.rounds_won[3]) == (2.5, 4, 1)
+    assert players.strategy_win_rate[3].tolist() == [0, 3]
+    # a new view reads what the old one wrote
+    assert players[3].update_rule is UpdateRule.LOGIT_REPLICATOR_DYNAMICS
+    assert players[3].strategy_win_rate[Strategy.DEFECT] == 3
+    assert players[3] == view and players[2] != view
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_players_round_trip_through_the_store(seed):
+    players = _store(30, seed)
+    dataclasses = [_as_player(view) for view in players]
+    restored = PlayerStore(len(dataclasses))
+    for player in dataclasses:
+        view = restored[player.id]
+        view.strategy, view.update_rule, view.pay_off_sum = player.strategy, player.update_rule, player.pay_off_sum
+        view.rounds_played, view.rounds_won = player.rounds_played, player.rounds_won
+        for strategy, wins in player.strategy_win_rate.items():
+            view.strategy_win_rate[strategy] = wins
+    for name in PLAYER_COLUMNS:
+        np.testing.assert_array_equal(getattr(restored, name), getattr(players, name), err_msg=name)
+    assert [_as_player(view) for view in restored] == dataclasses
+
+
+def test_copies_and_column_stores_are_independent():
+    players = _store(10, 4)
+    copied, deep = players.copy(), copy.deepcopy(players)
+    shared = PlayerStore.from_columns(players.columns())
+    players[0].pay_off_sum = 100.0
+    players[0].strategy_win_rate[Strategy.COOPERATION] = 100
+    assert shared[0].pay_off_sum == 100.0 and shared[0].strategy_win_rate[Strategy.COOPERATION] == 100
+    assert copied[0].pay_off_sum != 100.0 and deep[0].pay_off_sum != 100.0
+    assert copied[0].strategy_win_rate[Strategy.COOPERATION] != 100
+
+
+def test_lookup_by_id_matches_the_scan_over_a_list():
+    players = _store(20, 5)
+    dataclasses = [_as_player(view) for view in players]
+    for node_id in (0, 7, 19):
+        assert _as_player(get_user_by_id(players, node_id)) == get_user_by_id(dataclasses, node_id)
+    with pytest.raises(IndexError):
+        get_user_by_id(players, 20)
+    with pytest.raises(IndexError):
+        get_user_by_id(players, -1)
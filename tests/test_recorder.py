@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from population import PopulationTracker
+from recorder import SeriesRecorder
+from strategy import Strategy, UpdateRule
+from utilities import init_random_players
+
+
+def _series(recorder: SeriesRecorder):
+    chunks = list(recorder.iter_chunks())
+    if not chunks:
+        return np.zeros(0), np.zeros(0), np.zeros((0, len(UpdateRule)))
+    return tuple(np.concatenate([np.asarray(chunk[i]) for chunk in chunks]) for i in range(3))
+
+
+def _append(recorder: SeriesRecorder, start: int, stop: int):
+    for step in range(start, stop):
+        recorder.append(step / 1000, np.arange(len(UpdateRule)) + step)
+
+
+def test_legacy_lists_keep_their_shape():
+    players = init_random_players(20, 0.5)
+    tracker = PopulationTracker(players)
+    initial_counts = tracker.update_rule_ratios()
+    for node in range(5):
+        old = int(players.strategy[node])
+        players.strategy[node] = Strategy.DEFECT.value
+        tracker.strategy_changed(old, Strategy.DEFECT.value)
+        tracker.record()
+    # one ratio per played edge, the rule counts start with the initial state
+    assert len(tracker.competitive_ratio_by_games) == 5
+    assert len(tracker.update_rule_ratios_holder) == 6
+    assert tracker.update_rule_ratios_holder[0] == initial_counts
+    assert tracker.competitive_ratio_by_games[-1] == tracker.competitive_ratio()
+
+
+@pytest.mark.parametrize("spill", [False, True])
+@pytest.mark.parametrize("stride", [1, 3])
+@pytest.mark.parametrize("rows", [0, 7, 8, 23])
+def test_state_round_trip(tmp_path, spill, stride, rows):
+    directory = str(tmp_path / "series") if spill else None
+    recorder = SeriesRecorder(chunk_size=8, stride=stride, directory=directory)
+    _append(recorder, 0, rows)
+    restored = SeriesRecorder(chunk_size=8, stride=stride, directory=directory)
+    restored.set_state(recorder.get_state())
+    assert len(restored) == len(recorder)
+    for expected, actual in zip(_series(recorder), _series(restored)):
+        np.testing.assert_array_equal(expected, actual)
+    # both go on recording the same rows
+    _append(recorder, rows, rows + 30)
+    _append(restored, rows, rows + 30)
+    for expected, actual in zip(_series(recorder), _series(restored)):
+        np.testing.assert_array_equal(expected, actual)
+    assert restored.last()[0] == recorder.last()[0]
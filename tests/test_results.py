@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pytest
+from player import PLAYER_COLUMNS
+from results import ResultStore, StoredRun
+from strategy import UpdateRule
+
+# runs of the store fixture, by key
+RUNS = {"k01": {"K": 0.1, "seed": 1}, "k02": {"K": 0.2, "seed": 2}, "k03": {"K": 0.3, "seed": 3},
+        "sync": {"K": 0.2, "seed": 4, "engine": "synchronous"}}
+
+
+def _write(store: ResultStore, key: str, result, config: dict) -> StoredRun:
+    result.recorder.flush()
+    return store.write(key, config, result.players, result.update_rules_win_rates, result.update_rules_played,
+                       result.recorder, result.final_adjacency, seed=result.seed,
+                       generations_played=result.generations_played, stop_reason=result.stop_reason)
+
+
+@pytest.fixture
+def store(tmp_path, run, make_config) -> ResultStore:
+    store = ResultStore(str(tmp_path / "store"))
+    for key, overrides in RUNS.items():
+        _write(store, key, run(**overrides), make_config(**overrides))
+    return store
+
+
+def _keys(runs) -> list:
+    return sorted(run.key for run in runs)
+
+
+def test_queries_match_settings_by_value_and_predicate(store):
+    assert len(store) == 4
+    assert _keys(store.query(K=0.2)) == ["k02", "sync"]
+    assert _keys(store.query(K=0.2, engine="asynchronous")) == ["k02"]
+    assert _keys(store.query(K=lambda k: k > 0.15)) == ["k02", "k03", "sync"]
+    assert _keys(store.query(where=lambda run: run.seed % 2 == 1)) == ["k01", "k03"]
+    assert store.query(no_such_setting=1) == []
+    assert _keys(store.query()) == sorted(RUNS)
+
+
+def test_queries_read_the_index_only(store):
+    for key in RUNS:
+        os.remove(os.path.join(store.path(key), "run.json"))
+    runs = store.query(K=0.2)
+    assert _keys(runs) == ["k02", "sync"]
+    assert {run.seed for run in runs} == {2, 4}
+
+
+def test_a_stored_run_gives_back_the_run(tmp_path, run, make_config):
+    result = run(rewiring_probability=0.3)
+    stored = _write(ResultStore(str(tmp_path)), "rewired", result, make_config())
+    for name in PLAYER_COLUMNS:
+        np.testing.assert_array_equal(getattr(stored.players(), name), getattr(result.players, name), err_msg=name)
+    assert stored.update_rules_win_rates() == result.update_rules_win_rates
+    assert stored.update_rules_played() == result.update_rules_played
+    assert stored.details["generations_played"] == result.generations_played
+    np.testing.assert_array_equal(stored.final_adjacency().edges(), result.final_adjacency.edges())
+    ratios = np.concatenate(list(result.recorder.competitive_ratios()))
+    np.testing.assert_array_equal(stored.series("competitive_ratios", 2, 20, 3), ratios[2:20:3])
+    assert isinstance(stored.series("competitive_ratios"), np.memmap)
+    recorder = stored.recorder()
+    assert len(recorder) == len(result.recorder)
+    for rule in UpdateRule:
+        np.testing.assert_array_equal(np.concatenate(list(recorder.rule_counts(rule))),
+                                      np.concatenate(list(result.recorder.rule_counts(rule))))
+
+
+def test_stored_players_are_copy_on_write(store):
+    players = store.open("k01").players()
+    players.pay_off_sum[:] = -1
+    assert (store.open("k01").players().pay_off_sum != -1).any()
+
+
+def test_a_stored_key_keeps_its_first_run(store, run, make_config):
+    again = _write(store, "k01", run(K=0.9, seed=9), make_config(K=0.9, seed=9))
+    assert again.seed == 1 and store.open("k01").settings["K"] == 0.1
+    assert len(store) == 4
+    assert not [name for name in os.listdir(store.root) if name.startswith(".staging-")]
+    with pytest.raises(KeyError):
+        store.open("missing")
+
+
+def test_reindex_rebuilds_the_index_from_the_runs(store):
+    os.remove(store.index_path)
+    assert _keys(store.query(K=0.2)) == ["k02", "sync"]
+    # a half written line of a writer that died is skipped
+    with open(store.index_path, "a") as f:
+        f.write('{"key": "broken"')
+    assert len(store) == 4
+    assert store.reindex() == 4
+    assert _keys(store) == sorted(RUNS)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import plots
+import rng
+from adjacency import CSRAdjacency, DynamicAdjacency
+from random_graphs import erdos_renyi_edges
+
+
+def _rewire_randomly(network: DynamicAdjacency, generator: np.random.Generator, times: int):
+    """ Moves a random endpoint of random edges to a random node that is not a neighbour yet """
+    for _ in range(times):
+        edge = int(generator.integers(network.number_of_edges()))
+        ends = network.edge(edge)
+        side = int(generator.integers(2))
+        old, kept = ends[side], ends[1 - side]
+        new = int(generator.integers(network.n))
+        if new != kept and not network.has_edge(kept, new):
+            network.rewire(edge, old, new)
+
+
+def _assert_matches(network: DynamicAdjacency, csr: CSRAdjacency):
+    pairs = {tuple(sorted(edge)) for edge in network.edges().tolist()}
+    assert {tuple(edge) for edge in np.sort(csr.edges(), axis=1).tolist()} == pairs
+    assert csr.number_of_edges() == network.number_of_edges()
+    for node in range(network.n):
+        assert sorted(csr.neighbours(node).tolist()) == sorted(network.neighbours(node))
+        assert csr.degree[node] == network.node_degree(node)
+    for u in range(network.n):
+        for v in range(u + 1, network.n):
+            assert network.has_edge(u, v) == ((u, v) in pairs)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_csr_matches_the_edges_after_random_rewires(seed):
+    rng.seed(seed)
+    network = DynamicAdjacency.from_csr(CSRAdjacency.from_edges(30, erdos_renyi_edges(30, 0.15)))
+    generator = np.random.default_rng(seed)
+    for _ in range(10):
+        _rewire_randomly(network, generator, 40)
+        _assert_matches(network, network.to_csr())
+    assert network.rewired > 0
+
+
+def test_state_round_trip_keeps_the_neighbour_order():
+    rng.seed(2)
+    network = DynamicAdjacency.from_csr(CSRAdjacency.from_edges(30, erdos_renyi_edges(30, 0.15)))
+    _rewire_randomly(network, np.random.default_rng(2), 200)
+    restored = DynamicAdjacency.from_state(network.get_state())
+    assert restored.rewired == network.rewired
+    np.testing.assert_array_equal(restored.edges(), network.edges())
+    for node in range(network.n):
+        assert restored.neighbours(node) == network.neighbours(node)
+
+
+def test_the_after_network_is_the_rewired_one(tmp_path, monkeypatch, run):
+    result = run(rewiring_probability=0.5)
+    assert result.rewired > 0
+    drawn = []
+    monkeypatch.setattr(plots, "draw_network", lambda graph, players, title, layout: drawn.append((title, graph)))
+    plots.save_plots(result.original_players, result.adjacency, result.players, result.update_rules_win_rates,
+                     result.recorder, result.recorder, str(tmp_path), final_graph=result.final_adjacency)
+    (before_title, before), (after_title, after) = drawn
+    assert "before" in before_title and before is result.adjacency
+    assert "after" in after_title and after is result.final_adjacency
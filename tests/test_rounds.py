@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from player import Player, PlayerStore
+from strategy import Strategy, UpdateRule
+from utilities import build_pay_off_table, play_a_round, play_rounds
+
+PAY_OFFS = {"prisoners_dilemma": [[[-1, -1], [0, 10]], [[10, 0], [5, 5]]],
+            "ties": [[[1, 1], [1, 1]], [[1, 1], [1, 1]]],
+            "column_wins": [[[0, 0], [0, 0]], [[3, 3], [3, 3]]]}
+PAIRS = [(row, column) for row in Strategy for column in Strategy]
+
+
+def _player(node_id: int, strategy: Strategy, update_rule: UpdateRule) -> Player:
+    return Player(node_id, 2, 1, update_rule, {Strategy.COOPERATION: 1, Strategy.DEFECT: 0}, strategy.value, 3)
+
+
+def _repeated(row: Player, column: Player, pay_off_matrix, rounds: int, win_rates: dict, played: dict):
+    """ The per round loop play_rounds replaces, with its update rule tallies """
+    results = None
+    for _ in range(rounds):
+        results = play_a_round(row, column, pay_off_matrix)
+        row_result, column_result = results
+        if column_result.payoff < row_result.payoff:
+            win_rates[row.update_rule] += 1
+        elif row_result.payoff < column_result.payoff:
+            win_rates[column.update_rule] += 1
+        else:
+            win_rates[row.update_rule] += 1
+            win_rates[column.update_rule] += 1
+    played[row.update_rule] += rounds
+    played[column.update_rule] += rounds
+    return results
+
+
+@pytest.mark.parametrize("rounds", [1, 7])
+@pytest.mark.parametrize("row_strategy, column_strategy", PAIRS, ids=["{}-{}".format(*pair) for pair in PAIRS])
+@pytest.mark.parametrize("pay_off", PAY_OFFS.values(), ids=PAY_OFFS.keys())
+def test_play_rounds_is_play_a_round_repeated(pay_off, row_strategy, column_strategy, rounds):
+    pay_off_matrix = np.array(pay_off)
+    rules = (UpdateRule.ADAPT, UpdateRule.TIT_FOR_TAT)
+    tallies = [(dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0)) for _ in range(2)]
+    looped = [_player(0, row_strategy, rules[0]), _player(1, column_strategy, rules[1])]
+    closed = [_player(0, row_strategy, rules[0]), _player(1, column_strategy, rules[1])]
+
+    expected = _repeated(*looped, pay_off_matrix, rounds, *tallies[0])
+    actual = play_rounds(*closed, build_pay_off_table(pay_off_matrix), rounds, *tallies[1])
+    assert closed == looped
+    assert tallies[1] == tallies[0]
+    assert [(result.payoff, result.strategy) for result in actual] == \
+        [(result.payoff, result.strategy) for result in expected]
+
+
+def test_play_rounds_on_store_views_matches_the_loop():
+    pay_off_matrix = np.array(PAY_OFFS["prisoners_dilemma"])
+    looped, closed = PlayerStore(4), PlayerStore(4)
+    for players in (looped, closed):
+        players.strategy[:] = [0, 1, 1, 0]
+    for row, column in [(0, 1), (1, 2), (3, 0), (2, 3)]:
+        for _ in range(10):
+            play_a_round(looped[row], looped[column], pay_off_matrix)
+        play_rounds(closed[row], closed[column], build_pay_off_table(pay_off_matrix), 10)
+    for name, column in closed.columns().items():
+        np.testing.assert_array_equal(column, getattr(looped, name), err_msg=name)
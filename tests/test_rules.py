@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import networkx as nx
+import numpy as np
+import pytest
+import rng
+from adjacency import CSRAdjacency
+from engine import decide_updates
+from player import PlayerStore
+from rules import RULES, Rule
+from strategy import UpdateRule
+
+BUILT_IN = [rule for rule in UpdateRule if rule in RULES]
+
+
+def _state(seed: int, n: int = 80):
+    """ A random network and population; pay offs take few values, so many neighbourhoods tie """
+    generator = np.random.default_rng(seed)
+    graph = nx.barabasi_albert_graph(n, int(generator.integers(1, 4)), seed=seed)
+    players = PlayerStore(n)
+    players.strategy[:] = generator.integers(0, 2, n)
+    players.update_rule[:] = generator.integers(0, len(BUILT_IN), n)
+    players.pay_off_sum[:] = generator.integers(-2, 4, n) * 10
+    players.rounds_played[:] = generator.integers(0, 5, n)
+    adjacency = CSRAdjacency.from_graph_order(graph, n)
+    nodes = np.arange(n)
+    uniforms = generator.random((n, 2))
+    opponents = adjacency.random_neighbours(nodes, generator.random(n))
+    # players who update have played, and so have their opponents
+    players.rounds_played[nodes] = np.maximum(players.rounds_played[nodes], 1)
+    players.rounds_played[opponents] = np.maximum(players.rounds_played[opponents], 1)
+    return graph, adjacency, players, opponents, generator.random(n) < 0.5, uniforms
+
+
+def _update(rule: UpdateRule, graph, players, node: int, opponent: int, won_round: bool, draws: np.ndarray):
+    """ RULES[rule].update() of one player, its rng draws taken from `draws` """
+    stream = rng.get_stream()
+    # the logit rule draws its neighbour before the decision
+    block = draws[::-1] if rule == UpdateRule.LOGIT_REPLICATOR_DYNAMICS else draws[:1]
+    stream.set_state({"bit_generator": stream.generator.bit_generator.state, "block": block})
+    return RULES[rule].update(players[node], players[opponent], bool(won_round), graph, players, 0.5, 11, 2.0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("rule", BUILT_IN, ids=[rule.name for rule in BUILT_IN])
+def test_decide_matches_update_of_every_player(rule, seed):
+    rng.seed(seed)
+    graph, adjacency, players, opponents, won_round, uniforms = _state(seed)
+    nodes = np.flatnonzero(players.update_rule == rule.value)
+    selected, strategies, rules = RULES[rule].decide(
+        players, adjacency, nodes, opponents[nodes], won_round[nodes], uniforms[nodes],
+        players.strategy[opponents[nodes]], players.update_rule[opponents[nodes]], 0.5, 11, 2.0)
+
+    # what each player ends up with: its strategy and the rule value it adopts, -1 for its own
+    decided = np.stack((players.strategy[nodes], np.full(len(nodes), -1)), axis=1)
+    decided[selected] = np.stack((strategies, rules), axis=1)
+    updated = np.empty_like(decided)
+    for position, node in enumerate(nodes.tolist()):
+        decision = _update(rule, graph, players, node, int(opponents[node]), won_round[node], uniforms[node])
+        if decision is not None:
+            strategy, adopted = decision
+            updated[position] = strategy, -1 if adopted is None else adopted.value
+        else:
+            updated[position] = players.strategy[node], -1
+    np.testing.assert_array_equal(decided, updated)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decide_updates_matches_the_rules_decide(seed):
+    _, adjacency, players, opponents, won_round, uniforms = _state(seed)
+    nodes = np.arange(len(players))
+    strategies, rules = decide_updates(players, adjacency, nodes, opponents, won_round, uniforms, 0.5, 11, 2.0, True)
+
+    expected_strategies, expected_rules = players.strategy.copy(), players.update_rule.copy()
+    for rule in BUILT_IN:
+        group = np.flatnonzero(players.update_rule == rule.value)
+        selected, new_strategies, new_rules = RULES[rule].decide(
+            players, adjacency, group, opponents[group], won_round[group], uniforms[group],
+            players.strategy[opponents[group]], players.update_rule[opponents[group]], 0.5, 11, 2.0)
+        expected_strategies[group[selected]] = new_strategies
+        adopted = np.asarray(new_rules) >= 0
+        expected_rules[group[selected][adopted]] = np.asarray(new_rules)[adopted]
+    np.testing.assert_array_equal(strategies, expected_strategies)
+    np.testing.assert_array_equal(rules, expected_rules)
+
+
+def test_a_rule_has_to_implement_update_and_decide():
+    class UpdateOnly(Rule):
+        def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+            return None
+
+    with pytest.raises(TypeError):
+        UpdateOnly()
+
+
+# registering a rule grows UpdateRule for the rest of the process, so it runs in its own interpreter
+REGISTER_A_RULE = """
+import numpy as np
+from adjacency import CSRAdjacency
+from engine import decide_updates
+from population import PopulationTracker
+from rules import RULES, Rule, register
+from strategy import Round, Strategy, UpdateRule, get_formatted_name
+from utilities import init_random_players, update_strategy
+
+@register
+class AlwaysDefect(Rule):
+    update_rule = "ALWAYS_DEFECT"
+    label = title = "Always defect"
+
+    def update(self, player, opponent, won_round, network, players, comp_prob, d_max, K):
+        return Strategy.DEFECT.value, None
+
+    def decide(self, players, adjacency, nodes, opponents, won_round, uniforms, opponent_strategies,
+               opponent_rules, comp_prob, d_max, K):
+        return np.arange(len(nodes)), np.full(len(nodes), Strategy.DEFECT.value), np.full(len(nodes), -1)
+
+assert AlwaysDefect.update_rule is UpdateRule.ALWAYS_DEFECT and UpdateRule(6) is UpdateRule.ALWAYS_DEFECT
+assert isinstance(RULES[UpdateRule.ALWAYS_DEFECT], AlwaysDefect)
+assert get_formatted_name(6) == "Always defect"
+
+players = init_random_players(200, 1.0)
+assert (players.update_rule == 6).any()
+assert len(PopulationTracker(players).update_rule_ratios()) == 7
+adjacency = CSRAdjacency.from_edges(200, [(node, (node + 1) % 200) for node in range(200)])
+nodes = np.arange(200)
+strategies, rules = decide_updates(players, adjacency, nodes, (nodes + 1) % 200, np.ones(200, dtype=bool),
+                                   np.full((200, 2), 0.5), 0.5, 11, 0.13, True)
+defectors = players.update_rule == 6
+assert (strategies[defectors] == Strategy.DEFECT.value).all() and (rules[defectors] == 6).all()
+assert (strategies[~defectors] == players.strategy[~defectors]).all()
+
+player = players[int(np.flatnonzero(defectors)[0])]
+update_strategy(None, players, Round(player, 0, player.strategy), Round(players[0], 0, players[0].strategy), True,
+                0.5, 11, 0.13, True)
+assert player.strategy == Strategy.DEFECT.value and player.update_rule is UpdateRule.ALWAYS_DEFECT
+"""
+
+
+def test_registering_a_rule_by_name_adds_an_update_rule():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", REGISTER_A_RULE], cwd=root, check=True)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import pytest
+from service import DONE, JobService, absolute_paths, request, watch
+
+
+def _serve(service: JobService, socket_path: str, client):
+    """ client(), a blocking function of the client side, while `service` serves on socket_path """
+    async def main():
+        server = asyncio.ensure_future(service.serve(socket_path))
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, client)
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def service(tmp_path) -> JobService:
+    return JobService(str(tmp_path / "cache"), figure_format=None, progress_interval=0.05)
+
+
+@pytest.fixture
+def socket_path(tmp_path) -> str:
+    return str(tmp_path / "service.sock")
+
+
+def test_a_missing_file_is_an_error_answer(service, socket_path, make_config, tmp_path):
+    missing = str(tmp_path / "missing.net")
+    config = make_config(G="pajek", pajek_path=missing)
+
+    def submit():
+        return request(socket_path, {"op": "submit", "config": config}), \
+            request(socket_path, {"op": "status"})
+
+    answer, status = _serve(service, socket_path, submit)
+    assert "missing.net" in answer["error"]
+    # the service is still answering
+    assert status == {"jobs": []}
+
+
+def test_done_jobs_are_answered_from_the_results(service, socket_path, make_config, pajek_file):
+    config = make_config(G="pajek", pajek_path=pajek_file, seed=3)
+
+    def submit_and_follow():
+        job = request(socket_path, {"op": "submit", "config": config})
+        events = list(watch(socket_path, job["key"]))
+        return job, events, request(socket_path, {"op": "submit", "config": config}), \
+            request(socket_path, {"op": "status", "key": job["key"]}), \
+            request(socket_path, {"op": "result", "key": job["key"]})
+
+    job, events, again, status, result = _serve(service, socket_path, submit_and_follow)
+    assert events[-1]["state"] == DONE
+    assert again == {"key": job["key"], "state": DONE, "seed": 3, "cached": True}
+    assert status == {"key": job["key"], "state": DONE}
+    assert result["run"]["seed"] == 3 and os.path.isdir(result["directory"])
+    assert service.jobs == {}
+
+
+def test_unknown_jobs_and_operations_are_error_answers(service, socket_path):
+    def ask():
+        return request(socket_path, {"op": "status", "key": "nothing"}), request(socket_path, {"op": "stop"})
+
+    unknown_job, unknown_operation = _serve(service, socket_path, ask)
+    assert unknown_job == {"error": "unknown job 'nothing'"}
+    assert unknown_operation == {"error": "unknown operation 'stop'"}
+
+
+def test_the_client_sends_absolute_paths(make_config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = make_config(G="pajek", pajek_path="./files/test.net", competitive_probability="strategies.json",
+                         graph_cache="graphs")
+    settings = absolute_paths(config)["SIMULATION"]
+    assert settings["pajek_path"] == str(tmp_path / "files" / "test.net")
+    assert settings["competitive_probability"] == str(tmp_path / "strategies.json")
+    assert settings["graph_cache"] == str(tmp_path / "graphs")
+    assert settings["layout_cache"] is None
+    # the client's config is left as it was
+    assert config["SIMULATION"]["pajek_path"] == "./files/test.net"
+
+
+@pytest.mark.parametrize("competitive_probability", [0.5, "random"])
+def test_the_client_leaves_other_settings_alone(make_config, competitive_probability):
+    config = make_config(competitive_probability=competitive_probability)
+    # pajek_path is not used by other graphs and stays as it is, it is part of the job key
+    assert absolute_paths(config) == config
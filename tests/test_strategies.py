@@ -0,0 +1,70 @@
+import json
+import os
+import pytest
+import rng
+import utilities
+from strategy import Strategy, UpdateRule
+from utilities import init_random_players, load_initial_strategies
+
+
+def _strategy_file(tmp_path, strategies: dict) -> str:
+    path = str(tmp_path / "strategies.json")
+    with open(path, "w") as f:
+        json.dump(strategies, f)
+    return path
+
+
+def _update_rules(nodes: int, seed: int):
+    rng.seed(seed)
+    return init_random_players(nodes, 0.5).update_rule.copy()
+
+
+def test_tit_for_tat_nodes_need_no_file_entry(tmp_path):
+    update_rules = _update_rules(40, 3)
+    tit_for_tat = update_rules == UpdateRule.TIT_FOR_TAT.value
+    assert tit_for_tat.any()
+    path = _strategy_file(tmp_path, {str(node + 1): "D" for node in range(40) if not tit_for_tat[node]})
+    rng.seed(3)
+    players = init_random_players(40, path)
+    assert (players.update_rule == update_rules).all()
+    assert (players.strategy[tit_for_tat] == Strategy.COOPERATION.value).all()
+    assert (players.strategy[~tit_for_tat] == Strategy.DEFECT.value).all()
+
+
+def test_missing_node_that_needs_a_strategy_is_named(tmp_path):
+    update_rules = _update_rules(40, 3)
+    needed = [node for node in range(40) if update_rules[node] != UpdateRule.TIT_FOR_TAT.value]
+    path = _strategy_file(tmp_path, {str(node + 1): "C" for node in needed[1:]})
+    rng.seed(3)
+    with pytest.raises(KeyError, match="node {} has no initial strategy".format(needed[0] + 1)):
+        init_random_players(40, path)
+
+
+@pytest.mark.parametrize("label", ["0", "-3"])
+def test_labels_start_at_one(tmp_path, label):
+    path = _strategy_file(tmp_path, {"1": "C", label: "D"})
+    with pytest.raises(ValueError, match="node label {} in .* is outside 1..n".format(label)):
+        init_random_players(5, path)
+
+
+def test_labels_above_the_node_count_are_rejected(tmp_path):
+    path = _strategy_file(tmp_path, {str(node): "C" for node in range(1, 8)})
+    with pytest.raises(ValueError, match="node label 6 in .* is outside 1..5"):
+        init_random_players(5, path)
+
+
+def test_sidecar_follows_the_file_not_its_age(tmp_path):
+    path = _strategy_file(tmp_path, {str(node): "C" for node in range(1, 6)})
+    assert (load_initial_strategies(path) == Strategy.COOPERATION.value).all()
+    sidecar = os.stat(path + ".npy")
+    # a fresh process reads the sidecar instead of parsing again
+    utilities._strategy_files.clear()
+    assert (load_initial_strategies(path) == Strategy.COOPERATION.value).all()
+    assert os.stat(path + ".npy").st_mtime_ns == sidecar.st_mtime_ns
+
+    # an edit that leaves the file older than its sidecar, e.g. a copy that keeps the mtime
+    stat = os.stat(path)
+    _strategy_file(tmp_path, {str(node): "D" for node in range(1, 6)})
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+    utilities._strategy_files.clear()
+    assert (load_initial_strategies(path) == Strategy.DEFECT.value).all()
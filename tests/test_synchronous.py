@@ -0,0 +1,43 @@
+import networkx as nx
+import numpy as np
+import pytest
+from adjacency import CSRAdjacency
+from engine import play_generation
+from player import PlayerStore
+from population import PopulationTracker
+from strategy import UpdateRule
+from utilities import build_pay_off_table, play_rounds
+
+PAY_OFFS = {
+    # the default config, the row and the column player score differently
+    "asymmetric": [[[-1, -1], [0, 10]], [[10, 0], [5, 5]]],
+    "other": [[[3, 0], [5, 1]], [[3, 5], [0, 1]]]
+}
+
+
+def _players(n: int, seed: int) -> PlayerStore:
+    generator = np.random.default_rng(seed)
+    players = PlayerStore(n)
+    players.update_rule[:] = generator.integers(0, len(UpdateRule), n)
+    players.strategy[:] = generator.integers(0, 2, n)
+    return players
+
+
+@pytest.mark.parametrize("pay_off", PAY_OFFS.values(), ids=PAY_OFFS.keys())
+def test_generation_plays_the_game_of_play_rounds(pay_off):
+    adjacency = CSRAdjacency.from_graph(nx.erdos_renyi_graph(80, 0.08, seed=3), 80)
+    pay_off_table = build_pay_off_table(np.array(pay_off))
+    synchronous, by_edges = _players(adjacency.n, 3), _players(adjacency.n, 3)
+    win_rates, played = dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0)
+    edge_win_rates, edge_played = dict.fromkeys(UpdateRule, 0), dict.fromkeys(UpdateRule, 0)
+
+    play_generation(adjacency, synchronous, pay_off_table, 7, 0.5, 11, 0.13, True, win_rates, played,
+                    PopulationTracker(synchronous), np.random.default_rng(0))
+    # play_rounds does not change strategies, so every edge sees the strategies the generation started with
+    for row, column in adjacency.edges():
+        play_rounds(by_edges[int(row)], by_edges[int(column)], pay_off_table, 7, edge_win_rates, edge_played)
+
+    for column in ("pay_off_sum", "rounds_played", "rounds_won", "strategy_win_rate"):
+        np.testing.assert_array_equal(getattr(synchronous, column), getattr(by_edges, column), err_msg=column)
+    assert win_rates == edge_win_rates
+    assert played == edge_played
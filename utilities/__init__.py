@@ -1,139 +1,187 @@
-from random import randrange, random, choice
+from rng import randrange, random, generator
+import os
+import tempfile
 from typing import Tuple
 import numpy as np
 from networkx import Graph
 import json
-from player import Player
-from strategy import UpdateRule, Strategy, Round, replicator_dynamics, logit_replicator_dynamics
+from player import Player, PlayerStore
+from rules import RULES, get_user_by_id, get_neighbours, draw_neighbour, find_most_successful_player
+from strategy import UpdateRule, Strategy, Round
 
 
 def draw_update_rule(): return UpdateRule(randrange(len(UpdateRule)))
 
 
+_MISSING_STRATEGY = -1
+_strategy_files = {}
+
+
+def _parse_strategy_file(path: str) -> np.ndarray:
+    with open(path) as json_file:
+        strategies = json.load(json_file)
+    # reason behind -1: nodes  are 0-based, input file is not
+    ids = np.fromiter((int(node_id) - 1 for node_id in strategies), dtype=np.int64, count=len(strategies))
+    if len(ids) and ids.min() < 0:
+        raise _outside_labels(int(ids.min()), path)
+    values = np.fromiter((Strategy.COOPERATION.value if value == "C" else Strategy.DEFECT.value
+                          for value in strategies.values()), dtype=np.int8, count=len(strategies))
+    parsed = np.full(ids.max() + 1 if len(ids) else 0, _MISSING_STRATEGY, dtype=np.int8)
+    parsed[ids] = values
+    return parsed
+
+
+def _signature(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _read_sidecar(sidecar: str, signature: list):
+    """ The sidecar's strategies if it was written from a file with this signature, else None """
+    try:
+        with open(sidecar + ".json") as f:
+            if json.load(f) != signature:
+                return None
+        return np.load(sidecar, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(sidecar: str, strategies: np.ndarray, signature: list):
+    """ Best effort, without a sidecar the file is parsed again. The signature goes first, so a sidecar is
+        never paired with the signature of another file version."""
+    directory = os.path.dirname(sidecar) or "."
+    try:
+        if os.path.exists(sidecar + ".json"):
+            os.remove(sidecar + ".json")
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".npy", delete=False) as f:
+            np.save(f, strategies)
+        os.replace(f.name, sidecar)
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".json", delete=False) as f:
+            json.dump(signature, f)
+        os.replace(f.name, sidecar + ".json")
+    except OSError:
+        pass
+
+
+def load_initial_strategies(path: str) -> np.ndarray:
+    """ Node indexed strategies of a {"1": "C", "2": "D", ...} file, missing nodes are -1.
+        The file is parsed once, later loads read the binary <path>.npy sidecar. The sidecar is used while the
+        file has the size and modification time it was written from, kept in <path>.npy.json."""
+    signature = _signature(path)
+    cached = _strategy_files.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    sidecar = path + ".npy"
+    strategies = _read_sidecar(sidecar, signature)
+    if strategies is None:
+        strategies = _parse_strategy_file(path)
+        _write_sidecar(sidecar, strategies, signature)
+    _strategy_files[path] = (signature, strategies)
+    return strategies
+
+
+def _missing_strategy(node_id: int, path: str) -> KeyError:
+    return KeyError("node {} has no initial strategy in {}".format(node_id + 1, path))
+
+
+def _outside_labels(node_id: int, path: str, nodes: int = None) -> ValueError:
+    return ValueError("node label {} in {} is outside 1..{}".format(node_id + 1, path, "n" if nodes is None else nodes))
+
+
+def get_random_strategies(nodes: int, c_prob, needed: np.ndarray = None) -> np.ndarray:
+    """ Initial strategy of every node at once, c_prob: float, random or file path.
+        needed: mask of the nodes whose strategy is used, by default all. A file only has to list those, the
+        others are COOPERATION."""
+    if type(c_prob) == float or c_prob == "random":
+        probability = c_prob if type(c_prob) == float else 0.5
+        return np.where(generator().random(nodes) <= probability,
+                        Strategy.COOPERATION.value, Strategy.DEFECT.value).astype(np.int8)
+    listed = np.asarray(load_initial_strategies(c_prob))
+    extra = np.flatnonzero(listed[nodes:] != _MISSING_STRATEGY)
+    if len(extra):
+        raise _outside_labels(nodes + int(extra[0]), c_prob, nodes)
+    listed = listed[:nodes]
+    strategies = np.full(nodes, _MISSING_STRATEGY, dtype=np.int8)
+    strategies[:len(listed)] = listed
+    missing = strategies == _MISSING_STRATEGY
+    unlisted = np.flatnonzero(missing if needed is None else missing & needed)
+    if len(unlisted):
+        raise _missing_strategy(int(unlisted[0]), c_prob)
+    strategies[missing] = Strategy.COOPERATION.value
+    return strategies
+
+
 def get_random_strategy(node_id: int, c_prob):
     if type(c_prob) == float:
         return Strategy.COOPERATION.value if random() <= c_prob else Strategy.DEFECT.value
     if c_prob == "random":
         return Strategy.COOPERATION.value if random() <= 0.5 else Strategy.DEFECT.value
-    with open(c_prob) as json_file:
-        strategies = json.load(json_file)
-        # reason behind +1: nodes  are 0-based, input file is not
-        return Strategy.COOPERATION.value if strategies[str(node_id + 1)] == "C" else Strategy.DEFECT.value
+    strategies = load_initial_strategies(c_prob)
+    if node_id >= len(strategies) or strategies[node_id] == _MISSING_STRATEGY:
+        raise _missing_strategy(node_id, c_prob)
+    return int(strategies[node_id])
 
 
 def calculate_d_max(pay_off_matrix): return np.max(pay_off_matrix) - np.min(pay_off_matrix)
 
 
-def get_user_by_id(users, node_id):
-    return next((user for user in users if user.id == node_id))
-
-
-def get_neighbours(player_id: int, network: Graph): return list(network.neighbors(player_id))
-
-
-def find_most_successful_player(network, player, players):
-    max_pay_off = 0
-    best_id = player.id
-    for related_players in network.edges(player.id):
-        related_player = get_user_by_id(players, related_players[1])
-        if max_pay_off < related_player.pay_off_sum:
-            max_pay_off = related_player.pay_off_sum
-            best_id = related_player.id
-    return best_id
-
-
-def init_random_players(nodes: int, c_prob):
+def init_random_players(nodes: int, c_prob) -> PlayerStore:
     """ c_prob: float, random or file path"""
-    initialized_players = []
-    for user_id in range(nodes):
-        player_update_rule = draw_update_rule()
-        player_strategy = \
-            Strategy.COOPERATION.value if player_update_rule is UpdateRule.TIT_FOR_TAT else get_random_strategy(user_id, c_prob)
-
-        initialized_players.append(
-            Player(
-                id=user_id,
-                rounds_played=0,
-                rounds_won=0,
-                update_rule=player_update_rule,
-                strategy=player_strategy,
-                strategy_win_rate={Strategy.COOPERATION: 0, Strategy.DEFECT: 0},
-                pay_off_sum=0
-            )
-        )
+    initialized_players = PlayerStore(nodes)
+    initialized_players.update_rule[:] = generator().integers(len(UpdateRule), size=nodes)
+    # tit for tat players start out cooperating, a strategy file does not have to list them
+    tit_for_tat = initialized_players.update_rule == UpdateRule.TIT_FOR_TAT.value
+    initialized_players.strategy[:] = get_random_strategies(nodes, c_prob, ~tit_for_tat)
+    initialized_players.strategy[tit_for_tat] = Strategy.COOPERATION.value
     return initialized_players
 
 
-def simulate(pay_off_matrix, row_player: Player, column_player: Player) \
-        -> Tuple[Round, Round]:
+def round_pay_offs(pay_off_matrix, row_strategy: int, column_strategy: int):
     row_payoff = pay_off_matrix[0]
     column_payoff = pay_off_matrix[1]
 
     row_sum = row_payoff[0][0] \
-        if row_player.strategy == Strategy.COOPERATION.value else row_payoff[1][0]
+        if row_strategy == Strategy.COOPERATION.value else row_payoff[1][0]
     column_sum = column_payoff[0][1] \
-        if column_player.strategy == Strategy.COOPERATION.value else column_payoff[1][1]
+        if column_strategy == Strategy.COOPERATION.value else column_payoff[1][1]
+    return row_sum, column_sum
+
+
+def build_pay_off_table(pay_off_matrix) -> np.ndarray:
+    """ row: row_strategy * len(Strategy) + column_strategy, columns: row and column pay off of one round"""
+    strategies = len(Strategy)
+    table = np.zeros((strategies * strategies, 2), dtype=np.float64)
+    for row_strategy in Strategy:
+        for column_strategy in Strategy:
+            table[row_strategy.value * strategies + column_strategy.value] = \
+                round_pay_offs(pay_off_matrix, row_strategy.value, column_strategy.value)
+    return table
+
+
+def simulate(pay_off_matrix, row_player: Player, column_player: Player) \
+        -> Tuple[Round, Round]:
+    row_sum, column_sum = round_pay_offs(pay_off_matrix, row_player.strategy, column_player.strategy)
     return Round(row_player, row_sum, row_player.strategy), Round(column_player, column_sum, column_player.strategy)
 
 
-def update_strategy(network: Graph, players, result: Round, opponent_result: Round, won_round: bool, comp_prob: float, d_max: int, K: float, change_update_rule: bool):
+def update_strategy(network: Graph, players, result: Round, opponent_result: Round, won_round: bool, comp_prob: float, d_max: int, K: float, change_update_rule: bool, tracker=None):
     player = result.node
-    opponent = opponent_result.node
-    edited = False
+    decision = RULES[player.update_rule].update(player, opponent_result.node, won_round, network, players,
+                                                comp_prob, d_max, K)
+    if decision is None:
+        return
     original_player_strategy = player.strategy
-    changed_rule = None
-    if player.update_rule is UpdateRule.RANDOM and not won_round and type(comp_prob) != str:
-        player.strategy = \
-            Strategy.COOPERATION.value if random() < comp_prob else Strategy.DEFECT.value
-        if original_player_strategy != player.strategy and change_update_rule:
-            changed_rule = opponent.update_rule
-            edited = True
-    if player.update_rule is UpdateRule.ADAPT and not won_round:
-        player.strategy = opponent.strategy
-        if change_update_rule:
-            changed_rule = opponent.update_rule
-            edited = True
-    if player.update_rule is UpdateRule.TIT_FOR_TAT:
-        player.strategy = opponent.strategy
-        if change_update_rule:
-            changed_rule = opponent.update_rule
-            edited = True
-    if player.update_rule is UpdateRule.REPLICATOR_DYNAMICS:
-        replicator_value = replicator_dynamics(player, opponent, d_max)
-        if replicator_value is None:
-            return
-        player.strategy = opponent.strategy if random() < replicator_value else player.strategy
-        if original_player_strategy != player.strategy and change_update_rule:
-            edited = True
-    if player.update_rule is UpdateRule.BEST_TAKES_OVER and not won_round:
-        most_successful_player = get_user_by_id(players, find_most_successful_player(network, player, players))
-        player.strategy = most_successful_player.strategy
-        if change_update_rule:
-            changed_rule = most_successful_player.update_rule
-            edited = True
-    if player.update_rule is UpdateRule.LOGIT_REPLICATOR_DYNAMICS:
-        player_neighbours = get_neighbours(player.id, network)
-        random_neighbour_id = choice(player_neighbours)
-        random_neighbour = get_user_by_id(players, random_neighbour_id)
-        player_avg_pay_off = player.pay_off_sum / player.rounds_played
-
-        if random_neighbour.rounds_played == 0:
-            return
-
-        random_neighbour_avg_pay_off = random_neighbour.pay_off_sum / random_neighbour.rounds_played
-        if random_neighbour is None:
-            print("Error: player with id not found: ", random_neighbour_id)
-        change_prob = logit_replicator_dynamics(player_avg_pay_off, random_neighbour_avg_pay_off, K)
-        if random() <= change_prob:
-            player.strategy = random_neighbour.strategy
-            if change_update_rule:
-                changed_rule = random_neighbour.update_rule
-                edited = True
-    if edited and change_update_rule and change_update_rule is not None:
-        change_update_rule(player, changed_rule)
-
-
-def change_player_update_rule(player, update_rule):
+    player.strategy, changed_rule = decision
+    if tracker is not None:
+        tracker.strategy_changed(original_player_strategy, player.strategy)
+    if change_update_rule and changed_rule is not None:
+        change_player_update_rule(player, changed_rule, tracker)
+
+
+def change_player_update_rule(player, update_rule, tracker=None):
+    if tracker is not None:
+        tracker.rule_changed(player.update_rule, update_rule)
     player.update_rule = update_rule
 
 
@@ -161,3 +209,42 @@ def play_a_round(row_player: Player,
     column_player.rounds_played += 1
 
     return row_player_results, column_player_results
+
+
+def play_rounds(row_player: Player,
+                column_player: Player,
+                pay_off_table: np.ndarray,
+                rounds: int,
+                update_rules_win_rates: dict = None,
+                update_rules_played: dict = None):
+    """ Closed form of calling play_a_round `rounds` times: strategies are fixed, so every round is the same """
+    row_strategy = row_player.strategy
+    column_strategy = column_player.strategy
+    row_pay_off, column_pay_off = pay_off_table[row_strategy * len(Strategy) + column_strategy]
+
+    row_player.pay_off_sum += rounds * row_pay_off
+    column_player.pay_off_sum += rounds * column_pay_off
+
+    if row_pay_off < column_pay_off:
+        column_player.rounds_won += rounds
+        column_player.strategy_win_rate[Strategy(column_strategy)] += rounds
+    elif row_pay_off != column_pay_off:
+        row_player.rounds_won += rounds
+        row_player.strategy_win_rate[Strategy(row_strategy)] += rounds
+
+    row_player.rounds_played += rounds
+    column_player.rounds_played += rounds
+
+    if update_rules_win_rates is not None:
+        if column_pay_off < row_pay_off:
+            update_rules_win_rates[row_player.update_rule] += rounds
+        elif row_pay_off < column_pay_off:
+            update_rules_win_rates[column_player.update_rule] += rounds
+        else:
+            update_rules_win_rates[row_player.update_rule] += rounds
+            update_rules_win_rates[column_player.update_rule] += rounds
+    if update_rules_played is not None:
+        update_rules_played[row_player.update_rule] += rounds
+        update_rules_played[column_player.update_rule] += rounds
+
+    return Round(row_player, row_pay_off, row_strategy), Round(column_player, column_pay_off, column_strategy)